@@ -1,44 +1,71 @@
 import argparse
 import sys
-from src.riot import RiotClient
+from src.accounts import resolve_puuid
 from src.analysis import AnalysisEngine
-from src.database import get_recent_games, get_timeline_events
-from src.llm import LLMClient
+from src.analytics import AnalyticsEngine
+from src.database import get_llm_call_stats, get_match_summary, get_recent_games, init_db, save_match_summary
+from src.digest import DEFAULT_TOKEN_BUDGET
+from src.llm import FakeBackend, LLMClient
+from src.summaries import DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_WORKERS, llm_rate_limiter, summarize_games
+
+def print_trends(trends):
+    print(f"\nTRENDS ({trends.games_analyzed} games, rolling window {trends.window})")
+    print(f"Win Rate:       {trends.win_rate:.1f}% (95% CI {trends.win_rate_low:.1f}-{trends.win_rate_high:.1f}%), "
+          f"last {trends.window}: {trends.recent_win_rate:.1f}%")
+    streak = f"{abs(trends.current_streak)}{'W' if trends.current_streak > 0 else 'L'}"
+    print(f"Streaks:        current {streak}, longest {trends.longest_win_streak}W / {trends.longest_loss_streak}L")
+    print(f"{'':<16}{'All':>8}{f'Last {trends.window}':>9}{'EWMA':>8}")
+    for metric, label in (("kda", "KDA"), ("cspm", "CSPM"), ("gpm", "Gold/Min"), ("vision", "Vision Score")):
+        print(f"{label:<16}{trends.averages[metric]:>8}{trends.recent[metric]:>9}{trends.ewma[metric]:>8}")
+
+    for title, groups in (("CHAMPION", trends.champions), ("POSITION", trends.positions)):
+        print(f"\nBY {title} (top 10)")
+        print(f"{'':<16}{'Games':>6}{'Win%':>7}{'95% CI':>14}{'KDA':>7}{'CSPM':>7}")
+        for group in groups[:10]:
+            ci = f"{group.win_rate_low:.0f}-{group.win_rate_high:.0f}%"
+            print(f"{group.name:<16}{group.games:>6}{group.win_rate:>6.1f}%{ci:>14}"
+                  f"{group.averages['kda']:>7}{group.averages['cspm']:>7}")
 
 def main():
     parser = argparse.ArgumentParser(description="Analyze League of Legends performance")
     parser.add_argument("--user", help="Riot ID (GameName#TagLine)")
     parser.add_argument("--puuid", help="Direct PUUID to analyze")
-    parser.add_argument("--limit", type=int, default=20, help="Number of games to analyze")
+    parser.add_argument("--limit", type=int, default=20, help="Number of games to analyze (0 = all games)")
+    parser.add_argument("--group-by", choices=["champion", "team_position"], help="Also break the report down by champion or position")
+    parser.add_argument("--trends", action="store_true", help="Add rolling/EWMA form, streaks and per-champion/role breakdowns")
+    parser.add_argument("--trends-limit", type=int, default=0, help="Number of games for --trends (0 = all games)")
+    parser.add_argument("--window", type=int, default=20, help="Rolling window for --trends (capped at the games analyzed)")
     parser.add_argument("--ai", action="store_true", help="Generate AI summary for the most recent match")
+    parser.add_argument("--ai-batch", type=int, metavar="N", help="Summarize the last N games that have no stored summary (0 = all), resuming where a previous run stopped")
+    parser.add_argument("--ai-workers", type=int, default=DEFAULT_WORKERS, help="Concurrent model calls for --ai-batch")
+    parser.add_argument("--ai-rpm", type=int, default=DEFAULT_REQUESTS_PER_MINUTE, help="Max model requests per minute for --ai-batch")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached AI summaries and call the model again")
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET, help="Max estimated tokens of timeline digest per AI prompt")
+    parser.add_argument("--llm-stats", action="store_true", help="Show prompt size and latency of past AI calls per token budget")
+    parser.add_argument("--fake-llm", action="store_true", help="Use a canned offline model instead of Gemini for AI summaries")
     args = parser.parse_args()
 
     if not args.user and not args.puuid:
         print("Error: Must provide either --user or --puuid")
         sys.exit(1)
 
+    init_db()
     puuid = args.puuid
     
     if args.user:
-        if "#" not in args.user:
-            print("Error: User must be in format GameName#TagLine")
-            sys.exit(1)
-
-        name, tag = args.user.split("#")
-        
         print(f"Resolving PUUID for {args.user}...")
-        client = RiotClient()
         try:
-            account = client.get_account_by_riot_id(name, tag)
-            puuid = account["puuid"]
+            # Answered from the accounts table when resolved before
+            puuid = resolve_puuid(args.user)
         except Exception as e:
             print(f"Error fetching PUUID: {e}")
             sys.exit(1)
 
-    print(f"Analyzing last {args.limit} games for PUUID: {puuid}...")
+    limit = args.limit or None
+    print(f"Analyzing {f'last {limit}' if limit else 'all'} games for PUUID: {puuid}...")
     
     engine = AnalysisEngine()
-    report = engine.get_user_stats(puuid, args.limit)
+    report, groups = engine.get_grouped_stats(puuid, limit, args.group_by)
     
     if not report:
         print("No games found in database. Run fetch_history.py first.")
@@ -56,19 +83,71 @@ def main():
     print(f"Gold/Min:       {report.avg_gold_per_min}")
     print("="*40)
 
+    if groups:
+        print(f"\nBY {args.group_by.upper().replace('_', ' ')}")
+        print(f"{'':<16}{'Games':>6}{'Win%':>7}{'KDA':>7}{'CSPM':>7}{'Vision':>8}")
+        for group in groups:
+            print(f"{(group.group or '?'):<16}{group.games_analyzed:>6}{group.win_rate:>6.1f}%"
+                  f"{group.avg_kda:>7}{group.avg_cspm:>7}{group.avg_vision_score:>8}")
+
+    if args.trends:
+        print_trends(AnalyticsEngine().build_report(puuid, args.trends_limit or None, window=args.window))
+
+    backend = FakeBackend() if args.fake_llm else None
+
     if args.ai:
         print("\nNote: Generating AI summary for the MOST RECENT match only...")
         games = get_recent_games(puuid, 1)
         if games:
             game = games[0]
-            try:
-                events = get_timeline_events(game.match_id, puuid)
-                client = LLMClient()
-                summary = client.generate_match_summary(game, events)
-                print("\n[AI COACH SUMMARY]")
-                print(summary)
-            except Exception as e:
-                print(f"Error generating AI summary: {e}")
+            stored = None if args.no_cache or args.fake_llm else get_match_summary(game.match_id, puuid)
+            if stored:
+                print("\n[AI COACH SUMMARY] (stored)")
+                print(stored)
+            else:
+                try:
+                    client = LLMClient(token_budget=args.token_budget, backend=backend)
+                    print("\n[AI COACH SUMMARY]")
+                    chunks = []
+                    # Printed as it is generated instead of after the whole response
+                    for chunk in client.summarize_match_stream(game, use_cache=not args.no_cache):
+                        print(chunk, end="", flush=True)
+                        chunks.append(chunk)
+                    print()
+                    if client.stores_summaries:
+                        save_match_summary(game.match_id, puuid, client.model, "".join(chunks))
+                    timing = client.last_call
+                    if timing.cached:
+                        print("(cached)")
+                    else:
+                        print(f"(first token {timing.ttft_ms:.0f} ms, total {timing.latency_ms:.0f} ms)")
+                except Exception as e:
+                    print(f"\nError generating AI summary: {e}")
+
+    if args.ai_batch is not None:
+        batch_limit = args.ai_batch or None
+        print(f"\nSummarizing {'every' if batch_limit is None else f'the last {batch_limit}'} un-summarized game(s) "
+              f"({args.ai_workers} workers, max {args.ai_rpm} requests/min)...")
+        try:
+            client = LLMClient(
+                rate_limiter=llm_rate_limiter(args.ai_rpm), token_budget=args.token_budget, backend=backend
+            )
+        except Exception as e:
+            print(f"Error creating AI client: {e}")
+        else:
+            result = summarize_games(
+                client, puuid, batch_limit, workers=args.ai_workers, use_cache=not args.no_cache,
+                on_summary=lambda game, summary: print(f"\n[{game.match_id}] {game.champion_name}\n{summary}")
+            )
+            print(f"\nSummaries: {result['summarized']} generated, {result['stored']} stored, "
+                  f"{result['failed']} failed (rerun to retry), cache hits {client.cache.hits}.")
+    if args.llm_stats:
+        print("\nAI CALLS (successful, excluding cache hits)")
+        print(f"{'Model':<20}{'Budget':>8}{'Calls':>7}{'Prompt tok':>12}{'Avg ms':>9}{'Max ms':>9}{'TTFT ms':>9}")
+        for row in get_llm_call_stats():
+            ttft = "-" if row["avg_ttft_ms"] is None else f"{row['avg_ttft_ms']:.0f}"
+            print(f"{row['model']:<20}{row['token_budget']:>8}{row['calls']:>7}{row['avg_prompt_tokens']:>12.0f}"
+                  f"{row['avg_latency_ms']:>9.0f}{row['max_latency_ms']:>9.0f}{ttft:>9}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,76 @@
+"""
+Scaling benchmark for the NumPy analytics report.
+
+Stores N synthetic games for one player in a temporary database and times
+`AnalyticsEngine.build_report` (load + every statistic) as N grows.
+
+    python -m benchmarks.analytics
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+from src import database
+from src.analytics import AnalyticsEngine, load_games
+from src.models import GameStatsDto
+
+PUUID = "puuid-1"
+CHAMPIONS = ["Ahri", "Lux", "Zed", "Jinx", "Thresh", "Lee Sin", "Garen", "Ezreal", "Yasuo", "Leona"]
+POSITIONS = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+
+def make_games(start: int, count: int, rng: random.Random):
+    return [
+        GameStatsDto(
+            match_id=f"NA1_{i}", puuid=PUUID, champion_name=rng.choice(CHAMPIONS), win=rng.random() < 0.5,
+            game_creation=i, game_duration=1800, kills=5, deaths=4, assists=7, kda=rng.uniform(0, 8),
+            total_minions_killed=180, neutral_minions_killed=10, cs_per_minute=rng.uniform(4, 9),
+            gold_earned=11000, gold_per_minute=rng.uniform(300, 500),
+            total_damage_dealt_to_champions=20000, damage_per_minute=rng.uniform(400, 900),
+            vision_score=rng.randint(5, 60), wards_placed=10, wards_killed=2, team_position=rng.choice(POSITIONS)
+        )
+        for i in range(start, start + count)
+    ]
+
+def best_of(func, repeat: int) -> float:
+    # Like timeit, keep the cyclic GC out of the measurement
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analytics report as history grows")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="History sizes to time")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs per size (best is reported)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    engine = AnalyticsEngine()
+    with tempfile.TemporaryDirectory() as tmp:
+        database.set_db_path(os.path.join(tmp, "bench.db"))
+        database.init_db()
+
+        stored = 0
+        print(f"{'Games':>8}{'Load':>10}{'Report':>10}{'Total':>10}")
+        for size in sorted(args.sizes):
+            database.save_all_game_stats(make_games(stored, size - stored, rng))
+            stored = size
+
+            load = best_of(lambda: load_games(PUUID), args.repeat)
+            games = load_games(PUUID)
+            compute = best_of(lambda: engine.report_from_arrays(games), args.repeat)
+            total = best_of(lambda: engine.build_report(PUUID), args.repeat)
+            print(f"{size:>8}{load * 1000:>8.1f}ms{compute * 1000:>8.1f}ms{total * 1000:>8.1f}ms")
+        database.close_connection()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Micro-benchmark for reading timeline rows back into models.
+
+Compares validated hydration, the trusted (unvalidated) path and plain tuples
+on a temporary database holding 100k events for one player, end to end and
+for model building alone.
+
+    python -m benchmarks.hydration
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict
+from src import database
+from src.database import (
+    TIMELINE_EVENT_COLUMNS, _timeline_event_from_row, get_timeline_events, iter_timeline_events, save_timeline_events
+)
+from src.models import TimelineEventDto
+
+MATCH_ID = "NA1_BENCH"
+PUUID = "puuid-1"
+
+def make_events(count: int):
+    return [
+        TimelineEventDto(
+            match_id=MATCH_ID, puuid=PUUID, timestamp=i * 10, type="CHAMPION_KILL",
+            killer_id=1 + i % 10, victim_id=1 + (i + 3) % 10, position_x=i % 15000, position_y=(i * 7) % 15000
+        )
+        for i in range(count)
+    ]
+
+def best_of(func: Callable[[], Any], repeat: int) -> float:
+    # Like timeit, keep the cyclic GC out of the measurement
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return best
+
+def report(variants: Dict[str, Callable[[], Any]], rows: int, repeat: int):
+    baseline = None
+    for name, func in variants.items():
+        seconds = best_of(func, repeat)
+        baseline = baseline or seconds
+        print(f"  {name:<22} {seconds * 1000:8.1f} ms  {rows / seconds:>10,.0f} rows/s  {baseline / seconds:.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DB row hydration")
+    parser.add_argument("--rows", type=int, default=100_000, help="Timeline rows to store and read back")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs per variant (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.set_db_path(os.path.join(tmp, "bench.db"))
+        database.init_db()
+        save_timeline_events(make_events(args.rows))
+
+        def raw_tuples():
+            c = database.connection().cursor()
+            c.execute(
+                f"SELECT {', '.join(TIMELINE_EVENT_COLUMNS)} FROM timeline_events "
+                "WHERE match_id = ? AND puuid = ? ORDER BY timestamp ASC",
+                (MATCH_ID, PUUID)
+            )
+            return c.fetchall()
+
+        def stream_trusted():
+            for _ in iter_timeline_events(MATCH_ID, PUUID, trusted=True):
+                pass
+
+        variants = {
+            "validated": lambda: get_timeline_events(MATCH_ID, PUUID),
+            "trusted": lambda: get_timeline_events(MATCH_ID, PUUID, trusted=True),
+            "trusted (iterator)": stream_trusted,
+            "raw rows (no models)": raw_tuples,
+        }
+
+        print(f"Reading {args.rows} timeline rows (query + hydration)")
+        report(variants, args.rows, args.repeat)
+
+        rows = raw_tuples()
+        print("Hydration only (rows already fetched)")
+        report({
+            "validated": lambda: [_timeline_event_from_row(row, False) for row in rows],
+            "trusted": lambda: [_timeline_event_from_row(row, True) for row in rows],
+            "model_construct": lambda: [
+                TimelineEventDto.model_construct(**dict(zip(TIMELINE_EVENT_COLUMNS, row))) for row in rows
+            ],
+        }, args.rows, args.repeat)
+        database.close_connection()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Micro-benchmark for timeline event parsing on a synthetic 35-minute timeline.
+
+Compares the old build-then-filter loop with the dispatch-table parser, and
+the peak memory of decoding the whole document versus streaming it.
+
+    python -m benchmarks.timeline_parsing
+"""
+import argparse
+import gzip
+import io
+import json
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+from src.models import TimelineEventDto
+from src.parsing import ijson_available, parse_timeline_stream, parse_timeline_to_events
+
+MINUTES = 35
+PARTICIPANTS = [f"puuid-{i}" for i in range(1, 11)]
+
+# Rough per-minute mix of a ranked game. Most events are never stored.
+FILLER_EVENTS = {
+    "ITEM_PURCHASED": 12,
+    "ITEM_DESTROYED": 6,
+    "ITEM_UNDO": 1,
+    "SKILL_LEVEL_UP": 5,
+    "LEVEL_UP": 5,
+    "WARD_PLACED": 8,
+    "WARD_KILL": 2,
+}
+
+CHAMPION_STATS = (
+    "abilityHaste", "abilityPower", "armor", "armorPen", "armorPenPercent", "attackDamage", "attackSpeed",
+    "bonusArmorPenPercent", "bonusMagicPenPercent", "ccReduction", "cooldownReduction", "health", "healthMax",
+    "healthRegen", "lifesteal", "magicPen", "magicPenPercent", "magicResist", "movementSpeed", "omnivamp",
+    "physicalVamp", "power", "powerMax", "powerRegen", "spellVamp",
+)
+DAMAGE_STATS = (
+    "magicDamageDone", "magicDamageDoneToChampions", "magicDamageTaken", "physicalDamageDone",
+    "physicalDamageDoneToChampions", "physicalDamageTaken", "totalDamageDone", "totalDamageDoneToChampions",
+    "totalDamageTaken", "trueDamageDone", "trueDamageDoneToChampions", "trueDamageTaken",
+)
+
+def make_timeline(seed: int = 0) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    frames = []
+    for minute in range(MINUTES + 1):
+        base = minute * 60000
+        events = []
+        for event_type, count in FILLER_EVENTS.items():
+            for _ in range(count):
+                events.append({
+                    "type": event_type,
+                    "timestamp": base + rng.randrange(60000),
+                    "participantId": rng.randint(1, 10),
+                    "itemId": 1055,
+                })
+        for _ in range(rng.randint(0, 4)):
+            events.append({
+                "type": "CHAMPION_KILL",
+                "timestamp": base + rng.randrange(60000),
+                "killerId": rng.randint(1, 10),
+                "victimId": rng.randint(1, 10),
+                "assistingParticipantIds": [rng.randint(1, 10)],
+                "position": {"x": rng.randrange(15000), "y": rng.randrange(15000)},
+            })
+        if minute % 5 == 0:
+            events.append({"type": "ELITE_MONSTER_KILL", "timestamp": base + 1, "killerId": rng.randint(1, 10),
+                           "monsterType": "DRAGON", "position": {"x": 9866, "y": 4414}})
+        if minute > 14 and minute % 3 == 0:
+            events.append({"type": "BUILDING_KILL", "timestamp": base + 2, "killerId": rng.randint(1, 10),
+                           "position": {"x": 5846, "y": 6396}})
+        events.sort(key=lambda e: e["timestamp"])
+
+        participant_frames = {
+            str(pid): {
+                "participantId": pid,
+                "currentGold": rng.randrange(3000),
+                "goldPerSecond": 0,
+                "jungleMinionsKilled": minute,
+                "level": min(18, 1 + minute // 2),
+                "timeEnemySpentControlled": rng.randrange(100000),
+                "totalGold": minute * 400,
+                "xp": minute * 500,
+                "minionsKilled": minute * 7,
+                "position": {"x": rng.randrange(15000), "y": rng.randrange(15000)},
+                "championStats": {stat: rng.randrange(500) for stat in CHAMPION_STATS},
+                "damageStats": {stat: rng.randrange(50000) for stat in DAMAGE_STATS},
+            }
+            for pid in range(1, 11)
+        }
+        frames.append({"events": events, "participantFrames": participant_frames, "timestamp": base})
+
+    return {
+        "metadata": {"dataVersion": "2", "matchId": "NA1_BENCH", "participants": PARTICIPANTS},
+        "info": {
+            "frameInterval": 60000,
+            "frames": frames,
+            "participants": [{"participantId": i, "puuid": p} for i, p in enumerate(PARTICIPANTS, start=1)],
+        },
+    }
+
+def legacy_parse(timeline_data: Dict[str, Any], puuid: str) -> List[TimelineEventDto]:
+    """
+    The previous implementation: builds a DTO for every event, then filters.
+    """
+    match_id = timeline_data["metadata"]["matchId"]
+    info = timeline_data["info"]
+    participant_id_map = {p["participantId"]: p["puuid"] for p in info["participants"]}
+    my_pid = next((pid for pid, p_puuid in participant_id_map.items() if p_puuid == puuid), None)
+
+    events = []
+    for frame in info["frames"]:
+        for event in frame["events"]:
+            event_type = event["type"]
+            dto = TimelineEventDto(
+                match_id=match_id,
+                puuid=puuid,
+                timestamp=event["timestamp"],
+                type=event_type,
+                position_x=event.get("position", {}).get("x"),
+                position_y=event.get("position", {}).get("y")
+            )
+            should_add = False
+            if event_type == "CHAMPION_KILL":
+                dto.killer_id = event.get("killerId")
+                dto.victim_id = event.get("victimId")
+                should_add = dto.killer_id == my_pid or dto.victim_id == my_pid
+            elif event_type == "ELITE_MONSTER_KILL":
+                dto.killer_id = event.get("killerId")
+                dto.monster_type = event.get("monsterType")
+                should_add = True
+            elif event_type == "TURRET_PLATE_DESTROYED" or event_type == "BUILDING_KILL":
+                should_add = event.get("killerId") == my_pid
+            if should_add:
+                events.append(dto)
+    return events
+
+def best_of(func: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark timeline event parsing")
+    parser.add_argument("--repeat", type=int, default=20, help="Timing runs per variant (best is reported)")
+    args = parser.parse_args()
+
+    timeline = make_timeline()
+    payload = gzip.compress(json.dumps(timeline, separators=(",", ":")).encode("utf-8"))
+    puuid = PARTICIPANTS[0]
+    total_events = sum(len(frame["events"]) for frame in timeline["info"]["frames"])
+
+    assert legacy_parse(timeline, puuid) == parse_timeline_to_events(timeline, puuid)
+    kept = len(parse_timeline_to_events(timeline, puuid))
+    raw_size = len(gzip.decompress(payload))
+    print(f"Synthetic timeline: {MINUTES} min, {total_events} events ({kept} kept), "
+          f"{raw_size / 1024:.0f} KB JSON / {len(payload) / 1024:.0f} KB gzipped")
+
+    legacy = best_of(lambda: legacy_parse(timeline, puuid), args.repeat)
+    current = best_of(lambda: parse_timeline_to_events(timeline, puuid), args.repeat)
+    print(f"Parse (decoded dict):  legacy {legacy * 1000:.2f} ms | dispatch {current * 1000:.2f} ms | {legacy / current:.1f}x")
+
+    def decode_then_parse():
+        parse_timeline_to_events(json.loads(gzip.decompress(payload)), puuid)
+
+    def stream_parse():
+        parse_timeline_stream(gzip.GzipFile(fileobj=io.BytesIO(payload)), puuid)
+
+    mode = "ijson" if ijson_available() else "json fallback, install ijson"
+    print(f"Peak memory: full decode {peak_memory(decode_then_parse) / 1024:.0f} KB | "
+          f"stream ({mode}) {peak_memory(stream_parse) / 1024:.0f} KB")
+    print(f"Decode + parse time: full {best_of(decode_then_parse, args.repeat) * 1000:.2f} ms | "
+          f"stream {best_of(stream_parse, args.repeat) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse
+from src import storage
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite raw match/timeline files in data/ into a compressed format or archive")
+    parser.add_argument("--format", choices=list(storage.EXTENSIONS), default=storage.RAW_FORMAT,
+                        help=f"Target format (default: {storage.RAW_FORMAT})")
+    parser.add_argument("--to-archive", action="store_true",
+                        help="Move the files into the single-file raw archive (use with LOLAI_RAW_BACKEND=archive)")
+    args = parser.parse_args()
+
+    if args.to_archive:
+        print(f"Moving raw files in {storage.DATA_DIR} into {storage.get_archive().path} as '{args.format}'...")
+        summary = storage.archive_raw_files(args.format)
+    else:
+        print(f"Migrating raw files in {storage.DATA_DIR} to '{args.format}'...")
+        summary = storage.migrate_raw_files(args.format)
+
+    if not summary["files"]:
+        print("Nothing to migrate.")
+        return
+
+    saved = summary["bytes_before"] - summary["bytes_after"]
+    ratio = saved / summary["bytes_before"] * 100 if summary["bytes_before"] else 0
+    print(f"Rewrote {summary['files']} files: "
+          f"{summary['bytes_before'] / 1e6:.1f} MB -> {summary['bytes_after'] / 1e6:.1f} MB "
+          f"(saved {saved / 1e6:.1f} MB, {ratio:.0f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,20 @@
 import os
 import argparse
-import time
-from typing import List
-from src.riot import RiotClient
-from src.storage import save_match_data, save_timeline_data
-from src.database import init_db, save_game_stats, save_timeline_events
-from src.parsing import parse_match_to_stats, parse_timeline_to_events
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from pydantic import BaseModel
+from src.accounts import resolve_puuid
+from src.riot import AsyncRiotClient, RiotClient, DEFAULT_MAX_CONNECTIONS
+from src.ratelimit import RateLimiter, SQLiteBucketStore
+from src.response_cache import ResponseCache
+from src.storage import raw_exists, save_match_data, save_timeline_data
+from src.database import (
+    get_sync_state, init_db, save_all_game_stats, save_timeline_events, transaction, update_sync_state
+)
+from src.models import GameStatsDto, TimelineEventDto
+from src.frames import ParticipantFrames, parse_participant_frames, save_participant_frames
+from src.parsing import parse_match_to_all_stats, parse_timeline_to_all_events, timeline_event_keys
+from src.pipeline import Pipeline, Stage
 
 def get_puuid_from_env() -> str:
     # In a real app we might fetch this from Summoner Name if not in env
@@ -15,78 +24,396 @@ def get_puuid_from_env() -> str:
         raise ValueError("RIOT_PUUID not found in environment variables.")
     return puuid
 
-def file_exists(filename: str) -> bool:
-    return os.path.exists(os.path.join(os.getcwd(), "data", filename))
+class Paging(BaseModel):
+    # True once iter_match_ids reached stop_at or the end of the match list
+    complete: bool = False
 
-def fetch_history(puuid: str, count: int = 20):
-    init_db()
-    client = RiotClient()
-    print(f"Fetching last {count} matches for PUUID: {puuid}...")
-
-    matches_fetched = 0
+def iter_match_ids(
+    client: RiotClient,
+    puuid: str,
+    count: int,
+    start_time: Optional[int] = None,
+    stop_at: Optional[str] = None,
+    paging: Optional[Paging] = None
+) -> Iterator[str]:
+    """
+    Pages through the user's match IDs, newest first, yielding at most `count`.
+    `start_time` (epoch seconds) asks only for matches played since then, and
+    paging stops before `stop_at`, the newest match of the previous sync.
+    `paging.complete` is set when it got there (or to the end of the list)
+    rather than stopping at `count`.
+    """
+    matches_seen = 0
     start_index = 0
     batch_size = 100 # Max allowed by Riot is 100
 
-    while matches_fetched < count:
-        current_batch_size = min(batch_size, count - matches_fetched)
+    while matches_seen < count:
+        current_batch_size = min(batch_size, count - matches_seen)
         print(f" Requesting batch: start={start_index}, count={current_batch_size}")
-        
-        match_ids = client.get_match_ids_by_puuid(puuid, start=start_index, count=current_batch_size)
-        
+
+        match_ids = client.get_match_ids_by_puuid(
+            puuid, start=start_index, count=current_batch_size, start_time=start_time
+        )
+
         if not match_ids:
             print("No more matches found.")
-            break
+            if paging is not None:
+                paging.complete = True
+            return
 
         print(f" Found {len(match_ids)} match IDs.")
+        for match_id in match_ids:
+            if match_id == stop_at:
+                print(f" Reached {match_id}, already synced.")
+                if paging is not None:
+                    paging.complete = True
+                return
+            yield match_id
+        matches_seen += len(match_ids)
+        start_index += len(match_ids)
+
+        # Stop if we got fewer than requested (end of history)
+        if len(match_ids) < current_batch_size:
+            if paging is not None:
+                paging.complete = True
+            return
 
+async def iter_match_ids_async(
+    client: AsyncRiotClient,
+    puuid: str,
+    count: int,
+    start_time: Optional[int] = None,
+    stop_at: Optional[str] = None,
+    paging: Optional[Paging] = None
+) -> AsyncIterator[str]:
+    """
+    asyncio version of `iter_match_ids`.
+    """
+    matches_seen = 0
+    start_index = 0
+    batch_size = 100
+
+    while matches_seen < count:
+        current_batch_size = min(batch_size, count - matches_seen)
+        print(f" Requesting batch: start={start_index}, count={current_batch_size}")
+
+        match_ids = await client.get_match_ids_by_puuid(
+            puuid, start=start_index, count=current_batch_size, start_time=start_time
+        )
+
+        if not match_ids:
+            print("No more matches found.")
+            if paging is not None:
+                paging.complete = True
+            return
+
+        print(f" Found {len(match_ids)} match IDs.")
         for match_id in match_ids:
-            # Check for existing
-            if file_exists(f"match_{match_id}.json") and file_exists(f"timeline_{match_id}.json"):
+            if match_id == stop_at:
+                print(f" Reached {match_id}, already synced.")
+                if paging is not None:
+                    paging.complete = True
+                return
+            yield match_id
+        matches_seen += len(match_ids)
+        start_index += len(match_ids)
+
+        if len(match_ids) < current_batch_size:
+            if paging is not None:
+                paging.complete = True
+            return
+
+def sync_window(puuid: str, full: bool = False) -> Tuple[Optional[int], Optional[str]]:
+    """
+    (start_time, stop_at) for `iter_match_ids`: only games since the last
+    completed sync, or the whole `--count` window with `full` or on the
+    first sync.
+    """
+    state = None if full else get_sync_state(puuid)
+    if state is None or state["newest_game_creation"] is None:
+        return None, None
+    print(f"Incremental sync: games since {state['newest_match_id']}.")
+    # game_creation is in milliseconds, startTime in seconds
+    return state["newest_game_creation"] // 1000, state["newest_match_id"]
+
+def finish_sync(puuid: str, failed: int, incremental: bool, paging: Paging):
+    """
+    Moves the sync watermark up to the newest stored game, unless games
+    between it and the previous watermark may be missing: after failures, or
+    when an incremental sync stopped at `--count` before reaching the
+    previous sync. The next sync then pages over them again.
+    """
+    if failed:
+        print(f"{failed} match(es) failed; keeping the previous sync point so they are retried.")
+    elif incremental and not paging.complete:
+        print("Stopped at --count before reaching the previous sync; keeping the previous sync point "
+              "so a later run fetches the rest.")
+    else:
+        update_sync_state(puuid)
+
+def already_downloaded(match_id: str) -> bool:
+    # Raw files may be in any supported format (legacy .json or compressed)
+    return raw_exists("match", match_id) and raw_exists("timeline", match_id)
+
+def parse_match_stats(match_data: Dict[str, Any], puuid: str) -> Optional[List[GameStatsDto]]:
+    """
+    Parses stats for every participant, so one download fills `game_stats`
+    for everyone in the game. Returns None (with a note) if that fails.
+    """
+    try:
+        stats = parse_match_to_all_stats(match_data)
+    except Exception as pe:
+         print(f"   -> Warning: Failed to parse stats: {pe}")
+         return None
+
+    if not any(s.puuid == puuid for s in stats):
+         print(f"   -> Info: Participant with PUUID {puuid} not found in match {match_data['metadata']['matchId']} "
+               "(User likely not in this match)")
+    return stats
+
+def parse_timeline_events(timeline_data: Dict[str, Any]) -> Optional[List[TimelineEventDto]]:
+    """
+    Parses events for every participant, or returns None (with a note) if that fails.
+    """
+    try:
+        return parse_timeline_to_all_events(timeline_data)
+    except Exception as pe:
+        print(f"   -> Warning: Failed to parse events: {pe}")
+    return None
+
+def parse_timeline_frames(timeline_data: Dict[str, Any]) -> Optional[ParticipantFrames]:
+    """
+    Parses per-minute participant frames, or returns None (with a note) if that fails.
+    """
+    try:
+        return parse_participant_frames(timeline_data)
+    except Exception as pe:
+        print(f"   -> Warning: Failed to parse frames: {pe}")
+    return None
+
+def ingest_match(match_id: str, match_data: Dict[str, Any], puuid: str):
+    """
+    Saves the raw match and its parsed stats for all participants.
+    """
+    save_match_data(match_id, match_data)
+
+    # Parse & Save Match Stats
+    stats = parse_match_stats(match_data, puuid)
+    if stats is not None:
+        save_all_game_stats(stats)
+
+def ingest_timeline(match_id: str, timeline_data: Dict[str, Any], puuid: str):
+    """
+    Saves the raw timeline, its parsed events for all participants and its
+    participant frames.
+    """
+    save_timeline_data(match_id, timeline_data)
+
+    # Parse & Save Events
+    events = parse_timeline_events(timeline_data)
+    if events is not None:
+        save_timeline_events(events, keys=timeline_event_keys(timeline_data))
+
+    frames = parse_timeline_frames(timeline_data)
+    if frames is not None:
+        save_participant_frames(frames)
+
+def print_pool_stats(client):
+    stats = client.pool_stats()
+    print(f"Connection pool: {stats['requests']} requests, "
+          f"{stats['connections_opened']} connections opened, {stats['connections_reused']} reused.")
+
+def print_cache_stats(cache: ResponseCache):
+    stats = cache.stats()
+    print(f"Response cache: {stats['memory_hits']} memory hits, {stats['raw_hits']} raw store hits, "
+          f"{stats['misses']} misses, {stats['deduplicated']} deduplicated.")
+
+def fetch_history(puuid: str, count: int = 20, client: Optional[RiotClient] = None, full: bool = False):
+    init_db()
+    owns_client = client is None
+    if owns_client:
+        client = RiotClient()
+    print(f"Fetching last {count} matches for PUUID: {puuid}...")
+    start_time, stop_at = sync_window(puuid, full)
+    paging = Paging()
+    failed = 0
+
+    for match_id in iter_match_ids(client, puuid, count, start_time, stop_at, paging):
+        # Check for existing
+        if already_downloaded(match_id):
+            print(f"  [Skipping] {match_id} (already exists)")
+            continue
+
+        print(f"  [Fetching] {match_id}...")
+
+        try:
+            # Fetch Match
+            match_data = client.get_match(match_id)
+            ingest_match(match_id, match_data, puuid)
+
+            # Fetch Timeline
+            timeline_data = client.get_match_timeline(match_id)
+            ingest_timeline(match_id, timeline_data, puuid)
+
+            print("   -> Saved & Processed.")
+        except Exception as e:
+            print(f"   -> Error fetching/processing {match_id}: {e}")
+            failed += 1
+
+    finish_sync(puuid, failed, stop_at is not None, paging)
+    print_pool_stats(client)
+    if owns_client:
+        client.close()
+    print("Done.")
+
+async def fetch_history_concurrent(
+    puuid: str,
+    count: int = 20,
+    concurrency: int = 8,
+    client: Optional[AsyncRiotClient] = None,
+    full: bool = False
+):
+    """
+    Same as `fetch_history`, but downloads up to `concurrency` matches (match +
+    timeline each) at once. Saving and parsing stay on the event loop thread,
+    so DB writes are still serialized.
+    """
+    init_db()
+    owns_client = client is None
+    if owns_client:
+        client = AsyncRiotClient(max_connections=max(DEFAULT_MAX_CONNECTIONS, 2 * concurrency))
+    print(f"Fetching last {count} matches for PUUID: {puuid} (concurrency={concurrency})...")
+
+    start_time, stop_at = sync_window(puuid, full)
+    paging = Paging()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(match_id: str) -> bool:
+        async with semaphore:
+            print(f"  [Fetching] {match_id}...")
+            match_data, timeline_data = await asyncio.gather(
+                client.get_match(match_id),
+                client.get_match_timeline(match_id),
+                return_exceptions=True
+            )
+
+        try:
+            if isinstance(match_data, Exception):
+                raise match_data
+            ingest_match(match_id, match_data, puuid)
+
+            if isinstance(timeline_data, Exception):
+                raise timeline_data
+            ingest_timeline(match_id, timeline_data, puuid)
+
+            print(f"   -> {match_id} Saved & Processed.")
+            return True
+        except Exception as e:
+            print(f"   -> Error fetching/processing {match_id}: {e}")
+            return False
+
+    try:
+        tasks = []
+        async for match_id in iter_match_ids_async(client, puuid, count, start_time, stop_at, paging):
+            if already_downloaded(match_id):
                 print(f"  [Skipping] {match_id} (already exists)")
-                matches_fetched += 1
                 continue
+            tasks.append(asyncio.create_task(fetch_one(match_id)))
+        results = await asyncio.gather(*tasks)
 
-            print(f"  [Fetching] {match_id}...")
-            
-            try:
-                # Fetch Match
-                match_data = client.get_match(match_id)
-                save_match_data(match_id, match_data)
-
-                # Parse & Save Match Stats
-                try:
-                    stats = parse_match_to_stats(match_data, puuid)
-                    save_game_stats(stats)
-                except ValueError as ve:
-                     print(f"   -> Info: {ve} (User likely not in this match)")
-                except Exception as pe:
-                     print(f"   -> Warning: Failed to parse stats: {pe}")
-
-                # Fetch Timeline
-                timeline_data = client.get_match_timeline(match_id)
-                save_timeline_data(match_id, timeline_data)
-                
-                # Parse & Save Events
-                try:
-                    events = parse_timeline_to_events(timeline_data, puuid)
-                    save_timeline_events(events)
-                except Exception as pe:
-                    print(f"   -> Warning: Failed to parse events: {pe}")
-                
-                print(f"   -> Saved & Processed.")
-            except Exception as e:
-                print(f"   -> Error fetching/processing {match_id}: {e}")
-                
-            matches_fetched += 1
-            if matches_fetched >= count:
-                break
-        
-        start_index += len(match_ids)
-        
-        # Stop if we got fewer than requested (end of history)
-        if len(match_ids) < current_batch_size:
-             break
+        finish_sync(puuid, results.count(False), stop_at is not None, paging)
 
+        print_pool_stats(client)
+    finally:
+        if owns_client:
+            await client.close()
+    print("Done.")
+
+def fetch_history_pipeline(
+    puuid: str,
+    count: int = 20,
+    client: Optional[RiotClient] = None,
+    download_workers: int = 4,
+    queue_size: int = 32,
+    db_batch_size: int = 50,
+    report_interval: float = 5.0,
+    full: bool = False
+):
+    """
+    Same as `fetch_history`, but split into stages connected by bounded queues:
+    ID paging -> download -> raw persist -> parse -> batched DB writer.
+    A slow disk or a long commit only backs up its own queue, and the bounded
+    queues keep memory flat when a later stage falls behind.
+    """
+    init_db()
+    owns_client = client is None
+    if owns_client:
+        client = RiotClient(max_connections=max(DEFAULT_MAX_CONNECTIONS, 2 * download_workers))
+    print(f"Fetching last {count} matches for PUUID: {puuid} (pipeline, {download_workers} download workers)...")
+
+    start_time, stop_at = sync_window(puuid, full)
+    paging = Paging()
+
+    def page_ids(target_puuid: str, emit):
+        for match_id in iter_match_ids(client, target_puuid, count, start_time, stop_at, paging):
+            if already_downloaded(match_id):
+                print(f"  [Skipping] {match_id} (already exists)")
+                continue
+            emit(match_id)
+
+    def download(match_id: str, emit):
+        print(f"  [Fetching] {match_id}...")
+        match_data = client.get_match(match_id)
+        try:
+            timeline_data = client.get_match_timeline(match_id)
+        except Exception as e:
+            # Keep the match, like the serial path does
+            print(f"   -> Error fetching timeline for {match_id}: {e}")
+            timeline_data = None
+        emit((match_id, match_data, timeline_data))
+
+    def persist(item, emit):
+        match_id, match_data, timeline_data = item
+        save_match_data(match_id, match_data)
+        if timeline_data is not None:
+            save_timeline_data(match_id, timeline_data)
+        emit(item)
+
+    def parse(item, emit):
+        match_id, match_data, timeline_data = item
+        stats = parse_match_stats(match_data, puuid)
+        events = parse_timeline_events(timeline_data) if timeline_data is not None else None
+        keys = timeline_event_keys(timeline_data) if events is not None else None
+        frames = parse_timeline_frames(timeline_data) if timeline_data is not None else None
+        emit((match_id, stats, events, keys, frames))
+
+    def write(batch, emit):
+        # One commit for the whole batch
+        with transaction():
+            for match_id, stats, events, keys, frames in batch:
+                if stats is not None:
+                    save_all_game_stats(stats)
+                if events is not None:
+                    save_timeline_events(events, keys=keys)
+                if frames is not None:
+                    save_participant_frames(frames)
+        print(f"   -> Saved & Processed {len(batch)} matches.")
+
+    pipeline = Pipeline([
+        Stage("ids", page_ids, queue_size=1),
+        Stage("download", download, workers=download_workers, queue_size=queue_size),
+        Stage("persist", persist, queue_size=queue_size),
+        Stage("parse", parse, queue_size=queue_size),
+        Stage("db", write, queue_size=queue_size, batch_size=db_batch_size),
+    ], report_interval=report_interval)
+
+    try:
+        stats = pipeline.run([puuid])
+        finish_sync(puuid, sum(stage["errors"] for stage in stats), stop_at is not None, paging)
+        print_pool_stats(client)
+    finally:
+        if owns_client:
+            client.close()
     print("Done.")
 
 if __name__ == "__main__":
@@ -94,25 +421,52 @@ if __name__ == "__main__":
     parser.add_argument("--count", type=int, default=20, help="Number of matches to fetch")
     parser.add_argument("--user", help="Riot ID (GameName#TagLine)")
     parser.add_argument("--puuid", help="Direct PUUID")
+    parser.add_argument("--http2", action="store_true", help="Multiplex requests over HTTP/2 (requires h2)")
+    parser.add_argument("--rate-limit-store", help="SQLite file to share rate limit budget between concurrent runs")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of matches to download in parallel")
+    parser.add_argument("--pipeline", action="store_true", help="Run as a staged pipeline (download/persist/parse/DB in parallel)")
+    parser.add_argument("--full", action="store_true", help="Walk the whole --count window instead of only games since the last sync")
+    parser.add_argument("--no-response-cache", action="store_true", help="Download matches again even if they are in the raw store")
     args = parser.parse_args()
 
-    client = RiotClient()
+    store = SQLiteBucketStore(args.rate_limit_store) if args.rate_limit_store else None
+    rate_limiter = RateLimiter(store=store)
+    response_cache = ResponseCache(raw_store=not args.no_response_cache)
+    client = RiotClient(http2=args.http2, rate_limiter=rate_limiter, cache=response_cache)
     target_puuid = None
 
     try:
         if args.puuid:
             target_puuid = args.puuid
         elif args.user:
-            if "#" not in args.user:
-                raise ValueError("User must be in format GameName#TagLine")
-            name, tag = args.user.split("#")
             print(f"Resolving PUUID for {args.user}...")
-            account = client.get_account_by_riot_id(name, tag)
-            target_puuid = account["puuid"]
+            init_db()
+            target_puuid = resolve_puuid(args.user, client)
         else:
             # Fallback to env
             target_puuid = get_puuid_from_env()
 
-        fetch_history(puuid=target_puuid, count=args.count)
+        if args.pipeline:
+            fetch_history_pipeline(
+                puuid=target_puuid, count=args.count, client=client, download_workers=args.concurrency, full=args.full
+            )
+        elif args.concurrency > 1:
+            async def run_concurrent():
+                async with AsyncRiotClient(
+                    http2=args.http2,
+                    rate_limiter=rate_limiter,
+                    cache=response_cache,
+                    max_connections=max(DEFAULT_MAX_CONNECTIONS, 2 * args.concurrency)
+                ) as async_client:
+                    await fetch_history_concurrent(
+                        puuid=target_puuid, count=args.count, concurrency=args.concurrency, client=async_client,
+                        full=args.full
+                    )
+            asyncio.run(run_concurrent())
+        else:
+            fetch_history(puuid=target_puuid, count=args.count, client=client, full=args.full)
+        print_cache_stats(response_cache)
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        client.close()
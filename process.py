@@ -1,94 +1,200 @@
 import argparse
 import os
-import json
-import glob
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
-from src.database import init_db, save_game_stats, save_timeline_events
-from src.parsing import parse_match_to_stats, parse_timeline_to_events
-from src.riot import RiotClient
+from src import storage
+from src.accounts import resolve_puuid
+from src.baselines import refresh_baselines
+from src.database import (
+    init_db, get_processed_inputs, mark_processed, save_all_game_stats, save_timeline_events, transaction
+)
+from src.frames import FrameCollector, ParticipantFrames, parse_participant_frames, save_participant_frames
+from src.models import GameStatsDto, TimelineEventDto
+from src.parsing import (
+    PARSER_VERSION, parse_match_to_all_stats, parse_match_to_stats, parse_timeline_stream,
+    parse_timeline_to_all_events, parse_timeline_to_events
+)
+from src.storage import RawEntry, iter_raw_entries, load_raw_entry, open_raw_entry
 
 load_dotenv()
 
-DATA_DIR = os.path.join(os.getcwd(), "data")
+# Entries per work unit. Each parsed chunk is written in one transaction.
+CHUNK_SIZE = 50
 
-def process_data(target_puuid: str = None):
+# Manifest key used instead of a PUUID when every participant is parsed.
+ALL_PARTICIPANTS = "*"
+
+def _parse_match(entry: RawEntry, puuid: str, stream: bool = False) -> Tuple[Optional[List[GameStatsDto]], str]:
+    match_data = load_raw_entry(entry)
+
+    if puuid == ALL_PARTICIPANTS:
+        stats = parse_match_to_all_stats(match_data)
+        return stats, f" Done ({len(stats)} participants)."
+
+    # parse_match_to_stats raises ValueError if the user is not in the match
+    try:
+        return [parse_match_to_stats(match_data, puuid)], " Done."
+    except ValueError:
+        return None, " Skipped (User not in match)."
+
+def _parse_timeline(
+    entry: RawEntry,
+    puuid: str,
+    stream: bool = False
+) -> Tuple[Tuple[List[TimelineEventDto], ParticipantFrames], str]:
+    if stream:
+        # Lower peak memory for large timelines, at some CPU cost
+        collector = FrameCollector()
+        with open_raw_entry(entry) as f:
+            events = parse_timeline_stream(f, None if puuid == ALL_PARTICIPANTS else puuid, frames=collector)
+        frames = collector.build()
+    else:
+        timeline_data = load_raw_entry(entry)
+        if puuid == ALL_PARTICIPANTS:
+            events = parse_timeline_to_all_events(timeline_data)
+        else:
+            events = parse_timeline_to_events(timeline_data, puuid)
+        frames = parse_participant_frames(timeline_data)
+    return (events, frames), f" Done ({len(events)} events, {frames.minutes} frames)."
+
+PARSERS = {"match": _parse_match, "timeline": _parse_timeline}
+LABELS = {"match": "Parsing Match", "timeline": "Parsing Timeline"}
+
+def parse_entries(entries: List[RawEntry], puuid: str, stream: bool = False) -> List[Tuple[RawEntry, Any, str, bool]]:
+    """
+    Decodes and parses a chunk of raw entries. This is the CPU-bound part and
+    runs in worker processes when --workers > 1.
+    Returns (entry, parsed rows, status note, ok) per entry.
+    With `stream`, timelines are decoded incrementally (see parse_timeline_stream).
+    """
+    results = []
+    for entry in entries:
+        try:
+            rows, note = PARSERS[entry.kind](entry, puuid, stream)
+            results.append((entry, rows, note, True))
+        except Exception as e:
+            results.append((entry, None, f" Failed: {e}", False))
+    return results
+
+def write_results(results: List[Tuple[RawEntry, Any, str, bool]], puuid: str) -> int:
+    """
+    Writes one parsed chunk and its manifest entries in a single transaction.
+    Only ever called from the main process, so there is a single DB writer.
+    If the write fails (e.g. "database is locked"), the chunk is rolled back
+    and its entries are reported as failed; they stay unprocessed for the
+    next run.
+    """
+    written = 0
+    try:
+        with transaction():
+            for entry, rows, note, ok in results:
+                if not ok:
+                    continue
+                if entry.kind == "match" and rows is not None:
+                    save_all_game_stats(rows)
+                elif entry.kind == "timeline":
+                    events, frames = rows
+                    owners = frames.puuids if puuid == ALL_PARTICIPANTS else [puuid]
+                    save_timeline_events(events, keys=[(entry.match_id, owner) for owner in owners])
+                    save_participant_frames(frames)
+                mark_processed(entry.match_id, entry.kind, puuid, entry.fingerprint, PARSER_VERSION)
+                written += 1
+    except Exception as e:
+        written = 0
+        results = [(entry, rows, note if not ok else f" Failed: {e}", ok) for entry, rows, note, ok in results]
+    for entry, _, note, _ in results:
+        print(f"{LABELS[entry.kind]}: {entry.match_id}...{note}")
+    return written
+
+def _iter_chunks(items: Iterable[RawEntry], size: int) -> Iterator[List[RawEntry]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _init_worker():
+    # Never reuse a SQLite handle inherited from the parent process
+    storage._archive = None
+
+def _ingest_chunks(chunks: Iterator[List[RawEntry]], puuid: str, workers: int, stream: bool = False) -> int:
+    if workers <= 1:
+        return sum(write_results(parse_entries(chunk, puuid, stream), puuid) for chunk in chunks)
+
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # Keep a bounded number of chunks in flight, so discovery stays lazy
+        # and parsed results are streamed back instead of piling up.
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(parse_entries, chunk, puuid, stream))
+            if len(in_flight) >= 2 * workers:
+                written += write_results(in_flight.popleft().result(), puuid)
+        while in_flight:
+            written += write_results(in_flight.popleft().result(), puuid)
+    return written
+
+def process_data(target_puuid: str = None, rebuild: bool = False, workers: int = 1, all_participants: bool = False,
+                 stream: bool = False):
     print("Initializing Database...")
     init_db()
     
     # Try to find PUUID from args or env
-    puuid = target_puuid or os.getenv("RIOT_PUUID")
+    puuid = ALL_PARTICIPANTS if all_participants else target_puuid or os.getenv("RIOT_PUUID")
 
     if not puuid:
         print("Error: No PUUID provided. Use --user, --puuid, or set RIOT_PUUID env var.")
         return
 
-    print(f"Processing data for PUUID: {puuid}")
-    
-    # 1. Process Matches
-    match_files = glob.glob(os.path.join(DATA_DIR, "match_*.json"))
-    print(f"Found {len(match_files)} match files.")
-    
-    for match_file in match_files:
-        try:
-            with open(match_file, 'r') as f:
-                match_data = json.load(f)
-            
-            match_id = match_data["metadata"]["matchId"]
-            # Optimization: check if stats already exist? For now, overwrite/ignore is handled by DB logic (replace)
-            
-            # Additional check: Is this user in the match?
-            # parse_match_to_stats raises error if not.
-            
-            print(f"Parsing Match: {match_id}...", end="")
-            
-            try:
-                stats = parse_match_to_stats(match_data, puuid)
-                save_game_stats(stats)
-                print(" Done.")
-            except ValueError:
-                print(" Skipped (User not in match).")
-            
-        except Exception as e:
-            print(f" Failed: {e}")
+    target = "all participants" if puuid == ALL_PARTICIPANTS else f"PUUID: {puuid}"
+    print(f"Processing data for {target}" + (f" ({workers} workers)" if workers > 1 else ""))
 
-    # 2. Process Timelines
-    timeline_files = glob.glob(os.path.join(DATA_DIR, "timeline_*.json"))
-    print(f"Found {len(timeline_files)} timeline files.")
-    
-    for timeline_file in timeline_files:
-        try:
-            with open(timeline_file, 'r') as f:
-                timeline_data = json.load(f)
-                
-            match_id = timeline_data["metadata"]["matchId"]
-            print(f"Parsing Timeline: {match_id}...", end="")
-            
-            events = parse_timeline_to_events(timeline_data, puuid)
-            save_timeline_events(events)
-            print(f" Done ({len(events)} events).")
-            
-        except Exception as e:
-            print(f" Failed: {e}")
+    # 1. Process Matches, 2. Process Timelines
+    for kind in ("match", "timeline"):
+        # Inputs whose fingerprint and parser version match the manifest are unchanged
+        processed = {} if rebuild else get_processed_inputs(kind, puuid)
+        unchanged = 0
+
+        def pending_entries():
+            nonlocal unchanged
+            for entry in iter_raw_entries(kind):
+                if processed.get(entry.match_id) == (entry.fingerprint, PARSER_VERSION):
+                    unchanged += 1
+                    continue
+                yield entry
+
+        ingested = _ingest_chunks(_iter_chunks(pending_entries(), CHUNK_SIZE), puuid, workers, stream)
+        print(f"{kind.capitalize()} files: {ingested} processed, {unchanged} unchanged.")
+
+    # Recompute percentiles only for the cohorts the new games touched
+    refreshed = refresh_baselines()
+    if refreshed:
+        print(f"Baselines: {refreshed} cohorts refreshed.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Process raw JSON files into Database")
     parser.add_argument("--user", help="Riot ID (GameName#TagLine) to resolve PUUID")
     parser.add_argument("--puuid", help="Direct PUUID")
+    parser.add_argument("--rebuild", action="store_true", help="Reprocess every input, ignoring the processed-file manifest")
+    parser.add_argument("--workers", type=int, default=1, help="Parse in N worker processes")
+    parser.add_argument("--all-participants", action="store_true", help="Parse stats and events for every player in each match")
+    parser.add_argument("--stream", action="store_true", help="Decode timelines incrementally to lower peak memory (faster with ijson installed)")
     args = parser.parse_args()
 
     resolved_puuid = args.puuid
     
     if args.user and not resolved_puuid:
-        if "#" not in args.user:
-            print("Error: User must be in format GameName#TagLine")
-        else:
-            name, tag = args.user.split("#")
-            print(f"Resolving PUUID for {args.user}...")
-            try:
-                client = RiotClient()
-                account = client.get_account_by_riot_id(name, tag)
-                resolved_puuid = account["puuid"]
-            except Exception as e:
-                print(f"Error resolving user: {e}")
+        print(f"Resolving PUUID for {args.user}...")
+        try:
+            init_db()
+            resolved_puuid = resolve_puuid(args.user)
+        except Exception as e:
+            print(f"Error resolving user: {e}")
     
-    process_data(resolved_puuid)
+    process_data(resolved_puuid, rebuild=args.rebuild, workers=args.workers, all_participants=args.all_participants,
+                 stream=args.stream)
@@ -0,0 +1,116 @@
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from pydantic import BaseModel
+from src.database import connection, transaction
+from src.riot import RiotClient
+
+# PUUIDs never change, but a Riot ID can be renamed or taken over by another
+# account, so resolved IDs are looked up again after this many seconds.
+DEFAULT_TTL = 30 * 24 * 3600
+
+class Account(BaseModel):
+    game_name: str
+    tag_line: str
+    puuid: str
+    fetched_at: int
+
+def parse_riot_id(riot_id: str) -> Tuple[str, str]:
+    """
+    "GameName#TagLine" -> (game_name, tag_line).
+    """
+    name, sep, tag = riot_id.partition("#")
+    if not sep or not name or not tag:
+        raise ValueError("User must be in format GameName#TagLine")
+    return name, tag
+
+def riot_id_key(game_name: str, tag_line: str) -> str:
+    """
+    Riot IDs are case-insensitive: "faker#KR1" and "Faker#kr1" are one account.
+    """
+    return f"{game_name}#{tag_line}".casefold()
+
+def get_cached_accounts(riot_ids: Iterable[str]) -> Dict[str, Account]:
+    """
+    Stored accounts of the given Riot IDs, in one query, keyed by the IDs as
+    given. Missing IDs are left out; expired ones are included.
+    """
+    keys = {riot_id_key(*parse_riot_id(riot_id)): riot_id for riot_id in riot_ids}
+    if not keys:
+        return {}
+    placeholders = ", ".join("?" * len(keys))
+    rows = connection().execute(f'''
+        SELECT riot_id_key, game_name, tag_line, puuid, fetched_at FROM accounts
+        WHERE riot_id_key IN ({placeholders})
+    ''', list(keys)).fetchall()
+    return {
+        keys[row["riot_id_key"]]: Account(
+            game_name=row["game_name"], tag_line=row["tag_line"], puuid=row["puuid"], fetched_at=row["fetched_at"]
+        )
+        for row in rows
+    }
+
+def save_account(account: Account) -> None:
+    with transaction() as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO accounts (riot_id_key, game_name, tag_line, puuid, fetched_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (
+            riot_id_key(account.game_name, account.tag_line),
+            account.game_name, account.tag_line, account.puuid, account.fetched_at
+        ))
+
+def resolve_puuids(
+    riot_ids: List[str],
+    client: Optional[RiotClient] = None,
+    max_age: float = DEFAULT_TTL,
+    refresh: bool = False,
+    clock: Callable[[], float] = time.time,
+) -> Dict[str, str]:
+    """
+    {riot_id: puuid} for "GameName#TagLine" IDs. Accounts stored less than
+    `max_age` seconds ago are answered from the accounts table; only the rest
+    hit account-v1, on `client` (a `RiotClient` is opened only if needed).
+    `refresh` looks every ID up again.
+    When a lookup fails, an expired entry is still used so runs work offline;
+    without one the error is raised.
+    """
+    now = int(clock())
+    known = get_cached_accounts(riot_ids)
+    result = {} if refresh else {
+        riot_id: account.puuid for riot_id, account in known.items() if account.fetched_at >= now - max_age
+    }
+    missing = [riot_id for riot_id in dict.fromkeys(riot_ids) if riot_id not in result]
+    if not missing:
+        return result
+
+    owns_client = client is None
+    try:
+        for riot_id in missing:
+            name, tag = parse_riot_id(riot_id)
+            try:
+                if client is None:
+                    client = RiotClient()
+                data = client.get_account_by_riot_id(name, tag)
+            except Exception:
+                if riot_id not in known:
+                    raise
+                result[riot_id] = known[riot_id].puuid
+                continue
+            # Stored under the canonical spelling Riot returns
+            save_account(Account(
+                game_name=data.get("gameName") or name,
+                tag_line=data.get("tagLine") or tag,
+                puuid=data["puuid"],
+                fetched_at=now,
+            ))
+            result[riot_id] = data["puuid"]
+    finally:
+        if owns_client and client is not None:
+            client.close()
+    return result
+
+def resolve_puuid(riot_id: str, client: Optional[RiotClient] = None, refresh: bool = False) -> str:
+    """
+    PUUID of one "GameName#TagLine", see `resolve_puuids`.
+    """
+    return resolve_puuids([riot_id], client, refresh=refresh)[riot_id]
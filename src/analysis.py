@@ -1,9 +1,10 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Optional, Tuple
 from pydantic import BaseModel
-from src.models import GameStatsDto
-from src.database import get_recent_games
+from src.database import get_stats_summary
+from src.baselines import MIN_COHORT_GAMES, Baseline, Baselines, load_baselines
 
 class AnalysisReport(BaseModel):
+    group: Optional[str] = None # Champion or position, when grouped
     games_analyzed: int
     win_rate: float
     avg_kda: float
@@ -17,39 +18,97 @@ class AnalysisReport(BaseModel):
     vision_diff: str
 
 class AnalysisEngine:
-    # Hardcoded baselines for MVP (approx Gold/Plat average)
+    # Fallback medians while the local corpus is too small for a cohort
+    # baseline (approx Gold/Plat average); p25 is taken as 80% of these.
     BASELINE_KDA = 3.0
     BASELINE_CSPM = 6.5
-    BASELINE_VISION = 20.0 # Dependent on role/length, but using static for MVP
-
-    def get_user_stats(self, puuid: str, limit: int = 20) -> Optional[AnalysisReport]:
-        games = get_recent_games(puuid, limit)
-        if not games:
-            return None
-            
-        count = len(games)
-        wins = sum(1 for g in games if g.win)
-        avg_kda = sum(g.kda for g in games) / count
-        avg_cspm = sum(g.cs_per_minute for g in games) / count
-        avg_gpm = sum(g.gold_per_minute for g in games) / count
-        avg_vision = sum(g.vision_score for g in games) / count
-        
+    BASELINE_VISION = 20.0
+
+    def get_user_stats(self, puuid: str, limit: Optional[int] = 20) -> Optional[AnalysisReport]:
+        """
+        Report over the `limit` most recent games (None = all games).
+        """
+        overall, _ = self.get_grouped_stats(puuid, limit)
+        return overall
+
+    def get_grouped_stats(
+        self,
+        puuid: str,
+        limit: Optional[int] = 20,
+        group_by: Optional[str] = None
+    ) -> Tuple[Optional[AnalysisReport], List[AnalysisReport]]:
+        """
+        Overall report plus one report per champion or team_position
+        (`group_by`), all aggregated by a single SQL query.
+        Each report is graded against the percentiles of its cohort: the
+        champion or position of a group, and for the overall report the
+        position baselines weighted by how often the player played each role.
+        """
+        rows = get_stats_summary(puuid, limit, group_by)
+        if not rows or rows[0]["games"] == 0:
+            return None, []
+
+        baselines = load_baselines()
+        positions = rows[1:] if group_by == "team_position" else get_stats_summary(puuid, limit, "team_position")[1:]
+        overall = self._build_report(rows[0], self._blend([
+            (self._cohort(baselines, "team_position", row["grp"]), row["games"]) for row in positions
+        ]))
+        groups = [
+            self._build_report(row, self._cohort(baselines, group_by, row["grp"])) for row in rows[1:]
+        ]
+        return overall, groups
+
+    def _cohort(self, baselines: Dict[Tuple[str, str], Baselines], kind: str, name: str) -> Baselines:
+        """
+        Baselines of one cohort, falling back to all stored games and then to
+        the class constants while a cohort has fewer than MIN_COHORT_GAMES.
+        """
+        for key in ((kind, name), ("all", "")):
+            cohort = baselines.get(key)
+            if cohort and next(iter(cohort.values())).games >= MIN_COHORT_GAMES:
+                return cohort
+        return {
+            metric: Baseline(games=0, p25=value * 0.8, p50=value, p75=value * 1.2)
+            for metric, value in (
+                ("kda", self.BASELINE_KDA), ("cspm", self.BASELINE_CSPM), ("vision", self.BASELINE_VISION)
+            )
+        }
+
+    def _blend(self, weighted: List[Tuple[Baselines, int]]) -> Baselines:
+        """
+        Games-weighted average of several cohorts' percentiles.
+        """
+        total = sum(games for _, games in weighted)
+        return {
+            metric: Baseline(
+                games=sum(cohort[metric].games for cohort, _ in weighted),
+                **{
+                    p: sum(getattr(cohort[metric], p) * games for cohort, games in weighted) / total
+                    for p in ("p25", "p50", "p75")
+                }
+            )
+            for metric in ("kda", "cspm", "vision")
+        }
+
+    def _build_report(self, row, baselines: Baselines) -> AnalysisReport:
+        count = row["games"]
         return AnalysisReport(
+            group=row["grp"],
             games_analyzed=count,
-            win_rate=wins / count * 100,
-            avg_kda=round(avg_kda, 2),
-            avg_cspm=round(avg_cspm, 2),
-            avg_gold_per_min=round(avg_gpm, 2),
-            avg_vision_score=round(avg_vision, 2),
-            kda_diff=self._compare(avg_kda, self.BASELINE_KDA),
-            cspm_diff=self._compare(avg_cspm, self.BASELINE_CSPM),
-            vision_diff=self._compare(avg_vision, self.BASELINE_VISION)
+            win_rate=row["wins"] / count * 100,
+            avg_kda=round(row["avg_kda"], 2),
+            avg_cspm=round(row["avg_cspm"], 2),
+            avg_gold_per_min=round(row["avg_gpm"], 2),
+            avg_vision_score=round(row["avg_vision"], 2),
+            kda_diff=self._compare(row["avg_kda"], baselines["kda"]),
+            cspm_diff=self._compare(row["avg_cspm"], baselines["cspm"]),
+            vision_diff=self._compare(row["avg_vision"], baselines["vision"])
         )
-        
-    def _compare(self, actual: float, baseline: float) -> str:
-        if actual >= baseline:
+
+    def _compare(self, actual: float, baseline: Baseline) -> str:
+        if actual >= baseline.p50:
             return "GOOD"
-        elif actual >= baseline * 0.8:
+        elif actual >= baseline.p25:
             return "OKAY"
         else:
             return "NEEDS_IMPROVEMENT"
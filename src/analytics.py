@@ -0,0 +1,224 @@
+import math
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from pydantic import BaseModel
+from src.database import get_game_stats_columns
+
+# game_stats columns loaded into arrays, with their dtypes
+COLUMNS = {
+    "match_id": object,
+    "game_creation": np.int64,
+    "champion_name": object,
+    "team_position": object,
+    "win": bool,
+    "kda": np.float64,
+    "cs_per_minute": np.float64,
+    "gold_per_minute": np.float64,
+    "vision_score": np.float64,
+    "damage_per_minute": np.float64,
+}
+
+# Report metric name -> column
+METRICS = {
+    "kda": "kda",
+    "cspm": "cs_per_minute",
+    "gpm": "gold_per_minute",
+    "vision": "vision_score",
+    "dpm": "damage_per_minute",
+}
+
+# z for a 95% confidence interval
+Z_95 = 1.959964
+
+# Largest d^-k we let the chunked EWMA reach before starting a new chunk
+_EWMA_MAX_SCALE = 1e150
+
+class GameArrays:
+    """
+    A player's games as NumPy columns (see COLUMNS), oldest first.
+    """
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns["win"])
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+def load_games(puuid: str, limit: Optional[int] = None) -> GameArrays:
+    """
+    Reads the player's `limit` most recent games (None = all) in one query.
+    """
+    raw = get_game_stats_columns(puuid, list(COLUMNS), limit)
+    columns = {name: np.asarray(raw[name], dtype=dtype) for name, dtype in COLUMNS.items()}
+    for name in ("champion_name", "team_position"):
+        # Remakes and some queues have no position
+        keys = columns[name]
+        keys[np.equal(keys, None) | np.equal(keys, "")] = "UNKNOWN"
+    return GameArrays(columns)
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Mean of each trailing `window` values; NaN until the first full window.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        cumsum = np.cumsum(np.concatenate(([0.0], values)))
+        out[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+    return out
+
+def ewma(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Exponentially weighted moving average, y[0] = x[0] and
+    y[t] = (1 - alpha) * y[t-1] + alpha * x[t], without a Python loop per value.
+
+    Within a chunk, y[j] = d^(j+1) * y[-1] + alpha * d^j * cumsum(x[i] / d^i)
+    with d = 1 - alpha. Chunks are sized so d^-i stays finite.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha must be in (0, 1]")
+    if len(values) == 0 or alpha == 1:
+        return values.copy()
+
+    decay = 1 - alpha
+    chunk = max(1, int(math.log(_EWMA_MAX_SCALE) / -math.log(decay)))
+    out = np.empty(len(values))
+    previous = values[0]
+    for start in range(0, len(values), chunk):
+        x = values[start:start + chunk]
+        powers = decay ** np.arange(len(x))
+        out[start:start + len(x)] = decay * powers * previous + alpha * powers * np.cumsum(x / powers)
+        previous = out[start + len(x) - 1]
+    return out
+
+def wilson_interval(wins: np.ndarray, games: np.ndarray, z: float = Z_95) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Wilson score interval for win rates, as fractions. NaN where games == 0.
+    """
+    wins = np.asarray(wins, dtype=np.float64)
+    games = np.asarray(games, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = wins / games
+        denominator = 1 + z ** 2 / games
+        center = (p + z ** 2 / (2 * games)) / denominator
+        margin = z * np.sqrt(p * (1 - p) / games + z ** 2 / (4 * games ** 2)) / denominator
+    return center - margin, center + margin
+
+def streaks(win: np.ndarray) -> Tuple[int, int, int]:
+    """
+    Returns (current streak, longest win streak, longest loss streak).
+    The current streak is positive for wins and negative for losses.
+    """
+    win = np.asarray(win, dtype=bool)
+    if len(win) == 0:
+        return 0, 0, 0
+    starts = np.concatenate(([0], np.flatnonzero(win[1:] != win[:-1]) + 1))
+    lengths = np.diff(np.concatenate((starts, [len(win)])))
+    run_is_win = win[starts]
+
+    current = int(lengths[-1]) if run_is_win[-1] else -int(lengths[-1])
+    return current, int(lengths[run_is_win].max(initial=0)), int(lengths[~run_is_win].max(initial=0))
+
+class GroupStats(BaseModel):
+    name: str
+    games: int
+    win_rate: float # Percent
+    win_rate_low: float # 95% Wilson interval, percent
+    win_rate_high: float
+    averages: Dict[str, float]
+
+class TrendReport(BaseModel):
+    games_analyzed: int
+    window: int
+    ewma_alpha: float
+
+    win_rate: float # Percent
+    win_rate_low: float # 95% Wilson interval, percent
+    win_rate_high: float
+    averages: Dict[str, float] # Whole history
+
+    recent_win_rate: float # Last `window` games, percent
+    recent: Dict[str, float] # Last `window` games
+    ewma: Dict[str, float] # Exponentially weighted, latest value
+
+    current_streak: int # +N wins / -N losses
+    longest_win_streak: int
+    longest_loss_streak: int
+
+    champions: List[GroupStats]
+    positions: List[GroupStats]
+
+def group_stats(games: GameArrays, column: str) -> List[GroupStats]:
+    """
+    Per-group counts, win rates with intervals and metric averages, most
+    played first. One bincount per statistic, whatever the number of groups.
+    """
+    names, inverse = np.unique(games[column].astype(str), return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(names))
+    wins = np.bincount(inverse, weights=games["win"], minlength=len(names))
+    averages = {
+        metric: np.bincount(inverse, weights=games[col], minlength=len(names)) / counts
+        for metric, col in METRICS.items()
+    }
+    low, high = wilson_interval(wins, counts)
+
+    order = np.lexsort((names, -counts))
+    return [
+        GroupStats(
+            name=str(names[i]),
+            games=int(counts[i]),
+            win_rate=round(wins[i] / counts[i] * 100, 2),
+            win_rate_low=round(low[i] * 100, 2),
+            win_rate_high=round(high[i] * 100, 2),
+            averages={metric: round(float(values[i]), 2) for metric, values in averages.items()}
+        ) for i in order
+    ]
+
+class AnalyticsEngine:
+    """
+    Columnar counterpart of `AnalysisEngine`: loads the history once, then
+    computes every statistic in vectorized passes.
+    """
+    def build_report(
+        self,
+        puuid: str,
+        limit: Optional[int] = None,
+        window: int = 20,
+        ewma_alpha: float = 0.1
+    ) -> Optional[TrendReport]:
+        games = load_games(puuid, limit)
+        if len(games) == 0:
+            return None
+        return self.report_from_arrays(games, window, ewma_alpha)
+
+    def report_from_arrays(self, games: GameArrays, window: int = 20, ewma_alpha: float = 0.1) -> TrendReport:
+        count = len(games)
+        win = games["win"]
+        wins = int(win.sum())
+        low, high = wilson_interval(np.array([wins]), np.array([count]))
+        current, longest_win, longest_loss = streaks(win)
+
+        recent_window = min(window, count)
+        return TrendReport(
+            games_analyzed=count,
+            window=recent_window,
+            ewma_alpha=ewma_alpha,
+            win_rate=round(wins / count * 100, 2),
+            win_rate_low=round(float(low[0]) * 100, 2),
+            win_rate_high=round(float(high[0]) * 100, 2),
+            averages={metric: round(float(games[col].mean()), 2) for metric, col in METRICS.items()},
+            recent_win_rate=round(float(rolling_mean(win, recent_window)[-1]) * 100, 2),
+            recent={
+                metric: round(float(rolling_mean(games[col], recent_window)[-1]), 2)
+                for metric, col in METRICS.items()
+            },
+            ewma={metric: round(float(ewma(games[col], ewma_alpha)[-1]), 2) for metric, col in METRICS.items()},
+            current_streak=current,
+            longest_win_streak=longest_win,
+            longest_loss_streak=longest_loss,
+            champions=group_stats(games, "champion_name"),
+            positions=group_stats(games, "team_position"),
+        )
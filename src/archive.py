@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+import time
+from typing import Iterator, Optional, Set, Tuple
+
+class RawArchive:
+    """
+    Single-file, append-only store for raw match/timeline payloads.
+
+    Payloads are already-encoded blobs (see `src.storage.encode_json`) kept in
+    one SQLite table. The (match_id, kind) primary key index gives constant-time
+    existence checks and random access, and rowid order gives a sequential
+    scan in insertion order for reprocessing.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS raw_payloads (
+                match_id TEXT,
+                kind TEXT,
+                format TEXT,
+                payload BLOB,
+                stored_at INTEGER,
+                PRIMARY KEY (match_id, kind)
+            )
+        ''')
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def put(self, kind: str, match_id: str, payload: bytes, fmt: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO raw_payloads (match_id, kind, format, payload, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (match_id, kind, fmt, payload, int(time.time()))
+            )
+            self._conn.commit()
+
+    def exists(self, kind: str, match_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM raw_payloads WHERE match_id = ? AND kind = ?", (match_id, kind)
+            ).fetchone()
+        return row is not None
+
+    def get(self, kind: str, match_id: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Returns (payload, format) or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, format FROM raw_payloads WHERE match_id = ? AND kind = ?", (match_id, kind)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def match_ids(self, kind: str) -> Set[str]:
+        """
+        All stored match IDs for `kind`, for bulk existence checks.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT match_id FROM raw_payloads WHERE kind = ?", (kind,)).fetchall()
+        return {row[0] for row in rows}
+
+    def count(self, kind: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM raw_payloads WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def index(self, kind: str, batch_size: int = 1000) -> Iterator[Tuple[str, int, int]]:
+        """
+        Streams (match_id, rowid, payload length) without reading payloads.
+        Rowids change whenever a payload is replaced, so (rowid, length)
+        identifies a stored version.
+        """
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, match_id, length(payload) FROM raw_payloads "
+                    "WHERE kind = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                    (kind, last_rowid, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, match_id, length in rows:
+                last_rowid = rowid
+                yield match_id, rowid, length
+
+    def scan(self, kind: str, batch_size: int = 100) -> Iterator[Tuple[str, bytes, str]]:
+        """
+        Streams (match_id, payload, format) in insertion order, `batch_size`
+        rows at a time, so memory does not grow with the archive.
+        """
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, match_id, payload, format FROM raw_payloads "
+                    "WHERE kind = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                    (kind, last_rowid, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, match_id, payload, fmt in rows:
+                last_rowid = rowid
+                yield match_id, payload, fmt
@@ -0,0 +1,123 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from pydantic import BaseModel
+from src.database import connection, transaction
+
+# Report metric -> game_stats column the baselines are computed from
+BASELINE_METRICS = {
+    "kda": "kda",
+    "cspm": "cs_per_minute",
+    "gpm": "gold_per_minute",
+    "vision": "vision_score",
+}
+
+# Cohort kind -> game_stats column that defines it. "all" is one cohort
+# holding every stored game, named "".
+COHORT_COLUMNS = {
+    "all": None,
+    "team_position": "team_position",
+    "champion": "champion_name",
+}
+
+# Cohorts with fewer games are too noisy to grade against
+MIN_COHORT_GAMES = 20
+
+class Baseline(BaseModel):
+    games: int
+    p25: float
+    p50: float
+    p75: float
+
+# {metric: Baseline} for one cohort
+Baselines = Dict[str, Baseline]
+
+def _read_corpus(conn) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Cohort keys per kind and a (games, metrics) value matrix, in one scan.
+    """
+    c = conn.cursor()
+    c.row_factory = None
+    keyed = [column for column in COHORT_COLUMNS.values() if column]
+    c.execute(f"SELECT {', '.join(keyed + list(BASELINE_METRICS.values()))} FROM game_stats")
+    columns = list(zip(*c.fetchall())) or [()] * (len(keyed) + len(BASELINE_METRICS))
+
+    keys = {"all": np.full(len(columns[0]), "", dtype=object)}
+    for kind, column in COHORT_COLUMNS.items():
+        if column:
+            keys[kind] = np.asarray(columns[keyed.index(column)], dtype=object)
+    values = np.column_stack([np.asarray(col, dtype=np.float64) for col in columns[len(keyed):]])
+    return keys, values
+
+def refresh_baselines(full: bool = False) -> int:
+    """
+    Recomputes p25/p50/p75 of every metric for the cohorts queued in
+    baseline_dirty by the game_stats triggers (every cohort with `full`), and
+    does nothing if none are queued. Exact percentiles need all of a cohort's
+    values, so the table is read once, but only queued cohorts are recomputed
+    and rewritten. Returns the number of cohorts refreshed.
+    """
+    with transaction() as conn:
+        if full:
+            conn.execute('''
+                INSERT OR IGNORE INTO baseline_dirty (cohort_kind, cohort)
+                SELECT 'all', '' FROM game_stats
+                UNION SELECT 'team_position', team_position FROM game_stats
+                UNION SELECT 'champion', champion_name FROM game_stats
+            ''')
+        dirty: Dict[str, List[str]] = {}
+        for row in conn.execute("SELECT cohort_kind, cohort FROM baseline_dirty"):
+            dirty.setdefault(row["cohort_kind"], []).append(row["cohort"])
+        if not dirty:
+            return 0
+
+        keys, values = _read_corpus(conn)
+        refreshed = 0
+        for kind, cohorts in dirty.items():
+            conn.executemany(
+                "DELETE FROM baselines WHERE cohort_kind = ? AND cohort = ?", [(kind, cohort) for cohort in cohorts]
+            )
+            # Sort once, then each cohort is a contiguous slice
+            order = np.argsort(keys[kind], kind="stable")
+            sorted_keys = keys[kind][order]
+            rows = []
+            for cohort in cohorts:
+                start = np.searchsorted(sorted_keys, cohort, "left")
+                stop = np.searchsorted(sorted_keys, cohort, "right")
+                if stop > start:
+                    percentiles = np.percentile(values[order[start:stop]], [25, 50, 75], axis=0)
+                    rows.extend(
+                        (kind, cohort, metric, int(stop - start), *(float(p) for p in percentiles[:, i]))
+                        for i, metric in enumerate(BASELINE_METRICS)
+                    )
+            conn.executemany('''
+                INSERT INTO baselines (cohort_kind, cohort, metric, games, p25, p50, p75)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            refreshed += len(cohorts)
+        conn.execute("DELETE FROM baseline_dirty")
+    return refreshed
+
+def load_baselines() -> Dict[Tuple[str, str], Baselines]:
+    """
+    Every stored baseline as {(cohort_kind, cohort): {metric: Baseline}},
+    refreshing queued cohorts first.
+    """
+    conn = connection()
+    if conn.execute("SELECT 1 FROM baseline_dirty LIMIT 1").fetchone():
+        refresh_baselines()
+
+    result: Dict[Tuple[str, str], Baselines] = {}
+    for row in conn.execute("SELECT cohort_kind, cohort, metric, games, p25, p50, p75 FROM baselines"):
+        result.setdefault((row["cohort_kind"], row["cohort"]), {})[row["metric"]] = Baseline(
+            games=row["games"], p25=row["p25"], p50=row["p50"], p75=row["p75"]
+        )
+    return result
+
+def get_baselines(kind: str, cohort: str = "") -> Optional[Baselines]:
+    """
+    {metric: Baseline} of one cohort, e.g. get_baselines("team_position", "UTILITY").
+    None if no stored game belongs to it.
+    """
+    if kind not in COHORT_COLUMNS:
+        raise ValueError(f"Unknown cohort kind {kind!r}, expected one of {', '.join(COHORT_COLUMNS)}")
+    return load_baselines().get((kind, cohort))
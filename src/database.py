@@ -1,21 +1,182 @@
+import math
 import sqlite3
 import os
-from typing import List, Optional
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from src.models import GameStatsDto, TimelineEventDto
 
-DB_NAME = "lolai.db"
+# Path of the database file. Override with LOLAI_DB_PATH or set_db_path().
+DB_NAME = os.getenv("LOLAI_DB_PATH", "lolai.db")
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_NAME)
+# Applied to every connection. With WAL, readers never block the writer and
+# synchronous=NORMAL only fsyncs at checkpoints (still never corrupts).
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,  # KiB, ~64 MB page cache
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    # So INSERT OR REPLACE also fires DELETE triggers for the replaced row
+    "recursive_triggers": "ON",
+}
+BUSY_TIMEOUT = 30.0
+
+_local = threading.local()
+
+def set_db_path(path: str):
+    """
+    Points every later connection at `path`. This thread's shared connection is
+    closed; other threads reopen theirs on next use.
+    """
+    global DB_NAME
+    close_connection()
+    DB_NAME = path
+
+def _connect(isolation_level: Optional[str]) -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT, isolation_level=isolation_level)
     conn.row_factory = sqlite3.Row
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
     return conn
 
-def init_db():
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    # Game Stats Table
-    c.execute('''
+def get_db_connection():
+    """
+    Opens a new standalone connection that the caller commits and closes.
+    Prefer `connection()` / `transaction()`, which reuse one connection per thread.
+    """
+    return _connect(isolation_level="DEFERRED")
+
+def connection() -> sqlite3.Connection:
+    """
+    This thread's shared connection, opened on first use (and reopened if
+    DB_NAME changed or the process forked). It is in autocommit mode: group
+    writes with `transaction()`. Do not close it, see `close_connection()`.
+    """
+    key = (DB_NAME, os.getpid())
+    if getattr(_local, "key", None) != key:
+        close_connection()
+        _local.conn = _connect(isolation_level=None)
+        _local.key = key
+        _local.depth = 0
+    return _local.conn
+
+def close_connection():
+    """
+    Closes this thread's shared connection, if open.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "key", (None, None))[1] == os.getpid():
+        conn.close()
+    _local.conn = None
+    _local.key = None
+    _local.depth = 0
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """
+    Unit of work on this thread's shared connection: everything written inside
+    commits together (one fsync) or rolls back on error. Nested calls join the
+    outermost transaction, so callers can wrap hundreds of matches in one.
+    """
+    conn = connection()
+    if _local.depth:
+        _local.depth += 1
+        try:
+            yield conn
+        finally:
+            _local.depth -= 1
+        return
+
+    conn.execute("BEGIN")
+    _local.depth = 1
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+    finally:
+        _local.depth = 0
+
+# Metric -> game_stats column, kept in player_summaries as sum_<metric> and
+# sumsq_<metric>. Part of migration 4: changing it needs a new migration.
+PLAYER_SUMMARY_METRICS = {
+    "kda": "kda",
+    "cspm": "cs_per_minute",
+    "gpm": "gold_per_minute",
+    "vision": "vision_score",
+    "dpm": "damage_per_minute",
+}
+
+# player_summaries scope -> game_stats column of its groups. "all" has one
+# group, "", per player.
+PLAYER_SUMMARY_SCOPES = {
+    "all": None,
+    "champion": "champion_name",
+    "team_position": "team_position",
+}
+
+def _player_summary_migration() -> List[str]:
+    """
+    player_summaries table, its triggers and the backfill of existing games.
+    Each game_stats row adds (or, deleted, subtracts) its count, win and
+    metric sums to one row per scope, so a replaced row is reversed first.
+    """
+    sums = ", ".join(f"sum_{m}, sumsq_{m}" for m in PLAYER_SUMMARY_METRICS)
+
+    def upsert(row: str, sign: str) -> str:
+        values = ", ".join(
+            f"{sign}{row}.{col}, {sign}{row}.{col} * {row}.{col}" for col in PLAYER_SUMMARY_METRICS.values()
+        )
+        groups = ",\n".join(
+            f"({row}.puuid, '{scope}', {f'{row}.{col}' if col else repr('')}, {sign}1, {sign}{row}.win, {values})"
+            for scope, col in PLAYER_SUMMARY_SCOPES.items()
+        )
+        updates = ", ".join(
+            f"sum_{m} = sum_{m} + excluded.sum_{m}, sumsq_{m} = sumsq_{m} + excluded.sumsq_{m}"
+            for m in PLAYER_SUMMARY_METRICS
+        )
+        return (
+            f"INSERT INTO player_summaries (puuid, scope, grp, games, wins, {sums}) VALUES {groups}\n"
+            f"ON CONFLICT (puuid, scope, grp) DO UPDATE SET "
+            f"games = games + excluded.games, wins = wins + excluded.wins, {updates};"
+        )
+
+    add, remove = upsert("NEW", ""), upsert("OLD", "-")
+    cleanup = "DELETE FROM player_summaries WHERE puuid = OLD.puuid AND games <= 0;"
+    backfill = "\nUNION ALL\n".join(
+        f"SELECT puuid, '{scope}', {col or repr('')}, COUNT(*), SUM(win), "
+        + ", ".join(f"SUM({c}), SUM({c} * {c})" for c in PLAYER_SUMMARY_METRICS.values())
+        + f" FROM game_stats GROUP BY puuid{f', {col}' if col else ''}"
+        for scope, col in PLAYER_SUMMARY_SCOPES.items()
+    )
+    columns = "".join(f"sum_{m} REAL, sumsq_{m} REAL, " for m in PLAYER_SUMMARY_METRICS)
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS player_summaries (
+            puuid TEXT, scope TEXT, grp TEXT, games INTEGER, wins INTEGER, {columns}
+            PRIMARY KEY (puuid, scope, grp)
+        ) WITHOUT ROWID
+        """,
+        f"CREATE TRIGGER IF NOT EXISTS game_stats_summary_insert AFTER INSERT ON game_stats BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS game_stats_summary_delete AFTER DELETE ON game_stats BEGIN {remove} {cleanup} END",
+        f"CREATE TRIGGER IF NOT EXISTS game_stats_summary_update AFTER UPDATE ON game_stats BEGIN "
+        f"{remove} {add} {cleanup} END",
+        f"INSERT INTO player_summaries (puuid, scope, grp, games, wins, {sums}) {backfill}",
+    ]
+
+# Schema migrations, applied in order. PRAGMA user_version stores how many
+# have run, so each one runs exactly once per database. Never edit a shipped
+# migration, append a new one instead.
+MIGRATIONS: List[List[str]] = [
+    # 1: Baseline schema. IF NOT EXISTS lets databases created before
+    # versioning adopt it without changes.
+    [
+        # Game Stats Table
+        '''
         CREATE TABLE IF NOT EXISTS game_stats (
             match_id TEXT,
             puuid TEXT,
@@ -46,10 +207,9 @@ def init_db():
             
             PRIMARY KEY (match_id, puuid)
         )
-    ''')
-    
-    # Timeline Events Table
-    c.execute('''
+        ''',
+        # Timeline Events Table
+        '''
         CREATE TABLE IF NOT EXISTS timeline_events (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             match_id TEXT,
@@ -66,120 +226,587 @@ def init_db():
             monster_type TEXT,
             lane_type TEXT
         )
-    ''')
-    
-    conn.commit()
-    conn.close()
+        ''',
+        # Manifest of raw inputs already ingested, so reprocessing can skip them
+        '''
+        CREATE TABLE IF NOT EXISTS processed_inputs (
+            match_id TEXT,
+            kind TEXT,
+            puuid TEXT,
+            fingerprint TEXT,
+            parser_version INTEGER,
+            processed_at INTEGER,
+            PRIMARY KEY (match_id, kind, puuid)
+        )
+        ''',
+        # Per-minute participant frames (see src/frames.py): one row per match,
+        # one little-endian int32 blob per field, participant-major
+        '''
+        CREATE TABLE IF NOT EXISTS participant_frames (
+            match_id TEXT PRIMARY KEY,
+            puuids TEXT,
+            participants INTEGER,
+            minutes INTEGER,
 
-def save_game_stats(stats: GameStatsDto):
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute('''
-        INSERT OR REPLACE INTO game_stats (
-            match_id, puuid, champion_name, win, game_creation, game_duration,
-            kills, deaths, assists, kda,
-            total_minions_killed, neutral_minions_killed, cs_per_minute,
-            gold_earned, gold_per_minute, total_damage_dealt_to_champions, damage_per_minute,
-            vision_score, wards_placed, wards_killed, team_position
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        stats.match_id, stats.puuid, stats.champion_name, stats.win, stats.game_creation, stats.game_duration,
-        stats.kills, stats.deaths, stats.assists, stats.kda,
-        stats.total_minions_killed, stats.neutral_minions_killed, stats.cs_per_minute,
-        stats.gold_earned, stats.gold_per_minute, stats.total_damage_dealt_to_champions, stats.damage_per_minute,
-        stats.vision_score, stats.wards_placed, stats.wards_killed, stats.team_position
-    ))
-    
-    conn.commit()
-    conn.close()
+            gold BLOB,
+            current_gold BLOB,
+            xp BLOB,
+            level BLOB,
+            cs BLOB,
+            jungle_cs BLOB,
+            position_x BLOB,
+            position_y BLOB
+        )
+        ''',
+    ],
+    # 2: Indexes for the hot read paths (get_recent_games, get_timeline_events,
+    # get_processed_inputs), so none of them scans or sorts a whole table.
+    [
+        'CREATE INDEX IF NOT EXISTS idx_game_stats_puuid_creation ON game_stats (puuid, game_creation DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_timeline_events_match_puuid_time ON timeline_events (match_id, puuid, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_processed_inputs_kind_puuid ON processed_inputs (kind, puuid)',
+    ],
+    # 3: Materialized percentile baselines per cohort (see src/baselines.py).
+    # Triggers queue every cohort a game_stats write touches in
+    # baseline_dirty, so a refresh only recomputes and rewrites those.
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS baselines (
+            cohort_kind TEXT,
+            cohort TEXT,
+            metric TEXT,
+            games INTEGER,
+            p25 REAL,
+            p50 REAL,
+            p75 REAL,
+            PRIMARY KEY (cohort_kind, cohort, metric)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS baseline_dirty (
+            cohort_kind TEXT,
+            cohort TEXT,
+            PRIMARY KEY (cohort_kind, cohort)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS game_stats_baseline_insert AFTER INSERT ON game_stats BEGIN
+            INSERT OR IGNORE INTO baseline_dirty (cohort_kind, cohort) VALUES
+                ('all', ''), ('team_position', NEW.team_position), ('champion', NEW.champion_name);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS game_stats_baseline_delete AFTER DELETE ON game_stats BEGIN
+            INSERT OR IGNORE INTO baseline_dirty (cohort_kind, cohort) VALUES
+                ('all', ''), ('team_position', OLD.team_position), ('champion', OLD.champion_name);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS game_stats_baseline_update AFTER UPDATE ON game_stats BEGIN
+            INSERT OR IGNORE INTO baseline_dirty (cohort_kind, cohort) VALUES
+                ('all', ''), ('team_position', OLD.team_position), ('champion', OLD.champion_name),
+                ('team_position', NEW.team_position), ('champion', NEW.champion_name);
+        END
+        ''',
+        # Existing games: build every cohort on the first refresh
+        '''
+        INSERT OR IGNORE INTO baseline_dirty (cohort_kind, cohort)
+        SELECT 'all', '' FROM game_stats
+        UNION SELECT 'team_position', team_position FROM game_stats
+        UNION SELECT 'champion', champion_name FROM game_stats
+        ''',
+    ],
+    # 4: Lifetime aggregates per player, per player and champion, and per
+    # player and position, maintained by triggers in the writing transaction
+    _player_summary_migration(),
+    # 5: Persistent cache of LLM responses (see src/llm_cache.py)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            response TEXT,
+            created_at INTEGER,
+            last_used_at INTEGER,
+            hits INTEGER DEFAULT 0
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used_at)',
+    ],
+    # 6: Stored AI coaching summaries, one per player per match
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS match_summaries (
+            match_id TEXT,
+            puuid TEXT,
+            model TEXT,
+            summary TEXT,
+            created_at INTEGER,
+            PRIMARY KEY (match_id, puuid)
+        )
+        ''',
+    ],
+    # 7: Timeline digests for LLM prompts (see src/digest.py): the
+    # participant ID of each game_stats row resolves killer/victim IDs, digests
+    # are cached per match, and every LLM call is logged with its prompt size
+    # and latency.
+    [
+        'ALTER TABLE game_stats ADD COLUMN participant_id INTEGER',
+        '''
+        CREATE TABLE IF NOT EXISTS match_digests (
+            match_id TEXT,
+            puuid TEXT,
+            token_budget INTEGER,
+            signature TEXT,
+            digest TEXT,
+            tokens INTEGER,
+            moments INTEGER,
+            kept INTEGER,
+            PRIMARY KEY (match_id, puuid, token_budget)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS llm_calls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at INTEGER,
+            model TEXT,
+            match_id TEXT,
+            token_budget INTEGER,
+            prompt_chars INTEGER,
+            prompt_tokens INTEGER,
+            latency_ms REAL,
+            cached INTEGER,
+            ok INTEGER
+        )
+        ''',
+    ],
+    # 8: Time to first token of streamed LLM calls
+    [
+        'ALTER TABLE llm_calls ADD COLUMN ttft_ms REAL',
+    ],
+    # 9: Riot ID -> PUUID resolution cache, see src/accounts.py
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS accounts (
+            riot_id_key TEXT PRIMARY KEY,
+            game_name TEXT,
+            tag_line TEXT,
+            puuid TEXT,
+            fetched_at INTEGER
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_accounts_puuid ON accounts(puuid)',
+    ],
+    # 10: Per-PUUID watermark for incremental history syncs
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            puuid TEXT PRIMARY KEY,
+            newest_match_id TEXT,
+            newest_game_creation INTEGER,
+            last_sync_at INTEGER
+        )
+        ''',
+    ],
+]
 
-def save_timeline_events(events: List[TimelineEventDto]):
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    # Batch insert for performance
-    data_to_insert = [
-        (e.match_id, e.puuid, e.timestamp, e.type, e.killer_id, e.victim_id, e.position_x, e.position_y, e.item_id, e.monster_type, e.lane_type)
-        for e in events
-    ]
+def schema_version(conn: Optional[sqlite3.Connection] = None) -> int:
+    return (conn or connection()).execute("PRAGMA user_version").fetchone()[0]
+
+def init_db():
+    """
+    Brings the database up to the latest schema version. Each migration runs in
+    its own transaction together with its version bump.
+    """
+    conn = connection()
+    version = schema_version(conn)
+    if version > len(MIGRATIONS):
+        raise RuntimeError(f"Database {DB_NAME} has schema version {version}, newer than this code ({len(MIGRATIONS)})")
+
+    for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        with transaction():
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {number}")
+
+def save_game_stats(stats: GameStatsDto, conn: Optional[sqlite3.Connection] = None):
+    """
+    Upserts one row of game stats.
+    Joins the current `transaction()`, or pass `conn` to write on a
+    caller-managed connection (no commit here).
+    """
+    save_all_game_stats([stats], conn=conn)
+
+def save_all_game_stats(stats_list: List[GameStatsDto], conn: Optional[sqlite3.Connection] = None):
+    """
+    Upserts many rows of game stats (e.g. every participant of a match).
+    Joins the current `transaction()`, or pass `conn` to write on a
+    caller-managed connection (no commit here).
+    """
+    with transaction() if conn is None else nullcontext(conn) as conn:
+        conn.executemany('''
+            INSERT OR REPLACE INTO game_stats (
+                match_id, puuid, champion_name, win, game_creation, game_duration,
+                kills, deaths, assists, kda,
+                total_minions_killed, neutral_minions_killed, cs_per_minute,
+                gold_earned, gold_per_minute, total_damage_dealt_to_champions, damage_per_minute,
+                vision_score, wards_placed, wards_killed, team_position, participant_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(
+            stats.match_id, stats.puuid, stats.champion_name, stats.win, stats.game_creation, stats.game_duration,
+            stats.kills, stats.deaths, stats.assists, stats.kda,
+            stats.total_minions_killed, stats.neutral_minions_killed, stats.cs_per_minute,
+            stats.gold_earned, stats.gold_per_minute, stats.total_damage_dealt_to_champions, stats.damage_per_minute,
+            stats.vision_score, stats.wards_placed, stats.wards_killed, stats.team_position, stats.participant_id
+        ) for stats in stats_list])
+
+def save_timeline_events(
+    events: List[TimelineEventDto],
+    conn: Optional[sqlite3.Connection] = None,
+    keys: Optional[Iterable[Tuple[str, str]]] = None
+):
+    """
+    Stores timeline events, replacing every event previously stored for the
+    (match_id, puuid) pairs in `keys`, so that re-ingesting a match is
+    idempotent. Pass the pairs the parse covered: a player left with no
+    events then loses their old rows too. Defaults to the pairs in `events`.
+    Joins the current `transaction()`, or pass `conn` to write on a
+    caller-managed connection (no commit here).
+    """
+    if keys is None:
+        keys = {(e.match_id, e.puuid) for e in events}
+    with transaction() if conn is None else nullcontext(conn) as conn:
+        c = conn.cursor()
+        c.executemany('DELETE FROM timeline_events WHERE match_id = ? AND puuid = ?', list(keys))
     
-    c.executemany('''
-        INSERT INTO timeline_events (
-            match_id, puuid, timestamp, type,
-            killer_id, victim_id, position_x, position_y,
-            item_id, monster_type, lane_type
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', data_to_insert)
+        # Batch insert for performance
+        data_to_insert = [
+            (e.match_id, e.puuid, e.timestamp, e.type, e.killer_id, e.victim_id, e.position_x, e.position_y, e.item_id, e.monster_type, e.lane_type)
+            for e in events
+        ]
     
-    conn.commit()
-    conn.close()
+        c.executemany('''
+            INSERT INTO timeline_events (
+                match_id, puuid, timestamp, type,
+                killer_id, victim_id, position_x, position_y,
+                item_id, monster_type, lane_type
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', data_to_insert)
 
-def get_recent_games(puuid: str, limit: int = 20) -> List[GameStatsDto]:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute('''
-        SELECT * FROM game_stats 
-        WHERE puuid = ? 
-        ORDER BY game_creation DESC 
+# Read paths select exactly the model's fields, in model order
+GAME_STATS_COLUMNS = tuple(GameStatsDto.model_fields)
+TIMELINE_EVENT_COLUMNS = tuple(TimelineEventDto.model_fields)
+
+def _construct_trusted(model, fields: Dict[str, Any]):
+    """
+    Builds a pydantic model instance from already-valid fields without
+    validation. Same result as `model_construct`, but faster because every
+    field is known to be present (we select them all); `model_construct`
+    is slower than validating. This sets pydantic's instance attributes
+    directly, so requirements.txt caps pydantic at the newest tested minor
+    and test_trusted_models_behave_like_validated_ones guards a bump.
+    """
+    obj = model.__new__(model)
+    object.__setattr__(obj, "__dict__", fields)
+    object.__setattr__(obj, "__pydantic_fields_set__", set(fields))
+    object.__setattr__(obj, "__pydantic_extra__", None)
+    object.__setattr__(obj, "__pydantic_private__", None)
+    return obj
+
+def _game_stats_from_row(row: Tuple, trusted: bool) -> GameStatsDto:
+    fields = dict(zip(GAME_STATS_COLUMNS, row))
+    fields["win"] = bool(fields["win"])
+    return _construct_trusted(GameStatsDto, fields) if trusted else GameStatsDto(**fields)
+
+def _timeline_event_from_row(row: Tuple, trusted: bool) -> TimelineEventDto:
+    fields = dict(zip(TIMELINE_EVENT_COLUMNS, row))
+    return _construct_trusted(TimelineEventDto, fields) if trusted else TimelineEventDto(**fields)
+
+def _tuple_cursor() -> sqlite3.Cursor:
+    # Plain tuples: rows are zipped with the column lists, sqlite3.Row only adds overhead
+    c = connection().cursor()
+    c.row_factory = None
+    return c
+
+def iter_recent_games(puuid: str, limit: Optional[int] = 20, trusted: bool = False) -> Iterator[GameStatsDto]:
+    """
+    Streams the player's most recent games (None = all), newest first, one row
+    at a time. With `trusted`, models are built without validation: only use
+    it for rows this code wrote itself.
+    """
+    c = _tuple_cursor()
+    c.execute(f'''
+        SELECT {", ".join(GAME_STATS_COLUMNS)} FROM game_stats
+        WHERE puuid = ?
+        ORDER BY game_creation DESC
         LIMIT ?
-    ''', (puuid, limit))
-    
+    ''', (puuid, -1 if limit is None else limit))
+
+    for row in c:
+        yield _game_stats_from_row(row, trusted)
+
+def get_recent_games(puuid: str, limit: Optional[int] = 20, trusted: bool = False) -> List[GameStatsDto]:
+    return list(iter_recent_games(puuid, limit, trusted))
+
+def get_unsummarized_games(puuid: str, limit: Optional[int] = None) -> List[GameStatsDto]:
+    """
+    The player's `limit` most recent games without a stored match summary
+    (None = all), newest first.
+    """
+    c = _tuple_cursor()
+    c.execute(f'''
+        SELECT {", ".join(f"g.{column}" for column in GAME_STATS_COLUMNS)} FROM game_stats g
+        LEFT JOIN match_summaries s ON s.match_id = g.match_id AND s.puuid = g.puuid
+        WHERE g.puuid = ? AND s.match_id IS NULL
+        ORDER BY g.game_creation DESC
+        LIMIT ?
+    ''', (puuid, -1 if limit is None else limit))
+    return [_game_stats_from_row(row, trusted=True) for row in c]
+
+def get_game_stats_columns(puuid: str, columns: List[str], limit: Optional[int] = None) -> Dict[str, Tuple]:
+    """
+    Column-wise read of the player's `limit` most recent games (None = all),
+    oldest first, without building a model per row: {column: values}.
+    """
+    unknown = [name for name in columns if name not in GAME_STATS_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown game_stats columns: {', '.join(unknown)}")
+
+    c = _tuple_cursor()
+    c.execute(f'''
+        SELECT {", ".join(columns)} FROM game_stats
+        WHERE puuid = ?
+        ORDER BY game_creation DESC
+        LIMIT ?
+    ''', (puuid, -1 if limit is None else limit))
     rows = c.fetchall()
-    conn.close()
-    
-    return [
-        GameStatsDto(
-            match_id=row['match_id'],
-            puuid=row['puuid'],
-            champion_name=row['champion_name'],
-            win=bool(row['win']),
-            game_creation=row['game_creation'],
-            game_duration=row['game_duration'],
-            kills=row['kills'],
-            deaths=row['deaths'],
-            assists=row['assists'],
-            kda=row['kda'],
-            total_minions_killed=row['total_minions_killed'],
-            neutral_minions_killed=row['neutral_minions_killed'],
-            cs_per_minute=row['cs_per_minute'],
-            gold_earned=row['gold_earned'],
-            gold_per_minute=row['gold_per_minute'],
-            total_damage_dealt_to_champions=row['total_damage_dealt_to_champions'],
-            damage_per_minute=row['damage_per_minute'],
-            vision_score=row['vision_score'],
-            wards_placed=row['wards_placed'],
-            wards_killed=row['wards_killed'],
-            team_position=row['team_position']
-        ) for row in rows
-    ]
+    rows.reverse()
 
-def get_timeline_events(match_id: str, puuid: str) -> List[TimelineEventDto]:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute('''
-        SELECT * FROM timeline_events 
+    values = list(zip(*rows)) if rows else [() for _ in columns]
+    return dict(zip(columns, values))
+
+# Columns get_stats_summary can group by
+SUMMARY_GROUPS = {
+    "champion": "champion_name",
+    "team_position": "team_position",
+}
+
+def _check_group_by(group_by: Optional[str]):
+    if group_by is not None and group_by not in SUMMARY_GROUPS:
+        raise ValueError(f"Cannot group by {group_by!r}, expected one of {', '.join(SUMMARY_GROUPS)}")
+
+def get_player_summary(puuid: str, group_by: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Lifetime aggregates of a player read from player_summaries: a lookup of a
+    few rows however many games are stored. Same rows and columns as
+    `get_stats_summary` over all games.
+    """
+    _check_group_by(group_by)
+    rows = connection().execute(
+        "SELECT * FROM player_summaries WHERE puuid = ? AND scope IN ('all', ?)", (puuid, group_by or "all")
+    ).fetchall()
+
+    overall = {"grp": None, "games": 0, "wins": 0}
+    overall.update({f"{prefix}_{m}": None for m in PLAYER_SUMMARY_METRICS for prefix in ("avg", "std")})
+    groups = []
+    for row in rows:
+        games = row["games"]
+        summary = {"grp": None if row["scope"] == "all" else row["grp"], "games": games, "wins": row["wins"]}
+        for m in PLAYER_SUMMARY_METRICS:
+            mean = row[f"sum_{m}"] / games
+            summary[f"avg_{m}"] = mean
+            # max(): float error from adding and removing games can go slightly negative
+            summary[f"std_{m}"] = math.sqrt(max(row[f"sumsq_{m}"] / games - mean * mean, 0.0))
+        if row["scope"] == "all":
+            overall = summary
+        else:
+            groups.append(summary)
+
+    groups.sort(key=lambda summary: (-summary["games"], summary["grp"]))
+    return [overall] + groups
+
+def get_stats_summary(puuid: str, limit: Optional[int] = 20, group_by: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Aggregates the player's `limit` most recent games (None = all) in one
+    query. The first row is the whole window with `grp` None; with `group_by`
+    ("champion" or "team_position") one row per group follows, most played
+    first. Columns: grp, games, wins, then avg_<metric> and std_<metric>
+    (population standard deviation) for every metric in
+    PLAYER_SUMMARY_METRICS; the same shape whatever the limit.
+    All games are read from the maintained player_summaries instead.
+    """
+    _check_group_by(group_by)
+    if limit is None:
+        return get_player_summary(puuid, group_by)
+
+    aggregates = "COUNT(*) AS games, COALESCE(SUM(win), 0) AS wins, " + ", ".join(
+        f"AVG({column}) AS avg_{m}, AVG({column} * {column}) AS sq_{m}"
+        for m, column in PLAYER_SUMMARY_METRICS.items()
+    )
+    query = f'''
+        WITH recent AS (
+            SELECT * FROM game_stats
+            WHERE puuid = ?
+            ORDER BY game_creation DESC
+            LIMIT ?
+        )
+        SELECT NULL AS grp, {aggregates} FROM recent
+    '''
+    if group_by is not None:
+        column = SUMMARY_GROUPS[group_by]
+        query += f'''
+        UNION ALL
+        SELECT * FROM (
+            SELECT {column} AS grp, {aggregates} FROM recent
+            GROUP BY {column}
+            ORDER BY games DESC, grp
+        )
+        '''
+
+    rows = []
+    for row in connection().execute(query, (puuid, limit)):
+        summary = dict(row)
+        for m in PLAYER_SUMMARY_METRICS:
+            mean, mean_sq = summary[f"avg_{m}"], summary.pop(f"sq_{m}")
+            summary[f"std_{m}"] = None if mean is None else math.sqrt(max(mean_sq - mean * mean, 0.0))
+        rows.append(summary)
+    return rows
+
+def iter_timeline_events(match_id: str, puuid: str, trusted: bool = False) -> Iterator[TimelineEventDto]:
+    """
+    Streams a player's events for one match in time order. See
+    `iter_recent_games` for `trusted`.
+    """
+    c = _tuple_cursor()
+    c.execute(f'''
+        SELECT {", ".join(TIMELINE_EVENT_COLUMNS)} FROM timeline_events
         WHERE match_id = ? AND puuid = ?
         ORDER BY timestamp ASC
     ''', (match_id, puuid))
-    
+
+    for row in c:
+        yield _timeline_event_from_row(row, trusted)
+
+def get_timeline_events(match_id: str, puuid: str, trusted: bool = False) -> List[TimelineEventDto]:
+    return list(iter_timeline_events(match_id, puuid, trusted))
+
+def get_processed_inputs(kind: str, puuid: str) -> Dict[str, Tuple[str, int]]:
+    """
+    Returns {match_id: (fingerprint, parser_version)} for every `kind` input
+    already processed for `puuid`.
+    """
+    c = connection().cursor()
+
+    c.execute('''
+        SELECT match_id, fingerprint, parser_version FROM processed_inputs
+        WHERE kind = ? AND puuid = ?
+    ''', (kind, puuid))
+
     rows = c.fetchall()
-    conn.close()
-    
-    return [
-        TimelineEventDto(
-            match_id=row['match_id'],
-            puuid=row['puuid'],
-            timestamp=row['timestamp'],
-            type=row['type'],
-            killer_id=row['killer_id'],
-            victim_id=row['victim_id'],
-            position_x=row['position_x'],
-            position_y=row['position_y'],
-            item_id=row['item_id'],
-            monster_type=row['monster_type'],
-            lane_type=row['lane_type']
-        ) for row in rows
-    ]
+
+    return {row['match_id']: (row['fingerprint'], row['parser_version']) for row in rows}
+
+def mark_processed(
+    match_id: str,
+    kind: str,
+    puuid: str,
+    fingerprint: str,
+    parser_version: int,
+    conn: Optional[sqlite3.Connection] = None
+):
+    """
+    Records that an input was ingested. Pass the same `conn` used to write the
+    parsed rows so both land in one transaction.
+    """
+    with transaction() if conn is None else nullcontext(conn) as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO processed_inputs (
+                match_id, kind, puuid, fingerprint, parser_version, processed_at
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        ''', (match_id, kind, puuid, fingerprint, parser_version, int(time.time())))
+
+def get_sync_state(puuid: str) -> Optional[Dict[str, Any]]:
+    """
+    {newest_match_id, newest_game_creation, last_sync_at} of the last
+    completed history sync of `puuid`, or None if it was never synced.
+    """
+    row = connection().execute(
+        "SELECT newest_match_id, newest_game_creation, last_sync_at FROM sync_state WHERE puuid = ?", (puuid,)
+    ).fetchone()
+    return dict(row) if row else None
+
+def update_sync_state(puuid: str, synced_at: Optional[int] = None):
+    """
+    Records a completed sync: the newest stored game of `puuid` becomes the
+    watermark the next sync pages down to.
+    """
+    with transaction() as conn:
+        newest = conn.execute('''
+            SELECT match_id, game_creation FROM game_stats WHERE puuid = ?
+            ORDER BY game_creation DESC LIMIT 1
+        ''', (puuid,)).fetchone()
+        conn.execute('''
+            INSERT OR REPLACE INTO sync_state (puuid, newest_match_id, newest_game_creation, last_sync_at)
+            VALUES (?, ?, ?, ?)
+        ''', (
+            puuid,
+            newest["match_id"] if newest else None,
+            newest["game_creation"] if newest else None,
+            int(time.time()) if synced_at is None else synced_at
+        ))
+
+def save_match_summary(match_id: str, puuid: str, model: str, summary: str, conn: Optional[sqlite3.Connection] = None):
+    """
+    Stores (or replaces) the AI summary of one player's match.
+    """
+    with transaction() if conn is None else nullcontext(conn) as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO match_summaries (match_id, puuid, model, summary, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (match_id, puuid, model, summary, int(time.time())))
+
+def get_match_summary(match_id: str, puuid: str) -> Optional[str]:
+    row = connection().execute(
+        "SELECT summary FROM match_summaries WHERE match_id = ? AND puuid = ?", (match_id, puuid)
+    ).fetchone()
+    return row["summary"] if row else None
+
+def record_llm_call(
+    model: str,
+    match_id: Optional[str],
+    token_budget: int,
+    prompt_chars: int,
+    prompt_tokens: int,
+    latency_ms: float,
+    cached: bool,
+    ok: bool,
+    ttft_ms: Optional[float] = None
+):
+    """
+    Logs one LLM request (or cache hit) with its prompt size and latency, and
+    the time to first token when it was streamed.
+    """
+    with transaction() as conn:
+        conn.execute('''
+            INSERT INTO llm_calls (
+                created_at, model, match_id, token_budget, prompt_chars, prompt_tokens, latency_ms, cached, ok, ttft_ms
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            int(time.time()), model, match_id, token_budget, prompt_chars, prompt_tokens, latency_ms, cached, ok, ttft_ms
+        ))
+
+def get_llm_call_stats() -> List[Dict[str, Any]]:
+    """
+    Prompt size and latency of successful model calls (cache hits excluded)
+    per model and token budget, to weigh budget against latency.
+    Columns: model, token_budget, calls, avg_prompt_tokens, avg_latency_ms,
+    max_latency_ms, avg_ttft_ms (None without streamed calls).
+    """
+    return [dict(row) for row in connection().execute('''
+        SELECT model, token_budget, COUNT(*) AS calls, AVG(prompt_tokens) AS avg_prompt_tokens,
+               AVG(latency_ms) AS avg_latency_ms, MAX(latency_ms) AS max_latency_ms, AVG(ttft_ms) AS avg_ttft_ms
+        FROM llm_calls
+        WHERE ok AND NOT cached
+        GROUP BY model, token_budget
+        ORDER BY model, token_budget
+    ''')]
@@ -0,0 +1,228 @@
+import json
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from src.database import connection, get_timeline_events, transaction
+from src.frames import ParticipantFrames, get_participant_frames
+from src.models import GameStatsDto, TimelineEventDto
+
+# Bump whenever digest output changes, so cached digests are rebuilt
+DIGEST_VERSION = 1
+
+DEFAULT_TOKEN_BUDGET = 400
+
+# Importance of each kind of moment; the highest scores are kept first when
+# the budget is tight.
+WEIGHTS = {
+    "death": 9,
+    "kill": 8,
+    "epic_monster": 8, # Baron, Elder dragon
+    "gold_swing": 7,
+    "dragon": 6,
+    "gold_checkpoint": 5,
+    "herald": 5,
+    "building": 4,
+    "horde": 3,
+    "plate": 2,
+}
+
+EPIC_MONSTERS = {"BARON_NASHOR", "ELDER_DRAGON"}
+
+# Minimum change in the team gold difference over one minute to call it a swing
+SWING_GOLD = 1500
+CHECKPOINT_MINUTES = (10, 15, 20)
+
+def estimate_tokens(text: str) -> int:
+    """
+    ~4 characters per token for English text, without a tokenizer dependency.
+    """
+    return (len(text) + 3) // 4
+
+def _clock(timestamp_ms: int) -> str:
+    seconds = timestamp_ms // 1000
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+def _gold(amount: int) -> str:
+    return f"{amount / 1000:+.1f}k"
+
+class Roster:
+    """
+    Resolves timeline participant IDs (1-5 blue, 6-10 red) to champions and
+    sides relative to the player. Built once per match.
+    """
+    def __init__(self, player_id: Optional[int], champions: Dict[int, Tuple[str, str]]):
+        self.player_id = player_id
+        self.champions = champions # participant_id -> (champion, position)
+
+    def same_side(self, participant_id: Optional[int]) -> Optional[bool]:
+        if self.player_id is None or not participant_id:
+            return None
+        return (participant_id <= 5) == (self.player_id <= 5)
+
+    def team(self, participant_id: Optional[int]) -> str:
+        side = self.same_side(participant_id)
+        return "Your team" if side else "Enemy team" if side is False else "A team"
+
+    def name(self, participant_id: Optional[int]) -> str:
+        if not participant_id:
+            return "a minion or tower"
+        side = {True: "ally", False: "enemy", None: "player"}[self.same_side(participant_id)]
+        if participant_id in self.champions:
+            champion, position = self.champions[participant_id]
+            return f"{champion} ({side} {position or '?'})"
+        return f"{side} #{participant_id}"
+
+def load_roster(stats: GameStatsDto, frames: Optional[ParticipantFrames] = None) -> Roster:
+    """
+    Champions come from the match's game_stats rows (every participant after
+    `process.py --all-participants`, otherwise just the player). The player's
+    ID falls back to their row in the stored participant frames.
+    """
+    rows = connection().execute('''
+        SELECT participant_id, champion_name, team_position FROM game_stats
+        WHERE match_id = ? AND participant_id IS NOT NULL
+    ''', (stats.match_id,)).fetchall()
+    champions = {row["participant_id"]: (row["champion_name"], row["team_position"]) for row in rows}
+
+    player_id = stats.participant_id
+    if player_id is None and frames is not None and stats.puuid in frames.puuids:
+        player_id = frames.participant_index(stats.puuid) + 1
+    return Roster(player_id, champions)
+
+class Digest(BaseModel):
+    text: str
+    tokens: int # Estimated, see estimate_tokens
+    moments: int # Candidate lines considered
+    kept: int
+
+def _event_moment(event: TimelineEventDto, roster: Roster) -> Optional[Tuple[str, str]]:
+    """
+    (weight key, line) for one stored event, or None to skip it.
+    """
+    if event.type == "CHAMPION_KILL":
+        if roster.player_id is not None and event.victim_id == roster.player_id:
+            return "death", f"You were killed by {roster.name(event.killer_id)}"
+        if roster.player_id is not None and event.killer_id == roster.player_id:
+            return "kill", f"You killed {roster.name(event.victim_id)}"
+        return "kill", f"{roster.name(event.killer_id)} killed {roster.name(event.victim_id)}"
+    if event.type == "ELITE_MONSTER_KILL":
+        monster = event.monster_type or "MONSTER"
+        key = (
+            "epic_monster" if monster in EPIC_MONSTERS else
+            "dragon" if monster == "DRAGON" else
+            "herald" if monster == "RIFTHERALD" else
+            "horde"
+        )
+        return key, f"{roster.team(event.killer_id)} took {monster.replace('_', ' ').title()}"
+    if event.type == "BUILDING_KILL":
+        return "building", "You destroyed a structure"
+    if event.type == "TURRET_PLATE_DESTROYED":
+        return "plate", "You took a turret plate"
+    return None
+
+def _gold_moments(frames: Optional[ParticipantFrames], roster: Roster) -> List[Tuple[int, str, str]]:
+    """
+    Team gold lead checkpoints and one-minute swings, from the stored frames.
+    """
+    if frames is None or roster.player_id is None or len(frames.puuids) != 10:
+        return []
+    gold = frames["gold"]
+    blue = [sum(gold[p, m] for p in range(5)) for m in range(frames.minutes)]
+    red = [sum(gold[p, m] for p in range(5, 10)) for m in range(frames.minutes)]
+    sign = 1 if roster.player_id <= 5 else -1
+    lead = [sign * (b - r) for b, r in zip(blue, red)]
+
+    moments = []
+    for minute in CHECKPOINT_MINUTES:
+        if minute < len(lead):
+            moments.append((minute * 60000, "gold_checkpoint", f"Team gold lead {_gold(lead[minute])}"))
+    for minute in range(1, len(lead)):
+        change = lead[minute] - lead[minute - 1]
+        if abs(change) >= SWING_GOLD:
+            moments.append((
+                minute * 60000, "gold_swing",
+                f"Gold swing {_gold(change)} for your team (lead now {_gold(lead[minute])})"
+            ))
+    return moments
+
+def build_digest(
+    stats: GameStatsDto,
+    events: List[TimelineEventDto],
+    roster: Roster,
+    frames: Optional[ParticipantFrames] = None,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+) -> Digest:
+    """
+    The most important moments of the match, in time order, as short lines
+    whose estimated size fits `token_budget`. Moments are taken by weight
+    (see WEIGHTS), earliest first among equals.
+    """
+    moments: List[Tuple[int, str, str]] = []
+    for event in events:
+        moment = _event_moment(event, roster)
+        if moment is not None:
+            moments.append((event.timestamp, *moment))
+    moments.extend(_gold_moments(frames, roster))
+
+    side = "" if roster.player_id is None else f", {'blue' if roster.player_id <= 5 else 'red'} side"
+    header = f"You: {stats.champion_name} ({stats.team_position or '?'}{side})"
+    used = estimate_tokens(header)
+    kept = []
+    for timestamp, key, line in sorted(moments, key=lambda m: (-WEIGHTS[m[1]], m[0])):
+        text = f"- {_clock(timestamp)} {line}"
+        cost = estimate_tokens(text) + 1 # newline
+        if used + cost > token_budget:
+            continue
+        used += cost
+        kept.append((timestamp, text))
+
+    text = "\n".join([header] + [line for _, line in sorted(kept)])
+    return Digest(text=text, tokens=estimate_tokens(text), moments=len(moments), kept=len(kept))
+
+def _signature(stats: GameStatsDto) -> str:
+    """
+    Changes whenever the inputs of a digest do: reprocessing rewrites the
+    events with new ids, and frames or roster rows may arrive later.
+    """
+    conn = connection()
+    count, last_id = conn.execute(
+        "SELECT COUNT(*), MAX(id) FROM timeline_events WHERE match_id = ? AND puuid = ?",
+        (stats.match_id, stats.puuid)
+    ).fetchone()
+    frames = conn.execute(
+        "SELECT minutes FROM participant_frames WHERE match_id = ?", (stats.match_id,)
+    ).fetchone()
+    roster = conn.execute(
+        "SELECT COUNT(*) FROM game_stats WHERE match_id = ? AND participant_id IS NOT NULL", (stats.match_id,)
+    ).fetchone()[0]
+    return json.dumps([DIGEST_VERSION, count, last_id, frames[0] if frames else None, roster, stats.participant_id])
+
+def get_match_digest(stats: GameStatsDto, token_budget: int = DEFAULT_TOKEN_BUDGET) -> Digest:
+    """
+    Cached `build_digest` of the player's stored events and frames. Rebuilt
+    only when its inputs change, so repeated prompts skip the event scan.
+    """
+    signature = _signature(stats)
+    row = connection().execute('''
+        SELECT signature, digest, tokens, moments, kept FROM match_digests
+        WHERE match_id = ? AND puuid = ? AND token_budget = ?
+    ''', (stats.match_id, stats.puuid, token_budget)).fetchone()
+    if row is not None and row["signature"] == signature:
+        return Digest(text=row["digest"], tokens=row["tokens"], moments=row["moments"], kept=row["kept"])
+
+    frames = get_participant_frames(stats.match_id, ["gold"])
+    digest = build_digest(
+        stats,
+        get_timeline_events(stats.match_id, stats.puuid, trusted=True),
+        load_roster(stats, frames),
+        frames,
+        token_budget,
+    )
+    with transaction() as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO match_digests (match_id, puuid, token_budget, signature, digest, tokens, moments, kept)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            stats.match_id, stats.puuid, token_budget, signature,
+            digest.text, digest.tokens, digest.moments, digest.kept
+        ))
+    return digest
@@ -0,0 +1,207 @@
+import json
+import sqlite3
+import sys
+from array import array
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from src.database import connection, transaction
+
+# Per-minute participant frame fields we keep: name -> path inside
+# info.frames[m].participantFrames[participantId]. Each name is a BLOB column
+# of the participant_frames table.
+FRAME_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "gold": ("totalGold",),
+    "current_gold": ("currentGold",),
+    "xp": ("xp",),
+    "level": ("level",),
+    "cs": ("minionsKilled",),
+    "jungle_cs": ("jungleMinionsKilled",),
+    "position_x": ("position", "x"),
+    "position_y": ("position", "y"),
+}
+
+# Signed 32-bit values, stored little-endian
+TYPECODE = "i"
+
+# SQLite's default limit on bound parameters is 999
+_BATCH_SIZE = 500
+
+def _to_blob(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(TYPECODE, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _from_blob(blob: bytes) -> array:
+    values = array(TYPECODE)
+    values.frombytes(blob)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+class FrameMatrix:
+    """
+    One field for every participant and minute of a match, as a flat
+    participant-major array.
+    Index with `[participant, minute]`, both 0-based: participant `i` is
+    participantId `i + 1`, and minute `m` is the frame at m * frameInterval.
+    """
+    def __init__(self, values: array, participants: int, minutes: int):
+        if len(values) != participants * minutes:
+            raise ValueError(f"Expected {participants * minutes} values, got {len(values)}")
+        self.values = values
+        self.participants = participants
+        self.minutes = minutes
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.participants, self.minutes
+
+    def __getitem__(self, key: Tuple[int, int]) -> int:
+        participant, minute = key
+        if not 0 <= participant < self.participants or not 0 <= minute < self.minutes:
+            raise IndexError(f"Frame index {key} out of range for shape {self.shape}")
+        return self.values[participant * self.minutes + minute]
+
+    def row(self, participant: int) -> array:
+        """
+        Every minute of one participant.
+        """
+        if not 0 <= participant < self.participants:
+            raise IndexError(f"Participant {participant} out of range ({self.participants} participants)")
+        start = participant * self.minutes
+        return self.values[start:start + self.minutes]
+
+    def tolist(self) -> List[List[int]]:
+        return [self.row(p).tolist() for p in range(self.participants)]
+
+class ParticipantFrames:
+    """
+    Per-minute frame data of one match. `frames["gold"][participant, minute]`
+    """
+    def __init__(self, match_id: str, puuids: List[str], minutes: int, fields: Dict[str, FrameMatrix]):
+        self.match_id = match_id
+        self.puuids = puuids
+        self.minutes = minutes
+        self.fields = fields
+
+    def __getitem__(self, field: str) -> FrameMatrix:
+        return self.fields[field]
+
+    def participant_index(self, puuid: str) -> int:
+        """
+        Row of `puuid` in every matrix. Raises ValueError if they did not play.
+        """
+        return self.puuids.index(puuid)
+
+class FrameCollector:
+    """
+    Builds `ParticipantFrames` from participantFrames objects fed one minute at
+    a time, so a streamed timeline never has to be held in memory.
+    """
+    def __init__(self):
+        self.match_id: Optional[str] = None
+        self.puuids: List[str] = []
+        self._columns: Dict[str, List[array]] = {}
+
+    def start(self, match_id: str, puuids: Sequence[str]) -> None:
+        self.match_id = match_id
+        self.puuids = list(puuids)
+        self._columns = {name: [array(TYPECODE) for _ in self.puuids] for name in FRAME_FIELDS}
+
+    def add(self, participant_frames: Dict[str, Any]) -> None:
+        for index in range(len(self.puuids)):
+            frame = participant_frames.get(str(index + 1)) or {}
+            for name, path in FRAME_FIELDS.items():
+                value = frame
+                for key in path:
+                    value = value.get(key) if isinstance(value, dict) else None
+                self._columns[name][index].append(int(value or 0))
+
+    def build(self) -> ParticipantFrames:
+        if self.match_id is None:
+            raise ValueError("FrameCollector.start() was never called")
+        minutes = len(self._columns["gold"][0]) if self.puuids else 0
+        fields = {}
+        for name, rows in self._columns.items():
+            values = array(TYPECODE)
+            for row in rows:
+                values.extend(row)
+            fields[name] = FrameMatrix(values, len(self.puuids), minutes)
+        return ParticipantFrames(self.match_id, self.puuids, minutes, fields)
+
+def parse_participant_frames(timeline_data: Dict[str, Any]) -> ParticipantFrames:
+    """
+    Extracts FRAME_FIELDS for every participant and minute of a decoded timeline.
+    """
+    info = timeline_data["info"]
+    participant_id_map = {p["participantId"]: p["puuid"] for p in info["participants"]}
+    puuids = [participant_id_map[pid] for pid in sorted(participant_id_map)]
+
+    collector = FrameCollector()
+    collector.start(timeline_data["metadata"]["matchId"], puuids)
+    for frame in info["frames"]:
+        collector.add(frame.get("participantFrames", {}))
+    return collector.build()
+
+def save_participant_frames(frames: ParticipantFrames, conn: Optional[sqlite3.Connection] = None):
+    """
+    Stores (or replaces) one match's frames as one row with a blob per field.
+    Joins the current `transaction()`, or pass `conn` to write on a
+    caller-managed connection (no commit here).
+    """
+    columns = ", ".join(FRAME_FIELDS)
+    placeholders = ", ".join("?" for _ in FRAME_FIELDS)
+    with transaction() if conn is None else nullcontext(conn) as conn:
+        conn.execute(f'''
+            INSERT OR REPLACE INTO participant_frames (match_id, puuids, participants, minutes, {columns})
+            VALUES (?, ?, ?, ?, {placeholders})
+        ''', (
+            frames.match_id, json.dumps(frames.puuids), len(frames.puuids), frames.minutes,
+            *(_to_blob(frames[name].values) for name in FRAME_FIELDS)
+        ))
+
+def _check_fields(fields: Optional[Iterable[str]]) -> List[str]:
+    fields = list(fields) if fields is not None else list(FRAME_FIELDS)
+    unknown = [name for name in fields if name not in FRAME_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown frame fields: {', '.join(unknown)}")
+    return fields
+
+def get_participant_frames_batch(
+    match_ids: Iterable[str],
+    fields: Optional[Iterable[str]] = None
+) -> Dict[str, ParticipantFrames]:
+    """
+    Loads frames for many matches, reading only the requested `fields`
+    (default: all). Matches without stored frames are left out.
+    """
+    fields = _check_fields(fields)
+    match_ids = list(match_ids)
+    columns = "".join(f", {name}" for name in fields)
+
+    result = {}
+    conn = connection()
+    for i in range(0, len(match_ids), _BATCH_SIZE):
+        batch = match_ids[i:i + _BATCH_SIZE]
+        placeholders = ", ".join("?" for _ in batch)
+        rows = conn.execute(f'''
+            SELECT match_id, puuids, participants, minutes{columns} FROM participant_frames
+            WHERE match_id IN ({placeholders})
+        ''', batch).fetchall()
+
+        for row in rows:
+            participants, minutes = row["participants"], row["minutes"]
+            result[row["match_id"]] = ParticipantFrames(
+                row["match_id"],
+                json.loads(row["puuids"]),
+                minutes,
+                {name: FrameMatrix(_from_blob(row[name]), participants, minutes) for name in fields}
+            )
+    return result
+
+def get_participant_frames(match_id: str, fields: Optional[Iterable[str]] = None) -> Optional[ParticipantFrames]:
+    """
+    Loads one match's frames, e.g. `get_participant_frames(match_id)["gold"][participant, minute]`.
+    """
+    return get_participant_frames_batch([match_id], fields).get(match_id)
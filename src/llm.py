@@ -1,32 +1,259 @@
 import os
+import time
+from types import SimpleNamespace
 from google import genai
-from typing import List, Optional
+from typing import Any, Callable, Iterator, List, Optional
+from pydantic import BaseModel
+from src.database import record_llm_call
+from src.digest import DEFAULT_TOKEN_BUDGET, Digest, build_digest, estimate_tokens, get_match_digest, load_roster
+from src.llm_cache import SummaryCache
 from src.models import GameStatsDto, TimelineEventDto
+from src.ratelimit import RateLimiter
+
+# Rate limiter host for Gemini calls, see RateLimiter.acquire()
+LLM_HOST = "generativelanguage.googleapis.com"
+
+FAKE_SUMMARY = (
+    "You played a solid laning phase and kept your CS close to the benchmark. "
+    "Most of your deaths came from overextending after the 20 minute mark. "
+    "Ward the river before pushing and your late game will carry more weight."
+)
+
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+def _prompt_token_count(response: Any) -> Optional[int]:
+    count = getattr(getattr(response, "usage_metadata", None), "prompt_token_count", None)
+    return count if isinstance(count, int) else None
+
+class CallTiming(BaseModel):
+    prompt_tokens: int
+    latency_ms: float # Until the full response (0 for cache hits)
+    ttft_ms: Optional[float] = None # Until the first chunk, streaming calls only
+    cached: bool
+    ok: bool
+
+class FakeBackend:
+    """
+    Offline stand-in for `genai.Client`: answers every prompt with `text`,
+    streamed in `chunk_size`-character chunks `delay` seconds apart. Pass it
+    as `LLMClient(backend=...)`; prompts received are kept in `prompts`.
+    Its `model` name keeps canned answers apart from real ones in the cache
+    and call log.
+    """
+    model = "fake-llm"
+
+    def __init__(
+        self,
+        text: str = FAKE_SUMMARY,
+        chunk_size: int = 12,
+        delay: float = 0.05,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.sleep = sleep
+        self.prompts: List[str] = []
+        # Same shape as genai.Client: client.models.generate_content(...)
+        self.models = self
+
+    def _chunks(self) -> List[str]:
+        return [self.text[i:i + self.chunk_size] for i in range(0, len(self.text), self.chunk_size)]
+
+    def generate_content(self, model: str, contents: str) -> Any:
+        self.prompts.append(contents)
+        self.sleep(self.delay * len(self._chunks()))
+        return SimpleNamespace(text=self.text, usage_metadata=None)
+
+    def generate_content_stream(self, model: str, contents: str) -> Iterator[Any]:
+        self.prompts.append(contents)
+        for chunk in self._chunks():
+            self.sleep(self.delay)
+            yield SimpleNamespace(text=chunk, usage_metadata=None)
 
 class LLMClient:
-    def __init__(self):
+    MODEL = "gemini-2.0-flash"
+
+    def __init__(
+        self,
+        cache: Optional[SummaryCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+        backend: Optional[Any] = None
+    ):
         self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
+        # Cache entries and logged calls are per model, so a backend with
+        # its own model name never answers for the real one
+        self.model = self.MODEL if backend is None else getattr(backend, "model", self.MODEL)
+        if backend is None:
+            if not self.api_key:
+                raise ValueError("GEMINI_API_KEY not found in environment variables")
+            backend = genai.Client(api_key=self.api_key)
         
-        self.client = genai.Client(api_key=self.api_key)
+        # genai.Client, or e.g. FakeBackend for offline runs
+        self.client = backend
+        # match_summaries holds one summary per game, reserved for the real model
+        self.stores_summaries = self.model == self.MODEL
+        self.cache = cache or SummaryCache()
+        # Optional client-side cap; cache hits never wait on it
+        self.rate_limiter = rate_limiter
+        self.token_budget = token_budget
+        # Timing of the most recent call, see CallTiming
+        self.last_call: Optional[CallTiming] = None
 
-    def generate_match_summary(self, stats: GameStatsDto, events: List[TimelineEventDto]) -> str:
+    def generate_match_summary(
+        self,
+        stats: GameStatsDto,
+        events: Optional[List[TimelineEventDto]] = None,
+        use_cache: bool = True
+    ) -> str:
         """
         Generates a text summary of the match using the LLM.
+        Returns an error message instead of raising, see `summarize_match`.
         """
-        prompt = self._construct_prompt(stats, events)
-        
+        try:
+            return self.summarize_match(stats, events, use_cache)
+        except Exception as e:
+            # Never cached, so the next run retries
+            return f"Error generating summary: {str(e)}"
+
+    def summarize_match(
+        self,
+        stats: GameStatsDto,
+        events: Optional[List[TimelineEventDto]] = None,
+        use_cache: bool = True
+    ) -> str:
+        """
+        Like `generate_match_summary`, but raises on API errors or an empty
+        response. A prompt already answered by the same model is served from
+        the cache; `use_cache=False` always calls the model and refreshes the entry.
+        The timeline goes into the prompt as a digest of at most `token_budget`
+        tokens: the cached one built from stored rows, or one built from
+        `events` when given.
+        """
+        prompt = self._construct_prompt(stats, self._digest(stats, events).text)
+        cached = self._cached(stats, prompt, use_cache)
+        if cached is not None:
+            return cached
+
+        self._acquire()
+        started = time.perf_counter()
         try:
             response = self.client.models.generate_content(
-                model='gemini-2.0-flash', 
+                model=self.model,
                 contents=prompt
             )
-            return response.text
+            if not response.text:
+                raise ValueError("Empty response from the model")
+        except Exception:
+            self._record_call(stats, prompt, _elapsed_ms(started), cached=False, ok=False)
+            raise
+        self._record_call(
+            stats, prompt, _elapsed_ms(started), cached=False, ok=True,
+            prompt_tokens=_prompt_token_count(response)
+        )
+
+        self.cache.put(self.model, prompt, response.text)
+        return response.text
+
+    def generate_match_summary_stream(
+        self,
+        stats: GameStatsDto,
+        events: Optional[List[TimelineEventDto]] = None,
+        use_cache: bool = True
+    ) -> Iterator[str]:
+        """
+        Streaming `generate_match_summary`: yields text as it is generated.
+        On failure the error message is yielded instead, after any text
+        already received.
+        """
+        try:
+            yield from self.summarize_match_stream(stats, events, use_cache)
         except Exception as e:
-            return f"Error generating summary: {str(e)}"
+            yield f"Error generating summary: {str(e)}"
+
+    def summarize_match_stream(
+        self,
+        stats: GameStatsDto,
+        events: Optional[List[TimelineEventDto]] = None,
+        use_cache: bool = True
+    ) -> Iterator[str]:
+        """
+        Streaming `summarize_match`: yields chunks as the model produces them
+        (a cached summary arrives as one chunk), and raises like it, possibly
+        after some chunks. Only a completed response is cached. Time to first
+        token and total time are in `last_call` once the stream is exhausted.
+        """
+        prompt = self._construct_prompt(stats, self._digest(stats, events).text)
+        cached = self._cached(stats, prompt, use_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        self._acquire()
+        started = time.perf_counter()
+        first_chunk_ms = None
+        chunks = []
+        prompt_tokens = None
+        try:
+            for chunk in self.client.models.generate_content_stream(model=self.model, contents=prompt):
+                prompt_tokens = _prompt_token_count(chunk) or prompt_tokens
+                if chunk.text:
+                    if first_chunk_ms is None:
+                        first_chunk_ms = _elapsed_ms(started)
+                    chunks.append(chunk.text)
+                    yield chunk.text
+            if not chunks:
+                raise ValueError("Empty response from the model")
+        except Exception:
+            self._record_call(stats, prompt, _elapsed_ms(started), cached=False, ok=False, ttft_ms=first_chunk_ms)
+            raise
+        self._record_call(
+            stats, prompt, _elapsed_ms(started), cached=False, ok=True,
+            prompt_tokens=prompt_tokens, ttft_ms=first_chunk_ms
+        )
+
+        self.cache.put(self.model, prompt, "".join(chunks))
+
+    def _cached(self, stats: GameStatsDto, prompt: str, use_cache: bool) -> Optional[str]:
+        if not use_cache:
+            return None
+        cached = self.cache.get(self.model, prompt)
+        if cached is not None:
+            self._record_call(stats, prompt, latency_ms=0.0, cached=True, ok=True, ttft_ms=0.0)
+        return cached
+
+    def _acquire(self) -> None:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(LLM_HOST, self.model)
+
+    def _digest(self, stats: GameStatsDto, events: Optional[List[TimelineEventDto]]) -> Digest:
+        if events is None:
+            return get_match_digest(stats, self.token_budget)
+        return build_digest(stats, events, load_roster(stats), token_budget=self.token_budget)
 
-    def _construct_prompt(self, stats: GameStatsDto, events: List[TimelineEventDto]) -> str:
+    def _record_call(
+        self,
+        stats: GameStatsDto,
+        prompt: str,
+        latency_ms: float,
+        cached: bool,
+        ok: bool,
+        prompt_tokens: Optional[int] = None,
+        ttft_ms: Optional[float] = None
+    ) -> None:
+        # The API's own count when it reports one, else our estimate
+        if prompt_tokens is None:
+            prompt_tokens = estimate_tokens(prompt)
+        self.last_call = CallTiming(
+            prompt_tokens=prompt_tokens, latency_ms=latency_ms, ttft_ms=ttft_ms, cached=cached, ok=ok
+        )
+        record_llm_call(
+            self.model, stats.match_id, self.token_budget, len(prompt), prompt_tokens, latency_ms, cached, ok, ttft_ms
+        )
+
+    def _construct_prompt(self, stats: GameStatsDto, digest: str) -> str:
         stats_text = (
             f"Match ID: {stats.match_id}\n"
             f"Champion: {stats.champion_name}\n"
@@ -40,42 +267,14 @@ class LLMClient:
             f"Position: {stats.team_position}\n"
         )
 
-        # Filter events for brevity but give enough context
-        # We'll take first 10 mins events + all kills involving user + obj kills
-        events_text = "Key Timeline Events:\n"
-        for event in events:
-            # Simple formatter
-            timestamp = f"{event.timestamp // 60000}m{int((event.timestamp % 60000) / 1000)}s"
-            if event.type == "CHAMPION_KILL":
-                actor = "User" if event.killer_id == self._get_pid_from_puuid(events, stats.puuid) else "Enemy" 
-                # Note: getting pid is tricky without extra info, but let's assume events passed are already filtered/processed or
-                # we just describe "Killer ID {x} killed Victim ID {y}"
-                # Actually, TimelineEventDto has killer_id/victim_id but not mapped to names.
-                # Steps 3/4 logic should handles this? 
-                # Let's just dump raw event for now, LLM can figure out patterns if we are consistent.
-                # Better: describe relative to user.
-                
-                # Wait, TimelineEventDto doesn't have easy lookup for "My PID" unless we passed it.
-                # But stats has `puuid`.
-                pass
-            
-            events_text += f"- {timestamp}: {event.type} (Killer: {event.killer_id}, Victim: {event.victim_id})\n"
-        
-        # Simpler prompting for MVP - just dump the stats and ask for analysis
         prompt = (
             "You are a helpful League of Legends coach. Analyze this match performance based on the specific statistics provided below.\n"
             "Identify why the game was won or lost based on the metrics compared to standard benchmarks.\n"
             "Be concise, encouraging, but direct about mistakes if stats show them (e.g. low CS, high deaths).\n\n"
             "GAME STATS:\n"
-            f"{stats_text}\n\n"
+            f"{stats_text}\n"
+            "KEY MOMENTS:\n"
+            f"{digest}\n\n"
             "Provide a 3-sentence summary of the performance."
         )
         return prompt
-
-    def _get_pid_from_puuid(self, events: List[TimelineEventDto], puuid: str) -> Optional[int]:
-        # Helper not fully possible with just Event DTO unless we stuck pid in there?
-        # Re-checking models.py... TimelineEventDto has puuid.
-        # But killer_id is an Int (participantId).
-        # We need the map.
-        # For this MVP, let's rely just on the Stats summary which is rich enough for a basic coaching comment.
-        pass
@@ -0,0 +1,81 @@
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, Optional
+from src.database import connection, transaction
+
+# Eviction defaults: least recently used entries beyond DEFAULT_MAX_ENTRIES
+# and entries created more than DEFAULT_MAX_AGE seconds ago are dropped.
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+
+def cache_key(model: str, prompt: str) -> str:
+    """
+    Identifies a response: the same prompt sent to another model is another entry.
+    """
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+class SummaryCache:
+    """
+    LLM responses stored in the llm_cache table, next to the game data, so
+    repeated prompts skip the API call across runs.
+    Only successful responses should be `put`; hits and misses are counted
+    per instance, see `stats()`. Safe to share between threads.
+    """
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_age: float = DEFAULT_MAX_AGE,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, model: str, prompt: str) -> Optional[str]:
+        """
+        The cached response, or None if missing or older than `max_age`.
+        """
+        key = cache_key(model, prompt)
+        now = int(self.clock())
+        with transaction() as conn:
+            row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or row["created_at"] < now - self.max_age:
+                with self._lock:
+                    self.misses += 1
+                return None
+            conn.execute("UPDATE llm_cache SET last_used_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        with self._lock:
+            self.hits += 1
+        return row["response"]
+
+    def put(self, model: str, prompt: str, response: str) -> None:
+        """
+        Stores (or refreshes) a response, then applies the eviction policy.
+        """
+        now = int(self.clock())
+        with transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, last_used_at, hits)
+                VALUES (?, ?, ?, ?, ?, 0)
+            ''', (cache_key(model, prompt), model, response, now, now))
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.max_age,))
+            conn.execute('''
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+
+    def clear(self) -> None:
+        with transaction() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Hits and misses of this instance, and the entries currently stored.
+        """
+        entries = connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
@@ -34,6 +34,7 @@ class GameStatsDto(BaseModel):
     
     # Positions
     team_position: str # TOP, JUNGLE, MIDDLE, BOTTOM, UTILITY
+    participant_id: Optional[int] = None # Timeline killer/victim IDs: 1-5 blue side, 6-10 red side
 
 class TimelineEventDto(BaseModel):
     match_id: str
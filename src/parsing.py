@@ -1,17 +1,12 @@
-from typing import List, Dict, Any, Optional
+import json
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from src.frames import FrameCollector
 from src.models import GameStatsDto, TimelineEventDto
 
-def parse_match_to_stats(match_data: Dict[str, Any], puuid: str) -> GameStatsDto:
-    info = match_data["info"]
-    game_creation = info["gameCreation"]
-    game_duration = info["gameDuration"]
-    match_id = match_data["metadata"]["matchId"]
-    
-    # Find participant
-    participant = next((p for p in info["participants"] if p["puuid"] == puuid), None)
-    if not participant:
-        raise ValueError(f"Participant with PUUID {puuid} not found in match {match_id}")
+# Bump whenever parsing output changes, so process.py knows stored rows are stale
+PARSER_VERSION = 3
 
+def _participant_to_stats(match_id: str, game_creation: int, game_duration: int, participant: Dict[str, Any]) -> GameStatsDto:
     # Calculate stats
     kills = participant["kills"]
     deaths = participant["deaths"]
@@ -29,7 +24,7 @@ def parse_match_to_stats(match_data: Dict[str, Any], puuid: str) -> GameStatsDto
     
     return GameStatsDto(
         match_id=match_id,
-        puuid=puuid,
+        puuid=participant["puuid"],
         champion_name=participant["championName"],
         win=participant["win"],
         game_creation=game_creation,
@@ -48,63 +43,223 @@ def parse_match_to_stats(match_data: Dict[str, Any], puuid: str) -> GameStatsDto
         vision_score=participant["visionScore"],
         wards_placed=participant["wardsPlaced"],
         wards_killed=participant["wardsKilled"],
-        team_position=participant["teamPosition"]
+        team_position=participant["teamPosition"],
+        participant_id=participant.get("participantId")
     )
 
-def parse_timeline_to_events(timeline_data: Dict[str, Any], puuid: str) -> List[TimelineEventDto]:
-    match_id = timeline_data["metadata"]["matchId"]
-    info = timeline_data["info"]
-    frames = info["frames"]
-    
-    # Map participantId to PUUID to filter relevant events
-    participants = info["participants"]
-    participant_id_map = {p["participantId"]: p["puuid"] for p in participants}
-    
-    # Find our participant ID
-    my_pid = next((pid for pid, p_puuid in participant_id_map.items() if p_puuid == puuid), None)
-    
-    events = []
+def parse_match_to_stats(match_data: Dict[str, Any], puuid: str) -> GameStatsDto:
+    info = match_data["info"]
+    match_id = match_data["metadata"]["matchId"]
     
+    # Find participant
+    participant = next((p for p in info["participants"] if p["puuid"] == puuid), None)
+    if not participant:
+        raise ValueError(f"Participant with PUUID {puuid} not found in match {match_id}")
+
+    return _participant_to_stats(match_id, info["gameCreation"], info["gameDuration"], participant)
+
+def parse_match_to_all_stats(match_data: Dict[str, Any]) -> List[GameStatsDto]:
+    """
+    Parses stats for every participant of the match in one pass.
+    """
+    info = match_data["info"]
+    match_id = match_data["metadata"]["matchId"]
+    return [
+        _participant_to_stats(match_id, info["gameCreation"], info["gameDuration"], participant)
+        for participant in info["participants"]
+    ]
+
+# Timeline event types we keep: (participant IDs involved, extra DTO fields).
+# Involved is None when the event matters to every participant (objectives).
+# Every other event type is dropped before anything is built for it.
+def _kill_parties(event: Dict[str, Any]) -> Optional[Sequence[Optional[int]]]:
+    return (event.get("killerId"), event.get("victimId"))
+
+def _kill_fields(event: Dict[str, Any]) -> Dict[str, Any]:
+    return {"killer_id": event.get("killerId"), "victim_id": event.get("victimId")}
+
+def _objective_parties(event: Dict[str, Any]) -> Optional[Sequence[Optional[int]]]:
+    return None
+
+def _objective_fields(event: Dict[str, Any]) -> Dict[str, Any]:
+    return {"killer_id": event.get("killerId"), "monster_type": event.get("monsterType")}
+
+def _structure_parties(event: Dict[str, Any]) -> Optional[Sequence[Optional[int]]]:
+    return (event.get("killerId"),)
+
+def _no_fields(event: Dict[str, Any]) -> Dict[str, Any]:
+    return {}
+
+EventHandler = Tuple[
+    Callable[[Dict[str, Any]], Optional[Sequence[Optional[int]]]],
+    Callable[[Dict[str, Any]], Dict[str, Any]]
+]
+
+EVENT_HANDLERS: Dict[str, EventHandler] = {
+    "CHAMPION_KILL": (_kill_parties, _kill_fields),
+    "ELITE_MONSTER_KILL": (_objective_parties, _objective_fields),
+    "TURRET_PLATE_DESTROYED": (_structure_parties, _no_fields),
+    "BUILDING_KILL": (_structure_parties, _no_fields),
+}
+
+_NO_POSITION: Dict[str, int] = {}
+
+def _iter_frame_events(frames: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
     for frame in frames:
-        for event in frame["events"]:
-            # logic to filter interesting events involving the user
-            # We want events where the user is the killer, victim, or assister? 
-            # For MVP, let's capture strict Kills/Deaths/Objective Kills
-            
-            event_type = event["type"]
-            timestamp = event["timestamp"]
-            
-            dto = TimelineEventDto(
+        yield from frame["events"]
+
+def _iter_event_rows(
+    match_id: str,
+    events: Iterable[Dict[str, Any]],
+    participant_id_map: Dict[int, str],
+    puuid: Optional[str] = None
+) -> Iterator[TimelineEventDto]:
+    """
+    Yields a row for each kept event and each player it belongs to: `puuid`
+    only, or every participant when `puuid` is None.
+    """
+    my_pid = next((pid for pid, p_puuid in participant_id_map.items() if p_puuid == puuid), None)
+    everyone = list(participant_id_map.values())
+
+    for event in events:
+        handler = EVENT_HANDLERS.get(event["type"])
+        if handler is None:
+            continue
+        parties, fields = handler
+        involved = parties(event)
+
+        if puuid is not None:
+            if involved is not None and my_pid not in involved:
+                continue
+            owners = (puuid,)
+        elif involved is None:
+            owners = everyone
+        else:
+            owners = [participant_id_map[pid] for pid in dict.fromkeys(involved) if pid in participant_id_map]
+
+        position = event.get("position") or _NO_POSITION
+        details = fields(event)
+        for owner in owners:
+            yield TimelineEventDto(
                 match_id=match_id,
-                puuid=puuid,
-                timestamp=timestamp,
-                type=event_type,
-                position_x=event.get("position", {}).get("x"),
-                position_y=event.get("position", {}).get("y")
+                puuid=owner,
+                timestamp=event["timestamp"],
+                type=event["type"],
+                position_x=position.get("x"),
+                position_y=position.get("y"),
+                **details
             )
-            
-            should_add = False
-            
-            if event_type == "CHAMPION_KILL":
-                dto.killer_id = event.get("killerId")
-                dto.victim_id = event.get("victimId")
-                # Add if user involved
-                if dto.killer_id == my_pid or dto.victim_id == my_pid:
-                    should_add = True
-                    
-            elif event_type == "ELITE_MONSTER_KILL":
-                dto.killer_id = event.get("killerId")
-                dto.monster_type = event.get("monsterType")
-                # Add if user's team involved (approximate by killerId being user)
-                # Or just track all objectives for context? Let's track all objectives for now.
-                should_add = True
-                
-            elif event_type == "TURRET_PLATE_DESTROYED" or event_type == "BUILDING_KILL":
-                 # Track structures depending on noise. Let's skip for MVP unless user involved
-                 if event.get("killerId") == my_pid:
-                     should_add = True
-
-            if should_add:
-                events.append(dto)
-                
-    return events
+
+def parse_timeline_to_events(timeline_data: Dict[str, Any], puuid: str) -> List[TimelineEventDto]:
+    """
+    Kills/deaths involving the player, every objective, and structures the
+    player destroyed.
+    """
+    info = timeline_data["info"]
+    participant_id_map = {p["participantId"]: p["puuid"] for p in info["participants"]}
+    return list(_iter_event_rows(
+        timeline_data["metadata"]["matchId"], _iter_frame_events(info["frames"]), participant_id_map, puuid
+    ))
+
+def parse_timeline_to_all_events(timeline_data: Dict[str, Any]) -> List[TimelineEventDto]:
+    """
+    Parses events for every participant in one pass over the frames.
+    Produces the same rows as calling `parse_timeline_to_events` once per
+    participant.
+    """
+    info = timeline_data["info"]
+    participant_id_map = {p["participantId"]: p["puuid"] for p in info["participants"]}
+    return list(_iter_event_rows(
+        timeline_data["metadata"]["matchId"], _iter_frame_events(info["frames"]), participant_id_map
+    ))
+
+def timeline_event_keys(timeline_data: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """
+    The (match_id, puuid) of every participant: the rows that
+    `parse_timeline_to_all_events` output replaces when saved.
+    """
+    match_id = timeline_data["metadata"]["matchId"]
+    return [(match_id, p["puuid"]) for p in timeline_data["info"]["participants"]]
+
+def ijson_available() -> bool:
+    """
+    Streaming timeline decoding needs the optional `ijson` package.
+    """
+    try:
+        import ijson  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+# Prefixes (in ijson's notation) of the objects parse_timeline_stream needs
+_STREAM_ITEMS = {
+    "metadata": "metadata",
+    "info.frames.item.events.item": "event",
+    "info.frames.item.participantFrames": "participant_frames",
+}
+# ijson tokenizes a whole read buffer at a time, so this bounds peak memory
+STREAM_BUFFER_SIZE = 8 * 1024
+
+def _iter_timeline_items(fileobj: BinaryIO, participant_frames: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yields ("metadata", dict) and then ("event", dict) for every frame event,
+    plus ("participant_frames", dict) per frame if asked, in file order.
+    With ijson only one object is held in memory at a time, otherwise the
+    whole document is decoded first.
+    """
+    if not ijson_available():
+        timeline_data = json.load(fileobj)
+        yield "metadata", timeline_data["metadata"]
+        for frame in timeline_data["info"]["frames"]:
+            for event in frame["events"]:
+                yield "event", event
+            if participant_frames:
+                yield "participant_frames", frame.get("participantFrames", {})
+        return
+
+    import ijson
+    wanted = {prefix for prefix, kind in _STREAM_ITEMS.items() if participant_frames or kind != "participant_frames"}
+    builder = None
+    current = None
+    for prefix, token, value in ijson.parse(fileobj, buf_size=STREAM_BUFFER_SIZE, use_float=True):
+        if builder is not None:
+            builder.event(token, value)
+            if token == "end_map" and prefix == current:
+                yield _STREAM_ITEMS[current], builder.value
+                builder = None
+        elif token == "start_map" and prefix in wanted:
+            current = prefix
+            builder = ijson.ObjectBuilder()
+            builder.event(token, value)
+
+def parse_timeline_stream(
+    fileobj: BinaryIO,
+    puuid: Optional[str] = None,
+    frames: Optional[FrameCollector] = None
+) -> List[TimelineEventDto]:
+    """
+    Same rows as `parse_timeline_to_events` (or `parse_timeline_to_all_events`
+    when `puuid` is None), decoded incrementally from a binary JSON stream so
+    peak memory does not grow with the frames array.
+    Participant IDs are taken from `metadata.participants` (ordered by
+    participantId), because `info.participants` comes after the frames.
+    Pass a `FrameCollector` as `frames` to gather participant frames in the
+    same pass.
+    """
+    items = _iter_timeline_items(fileobj, participant_frames=frames is not None)
+    kind, metadata = next(items, (None, None))
+    if kind != "metadata":
+        raise ValueError("Timeline metadata must precede its frames")
+
+    participant_id_map = {pid: p_puuid for pid, p_puuid in enumerate(metadata["participants"], start=1)}
+    if frames is not None:
+        frames.start(metadata["matchId"], metadata["participants"])
+
+    def events():
+        for kind, item in items:
+            if kind == "event":
+                yield item
+            elif frames is not None:
+                frames.add(item)
+
+    return list(_iter_event_rows(metadata["matchId"], events(), participant_id_map, puuid))
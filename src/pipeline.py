@@ -0,0 +1,165 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, List, Optional
+
+# Marks the end of a stage's input. Each worker consumes exactly one.
+_DONE = object()
+
+class Stage:
+    """
+    One step of a `Pipeline`: a pool of worker threads reading a bounded queue.
+
+    `func(item, emit)` handles one input item and calls `emit(output)` for
+    every item it wants to pass downstream (zero, one or many). With
+    `batch_size > 1`, `func` receives a list of up to `batch_size` items
+    instead, which is how the DB writer groups many matches per commit.
+
+    Because queues are bounded, `emit` blocks when the next stage falls
+    behind, which keeps memory flat.
+    """
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Any, Callable[[Any], None]], None],
+        workers: int = 1,
+        queue_size: int = 32,
+        batch_size: int = 1,
+    ):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.input: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.next: Optional["Stage"] = None
+
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._active_workers = 0
+        self._threads: List[threading.Thread] = []
+
+    def emit(self, item: Any) -> None:
+        if self.next is not None:
+            self.next.input.put(item)
+
+    def start(self) -> None:
+        self._active_workers = self.workers
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self) -> None:
+        for thread in self._threads:
+            thread.join()
+
+    def _next_batch(self) -> List[Any]:
+        """
+        Blocks for one item, then drains whatever else is already queued
+        (up to batch_size) without waiting.
+        """
+        batch = [self.input.get()]
+        while len(batch) < self.batch_size and batch[-1] is not _DONE:
+            try:
+                batch.append(self.input.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            done = batch[-1] is _DONE
+            if done:
+                batch.pop()
+
+            if batch:
+                self._handle(batch if self.batch_size > 1 else batch[0], len(batch))
+
+            if done:
+                break
+
+        with self._lock:
+            self._active_workers -= 1
+            last_worker = self._active_workers == 0
+        if last_worker and self.next is not None:
+            # Tell every worker of the next stage that no more input is coming
+            for _ in range(self.next.workers):
+                self.next.input.put(_DONE)
+
+    def _handle(self, payload: Any, size: int) -> None:
+        started = time.perf_counter()
+        try:
+            self.func(payload, self.emit)
+        except Exception as e:
+            with self._lock:
+                self.errors += size
+            print(f"   -> [{self.name}] Error: {e}")
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.processed += size
+                self.busy_seconds += elapsed
+
+    def stats(self, elapsed: float) -> dict:
+        return {
+            "stage": self.name,
+            "queued": self.input.qsize(),
+            "processed": self.processed,
+            "errors": self.errors,
+            "per_second": self.processed / elapsed if elapsed > 0 else 0.0,
+        }
+
+class Pipeline:
+    """
+    Chains stages with bounded queues and runs them until the source is
+    exhausted. Prints per-stage queue depth and throughput every
+    `report_interval` seconds and once more at the end.
+    """
+    def __init__(self, stages: List[Stage], report_interval: float = 5.0):
+        self.stages = stages
+        self.report_interval = report_interval
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next = next_stage
+        self._started_at = 0.0
+
+    def run(self, source: Iterable[Any]) -> List[dict]:
+        self._started_at = time.perf_counter()
+        for stage in self.stages:
+            stage.start()
+
+        finished = threading.Event()
+        reporter = threading.Thread(target=self._report_until, args=(finished,), daemon=True)
+        reporter.start()
+
+        first = self.stages[0]
+        for item in source:
+            first.input.put(item)
+        for _ in range(first.workers):
+            first.input.put(_DONE)
+
+        for stage in self.stages:
+            stage.join()
+        finished.set()
+        reporter.join()
+
+        stats = self.stats()
+        self.print_stats(stats)
+        return stats
+
+    def stats(self) -> List[dict]:
+        elapsed = time.perf_counter() - self._started_at
+        return [stage.stats(elapsed) for stage in self.stages]
+
+    def print_stats(self, stats: List[dict]) -> None:
+        print("  Pipeline: " + " | ".join(
+            f"{s['stage']}: q={s['queued']} done={s['processed']} ({s['per_second']:.1f}/s)"
+            + (f" err={s['errors']}" if s["errors"] else "")
+            for s in stats
+        ))
+
+    def _report_until(self, finished: threading.Event) -> None:
+        while not finished.wait(self.report_interval):
+            self.print_stats(self.stats())
@@ -0,0 +1,268 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Mapping, Optional
+
+# Riot development keys: 20 requests / 1s and 100 requests / 2min per routing host.
+# Used until the first response tells us the real limits for the key.
+DEFAULT_APP_LIMITS = "20:1,100:120"
+
+# Per-bucket window state: {window_seconds: [limit, used, reset_at]}
+WindowState = Dict[int, List[float]]
+
+def parse_rate_limit_header(value: Optional[str]) -> Dict[int, int]:
+    """
+    Parses a Riot rate limit header ("20:1,100:120") into {window_seconds: value}.
+    Works for both the limit headers and their `-Count` counterparts.
+    """
+    parsed = {}
+    if not value:
+        return parsed
+    for part in value.split(","):
+        amount, _, window = part.strip().partition(":")
+        if amount and window:
+            parsed[int(window)] = int(amount)
+    return parsed
+
+def _reserve(state: Dict[str, WindowState], buckets: List[str], now: float) -> float:
+    """
+    Takes one request from every window of every bucket, or none at all.
+    Returns 0 if the request was granted, otherwise seconds until it could be.
+    """
+    wait = 0.0
+    for bucket in buckets:
+        for window, entry in state.get(bucket, {}).items():
+            if now >= entry[2]:
+                entry[1] = 0
+                entry[2] = now + window
+            if entry[1] >= entry[0]:
+                wait = max(wait, entry[2] - now)
+
+    if wait > 0:
+        return wait
+
+    for bucket in buckets:
+        for entry in state.get(bucket, {}).values():
+            entry[1] += 1
+    return 0.0
+
+def _sync(state: WindowState, limits: Dict[int, int], counts: Dict[int, int], now: float) -> WindowState:
+    """
+    Reconciles local window state with the limits/counts reported by the server.
+    Always errs on the conservative side: counts only go up, resets only move later.
+    """
+    synced = {}
+    for window, limit in limits.items():
+        entry = state.get(window) or [limit, 0, now + window]
+        entry[0] = limit
+        server_count = counts.get(window, 0)
+        if server_count > entry[1]:
+            entry[1] = server_count
+        if server_count == 1:
+            # The server just opened a new window with this request
+            entry[2] = max(entry[2], now + window)
+        synced[window] = entry
+    return synced
+
+def _block(state: WindowState, until: float, now: float) -> WindowState:
+    """
+    Marks every window of a bucket as exhausted until `until`. A bucket we have
+    no limits for yet gets a placeholder window so the block still holds.
+    """
+    if not state:
+        window = max(1, int(until - now + 0.999))
+        return {window: [1, 1, until]}
+    for entry in state.values():
+        entry[1] = entry[0]
+        entry[2] = max(entry[2], until)
+    return state
+
+class MemoryBucketStore:
+    """
+    In-process bucket store. Thread-safe, not shared between processes.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: Dict[str, WindowState] = {}
+
+    def reserve(self, buckets: List[str], now: float, defaults: Mapping[str, Dict[int, int]]) -> float:
+        with self._lock:
+            for bucket, limits in defaults.items():
+                if not self._state.get(bucket):
+                    self._state[bucket] = _sync({}, limits, {}, now)
+            return _reserve(self._state, buckets, now)
+
+    def sync(self, bucket: str, limits: Dict[int, int], counts: Dict[int, int], now: float) -> None:
+        with self._lock:
+            self._state[bucket] = _sync(self._state.get(bucket, {}), limits, counts, now)
+
+    def block(self, bucket: str, until: float, now: float) -> None:
+        with self._lock:
+            self._state[bucket] = _block(self._state.get(bucket, {}), until, now)
+
+class SQLiteBucketStore:
+    """
+    Bucket store backed by a local SQLite file, so several processes on one
+    host (e.g. parallel fetch_history.py runs) share the same app key budget.
+    Each reservation is a single IMMEDIATE transaction.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limit_windows (
+                bucket TEXT,
+                window INTEGER,
+                max_requests INTEGER,
+                used INTEGER,
+                reset_at REAL,
+                PRIMARY KEY (bucket, window)
+            )
+        ''')
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _load(self, buckets: List[str]) -> Dict[str, WindowState]:
+        placeholders = ",".join("?" for _ in buckets)
+        rows = self._conn.execute(
+            f"SELECT bucket, window, max_requests, used, reset_at FROM rate_limit_windows WHERE bucket IN ({placeholders})",
+            buckets
+        ).fetchall()
+        state: Dict[str, WindowState] = {bucket: {} for bucket in buckets}
+        for bucket, window, limit, used, reset_at in rows:
+            state[bucket][window] = [limit, used, reset_at]
+        return state
+
+    def _store(self, state: Dict[str, WindowState]) -> None:
+        for bucket, windows in state.items():
+            self._conn.execute("DELETE FROM rate_limit_windows WHERE bucket = ?", (bucket,))
+            self._conn.executemany(
+                "INSERT INTO rate_limit_windows (bucket, window, max_requests, used, reset_at) VALUES (?, ?, ?, ?, ?)",
+                [(bucket, window, entry[0], entry[1], entry[2]) for window, entry in windows.items()]
+            )
+
+    def _transaction(self, buckets: List[str], apply: Callable[[Dict[str, WindowState]], float]) -> float:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                state = self._load(buckets)
+                result = apply(state)
+                self._store(state)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return result
+
+    def reserve(self, buckets: List[str], now: float, defaults: Mapping[str, Dict[int, int]]) -> float:
+        def apply(state):
+            for bucket, limits in defaults.items():
+                if not state.get(bucket):
+                    state[bucket] = _sync({}, limits, {}, now)
+            return _reserve(state, buckets, now)
+        return self._transaction(buckets, apply)
+
+    def sync(self, bucket: str, limits: Dict[int, int], counts: Dict[int, int], now: float) -> None:
+        def apply(state):
+            state[bucket] = _sync(state[bucket], limits, counts, now)
+            return 0.0
+        self._transaction([bucket], apply)
+
+    def block(self, bucket: str, until: float, now: float) -> None:
+        def apply(state):
+            state[bucket] = _block(state[bucket], until, now)
+            return 0.0
+        self._transaction([bucket], apply)
+
+class RateLimiter:
+    """
+    Proactive limiter driven by Riot's rate limit headers.
+    Keeps one app bucket per routing host and one method bucket per
+    (host, method), and holds each request until every window has room.
+    """
+    def __init__(
+        self,
+        store=None,
+        default_app_limits: str = DEFAULT_APP_LIMITS,
+        safety_margin: float = 0.05,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.store = store or MemoryBucketStore()
+        self.default_app_limits = parse_rate_limit_header(default_app_limits)
+        self.safety_margin = safety_margin
+        self.clock = clock
+        self.sleep = sleep
+        self.total_wait = 0.0
+
+    @staticmethod
+    def app_bucket(host: str) -> str:
+        return f"app:{host}"
+
+    @staticmethod
+    def method_bucket(host: str, method: str) -> str:
+        return f"method:{host}:{method}"
+
+    def reserve(self, host: str, method: str) -> float:
+        """
+        Non-blocking attempt to take a slot for one request.
+        Returns 0 when granted, otherwise how long to wait before retrying.
+        """
+        app = self.app_bucket(host)
+        buckets = [app, self.method_bucket(host, method)]
+        wait = self.store.reserve(buckets, self.clock(), {app: self.default_app_limits})
+        return wait + self.safety_margin if wait > 0 else 0.0
+
+    def acquire(self, host: str, method: str) -> float:
+        """
+        Blocks until a request to `method` on `host` fits in every window.
+        Returns the number of seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            wait = self.reserve(host, method)
+            if wait <= 0:
+                self.total_wait += waited
+                return waited
+            self.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, host: str, method: str) -> float:
+        """
+        asyncio version of `acquire`; yields to the event loop while waiting.
+        """
+        waited = 0.0
+        while True:
+            wait = self.reserve(host, method)
+            if wait <= 0:
+                self.total_wait += waited
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def update(self, host: str, method: str, headers: Mapping[str, str]) -> None:
+        """
+        Feeds the X-App-Rate-Limit / X-Method-Rate-Limit headers (and their
+        -Count values) of a response back into the buckets.
+        """
+        now = self.clock()
+        app_limits = parse_rate_limit_header(headers.get("X-App-Rate-Limit"))
+        if app_limits:
+            counts = parse_rate_limit_header(headers.get("X-App-Rate-Limit-Count"))
+            self.store.sync(self.app_bucket(host), app_limits, counts, now)
+
+        method_limits = parse_rate_limit_header(headers.get("X-Method-Rate-Limit"))
+        if method_limits:
+            counts = parse_rate_limit_header(headers.get("X-Method-Rate-Limit-Count"))
+            self.store.sync(self.method_bucket(host, method), method_limits, counts, now)
+
+    def backoff(self, host: str, method: str, retry_after: float, limit_type: Optional[str] = None) -> None:
+        """
+        Closes the offending bucket after a 429 until Retry-After has passed.
+        """
+        bucket = self.app_bucket(host) if limit_type == "application" else self.method_bucket(host, method)
+        now = self.clock()
+        self.store.block(bucket, now + retry_after, now)
@@ -0,0 +1,198 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlencode
+from src import storage
+
+# Endpoint (rate limit method, see _RiotClientBase) -> seconds a response
+# stays fresh in memory. Only small responses belong here. Accounts are not
+# cached here: the accounts table (src/accounts.py) owns their TTL and
+# refreshes, and must reach account-v1 when it asks.
+CACHE_POLICIES: Dict[str, float] = {
+    "match-ids": 5 * 60, # New games show up at the front of the list
+}
+
+# Finished matches and timelines never change, and callers already keep them
+# in the raw store (see src/storage.py), so they are read back from there
+# instead of being copied into memory.
+RAW_ENDPOINTS = ("match", "timeline")
+
+DEFAULT_MEMORY_ENTRIES = 256
+
+def request_key(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+    """
+    Identifies a GET: the URL plus its query parameters in a stable order.
+    """
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted(params.items()))}"
+
+class _Flight:
+    """
+    One request in flight; identical requests wait on `done` and reuse its value.
+    """
+    def __init__(self, done: Any):
+        self.done = done # threading.Event or asyncio.Event
+        self.ok = False
+        self.value: Any = None
+
+class ResponseCache:
+    """
+    Read-through cache of decoded Riot API responses, consulted by the clients
+    before each request. Small responses live in a bounded in-memory LRU,
+    fresh per CACHE_POLICIES. With `raw_store`, matches and timelines already
+    saved by `storage.save_*` are served from there; nothing is written to it
+    here.
+    Identical requests in flight at the same time share one API call, on
+    every endpoint. Cached values are shared between callers, so treat them
+    as read-only. Safe to share between threads.
+    """
+    def __init__(
+        self,
+        raw_store: bool = False,
+        max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        policies: Optional[Mapping[str, float]] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.raw_store = raw_store
+        self.max_memory_entries = max_memory_entries
+        self.policies = dict(CACHE_POLICIES if policies is None else policies)
+        self.clock = clock
+
+        # key -> (expires_at, value), least recently used first
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, _Flight] = {}
+        self._in_flight_async: Dict[str, _Flight] = {}
+        self._counts = {"memory_hits": 0, "raw_hits": 0, "misses": 0, "deduplicated": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _shared(self, endpoint: str) -> bool:
+        # Endpoints whose identical in-flight requests are coalesced
+        return endpoint in self.policies or endpoint in RAW_ENDPOINTS
+
+    def get(self, endpoint: str, key: str, match_id: Optional[str] = None) -> Optional[Any]:
+        """
+        The fresh cached response, or None. Matches and timelines are looked
+        up by `match_id` in the raw store.
+        """
+        if endpoint in RAW_ENDPOINTS:
+            value = storage.load_raw(endpoint, match_id) if self.raw_store and match_id else None
+            self._count("misses" if value is None else "raw_hits")
+            return value
+
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._counts["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+            self._counts["misses"] += 1
+        return None
+
+    def put(self, endpoint: str, key: str, value: Any) -> None:
+        """
+        Keeps a response in memory, if the endpoint has a policy.
+        """
+        if endpoint not in self.policies:
+            return
+        with self._lock:
+            self._memory[key] = (self.clock() + self.policies[endpoint], value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_or_fetch(
+        self,
+        endpoint: str,
+        key: str,
+        fetch: Callable[[], Any],
+        match_id: Optional[str] = None
+    ) -> Any:
+        """
+        Cached response, or `fetch()` stored on success. While one thread
+        fetches a key, other threads asking for it wait and reuse the result
+        (and fetch themselves if it failed).
+        """
+        if not self._shared(endpoint):
+            return fetch()
+        while True:
+            value = self.get(endpoint, key, match_id)
+            if value is not None:
+                return value
+            with self._lock:
+                flight = self._in_flight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._in_flight[key] = _Flight(threading.Event())
+            if not leader:
+                self._count("deduplicated")
+                flight.done.wait()
+                if flight.ok:
+                    return flight.value
+                continue
+            try:
+                flight.value = fetch()
+                flight.ok = True
+                self.put(endpoint, key, flight.value)
+                return flight.value
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                flight.done.set()
+
+    async def get_or_fetch_async(
+        self,
+        endpoint: str,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        match_id: Optional[str] = None
+    ) -> Any:
+        """
+        `get_or_fetch` for coroutines: identical requests awaited concurrently
+        on the event loop share one API call.
+        """
+        if not self._shared(endpoint):
+            return await fetch()
+        while True:
+            value = self.get(endpoint, key, match_id)
+            if value is not None:
+                return value
+            flight = self._in_flight_async.get(key)
+            if flight is not None:
+                self._count("deduplicated")
+                await flight.done.wait()
+                if flight.ok:
+                    return flight.value
+                continue
+            flight = self._in_flight_async[key] = _Flight(asyncio.Event())
+            try:
+                flight.value = await fetch()
+                flight.ok = True
+                self.put(endpoint, key, flight.value)
+                return flight.value
+            finally:
+                del self._in_flight_async[key]
+                flight.done.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Hits per tier, misses and requests that waited on an identical one in
+        flight, for this instance; plus the entries currently in memory.
+        """
+        with self._lock:
+            stats = dict(self._counts)
+            stats["memory_entries"] = len(self._memory)
+        return stats
@@ -1,13 +1,43 @@
-import time
 import httpx
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from src.config import get_riot_api_key
+from src.ratelimit import RateLimiter
+from src.response_cache import ResponseCache, request_key
 
-class RiotClient:
+# Connection pool defaults. Riot routes every match-v5 call through a single
+# regional host, so a small pool of long-lived connections is enough.
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+
+def http2_available() -> bool:
     """
-    Minimal Riot API Client using httpx.
+    HTTP/2 support in httpx needs the optional `h2` package (httpx[http2]).
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class _RiotClientBase:
     """
-    def __init__(self, region: str = "americas", platform: str = "na1"):
+    Shared configuration, endpoint definitions and pool accounting for the
+    sync and async clients. Subclasses own the actual httpx client.
+    """
+    def __init__(
+        self,
+        region: str = "americas",
+        platform: str = "na1",
+        http2: bool = False,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
         self.api_key = get_riot_api_key()
         self.region = region
         self.platform = platform
@@ -17,69 +47,299 @@ class RiotClient:
             "X-Riot-Token": self.api_key
         }
 
-    def _get(self, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if http2 and not http2_available():
+            print("Warning: HTTP/2 requested but 'h2' is not installed. Falling back to HTTP/1.1.")
+            http2 = False
+        self.http2 = http2
+        self.rate_limiter = rate_limiter or RateLimiter()
+        # Pass ResponseCache(raw_store=True) to also read saved matches back
+        self.cache = cache if cache is not None else ResponseCache()
+
+        self._timeout = httpx.Timeout(timeout)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+
+        # Pool usage counters, see pool_stats()
+        self._requests_sent = 0
+        self._connections_opened = 0
+
+    def _count_trace_event(self, event_name: str) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._connections_opened += 1
+
+    def pool_stats(self) -> Dict[str, int]:
         """
-        Internal method to make GET requests.
-        Handles 429 Rate Limited responses by sleeping.
+        Returns request and connection counters for the shared pool.
+        `connections_reused` is the number of requests served on an
+        already open (keep-alive or multiplexed) connection.
         """
+        return {
+            "requests": self._requests_sent,
+            "connections_opened": self._connections_opened,
+            "connections_reused": max(0, self._requests_sent - self._connections_opened),
+        }
+
+    # Endpoint definitions: (url, rate limit method, params)
+
+    def _account_request(self, game_name: str, tag_line: str) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        url = f"{self.base_url_region}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
+        return url, "account", None
+
+    def _match_ids_request(
+        self,
+        puuid: str,
+        start: int,
+        count: int,
+        queue: Optional[int],
+        type: Optional[str],
+        start_time: Optional[int] = None
+    ) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        url = f"{self.base_url_region}/lol/match/v5/matches/by-puuid/{puuid}/ids"
+        params = {
+            "start": start,
+            "count": count
+        }
+        if queue:
+            params["queue"] = queue
+        if type:
+            params["type"] = type
+        if start_time is not None:
+            params["startTime"] = start_time
+        return url, "match-ids", params
+
+    def _match_request(self, match_id: str) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        url = f"{self.base_url_region}/lol/match/v5/matches/{match_id}"
+        return url, "match", None
+
+    def _timeline_request(self, match_id: str) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        url = f"{self.base_url_region}/lol/match/v5/matches/{match_id}/timeline"
+        return url, "timeline", None
+
+class RiotClient(_RiotClientBase):
+    """
+    Minimal Riot API Client using httpx.
+    Owns one pooled `httpx.Client` that is reused by every request, so
+    connections stay alive between match/timeline fetches.
+    Use as a context manager (or call `close()`) to release the pool.
+    Requests are paced by a header-driven `RateLimiter`, and responses are
+    served from a `ResponseCache` while fresh.
+    """
+    def __init__(self, *args, transport: Optional[httpx.BaseTransport] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client = httpx.Client(
+            headers=self.headers,
+            http2=self.http2,
+            timeout=self._timeout,
+            limits=self._limits,
+            event_hooks={"request": [self._on_request]},
+            transport=transport,
+        )
+
+    def __enter__(self) -> "RiotClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the underlying connection pool.
+        """
+        self._client.close()
+
+    def _on_request(self, request: httpx.Request) -> None:
+        # Attach an httpcore trace so we can tell fresh connections from reused ones.
+        self._requests_sent += 1
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        self._count_trace_event(event_name)
+
+    def _get(
+        self,
+        url: str,
+        method: str,
+        params: Optional[Dict[str, Any]] = None,
+        match_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Internal method to make GET requests, answered from the response
+        cache when it has a fresh copy (matches and timelines by `match_id`).
+        """
+        return self.cache.get_or_fetch(
+            method, request_key(url, params), lambda: self._request(url, method, params), match_id
+        )
+
+    def _request(self, url: str, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Waits for rate limit budget before sending, and on a 429 closes the
+        offending bucket for Retry-After seconds before trying again.
+        """
+        host = httpx.URL(url).host
         while True:
-            with httpx.Client(headers=self.headers) as client:
-                response = client.get(url, params=params)
-                
-                if response.status_code == 429:
-                    retry_after = int(response.headers.get("Retry-After", 1))
-                    print(f"Rate limited. Sleeping for {retry_after} seconds...")
-                    time.sleep(retry_after)
-                    continue
-                
-                response.raise_for_status()
-                return response.json()
+            self.rate_limiter.acquire(host, method)
+            response = self._client.get(url, params=params)
+            self.rate_limiter.update(host, method, response.headers)
+
+            if response.status_code == 429:
+                retry_after = int(response.headers.get("Retry-After", 1))
+                print(f"Rate limited. Sleeping for {retry_after} seconds...")
+                self.rate_limiter.backoff(host, method, retry_after, response.headers.get("X-Rate-Limit-Type"))
+                continue
+
+            response.raise_for_status()
+            return response.json()
 
     def get_account_by_riot_id(self, game_name: str, tag_line: str) -> Dict[str, Any]:
         """
         Get account information by Riot ID.
         Endpoint: /riot/account/v1/accounts/by-riot-id/{gameName}/{tagLine}
         """
-        url = f"{self.base_url_region}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-        return self._get(url)
+        url, method, _ = self._account_request(game_name, tag_line)
+        return self._get(url, method)
 
     def get_match_ids_by_puuid(
-        self, 
-        puuid: str, 
-        start: int = 0, 
-        count: int = 20, 
-        queue: Optional[int] = None, 
-        type: Optional[str] = None
+        self,
+        puuid: str,
+        start: int = 0,
+        count: int = 20,
+        queue: Optional[int] = None,
+        type: Optional[str] = None,
+        start_time: Optional[int] = None
     ) -> List[str]:
         """
-        Get a list of match IDs by PUUID.
+        Get a list of match IDs by PUUID, newest first. `start_time` (epoch
+        seconds) keeps only matches played since then.
         Endpoint: /lol/match/v5/matches/by-puuid/{puuid}/ids
         """
-        url = f"{self.base_url_region}/lol/match/v5/matches/by-puuid/{puuid}/ids"
-        params = {
-            "start": start,
-            "count": count
-        }
-        if queue:
-            params["queue"] = queue
-        if type:
-            params["type"] = type
-            
+        url, method, params = self._match_ids_request(puuid, start, count, queue, type, start_time)
         # The API returns a list of strings, not a dict
-        return self._get(url, params=params)
+        return self._get(url, method, params=params)
 
     def get_match(self, match_id: str) -> Dict[str, Any]:
         """
         Get match details by match ID.
         Endpoint: /lol/match/v5/matches/{matchId}
         """
-        url = f"{self.base_url_region}/lol/match/v5/matches/{match_id}"
-        return self._get(url)
+        url, method, _ = self._match_request(match_id)
+        return self._get(url, method, match_id=match_id)
 
     def get_match_timeline(self, match_id: str) -> Dict[str, Any]:
         """
         Get match timeline by match ID.
         Endpoint: /lol/match/v5/matches/{matchId}/timeline
         """
-        url = f"{self.base_url_region}/lol/match/v5/matches/{match_id}/timeline"
-        return self._get(url)
+        url, method, _ = self._timeline_request(match_id)
+        return self._get(url, method, match_id=match_id)
+
+class AsyncRiotClient(_RiotClientBase):
+    """
+    asyncio counterpart of `RiotClient` built on `httpx.AsyncClient`.
+    Same methods, same rate limiter, awaitable. Use with `async with`.
+    """
+    def __init__(self, *args, transport: Optional[httpx.AsyncBaseTransport] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            http2=self.http2,
+            timeout=self._timeout,
+            limits=self._limits,
+            event_hooks={"request": [self._on_request]},
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "AsyncRiotClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Close the underlying connection pool.
+        """
+        await self._client.aclose()
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        self._requests_sent += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        self._count_trace_event(event_name)
+
+    async def _get(
+        self,
+        url: str,
+        method: str,
+        params: Optional[Dict[str, Any]] = None,
+        match_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Internal method to make GET requests. See `RiotClient._get`.
+        """
+        return await self.cache.get_or_fetch_async(
+            method, request_key(url, params), lambda: self._request(url, method, params), match_id
+        )
+
+    async def _request(self, url: str, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        See `RiotClient._request`.
+        """
+        host = httpx.URL(url).host
+        while True:
+            await self.rate_limiter.acquire_async(host, method)
+            response = await self._client.get(url, params=params)
+            self.rate_limiter.update(host, method, response.headers)
+
+            if response.status_code == 429:
+                retry_after = int(response.headers.get("Retry-After", 1))
+                print(f"Rate limited. Sleeping for {retry_after} seconds...")
+                self.rate_limiter.backoff(host, method, retry_after, response.headers.get("X-Rate-Limit-Type"))
+                continue
+
+            response.raise_for_status()
+            return response.json()
+
+    async def get_account_by_riot_id(self, game_name: str, tag_line: str) -> Dict[str, Any]:
+        """
+        Get account information by Riot ID.
+        Endpoint: /riot/account/v1/accounts/by-riot-id/{gameName}/{tagLine}
+        """
+        url, method, _ = self._account_request(game_name, tag_line)
+        return await self._get(url, method)
+
+    async def get_match_ids_by_puuid(
+        self,
+        puuid: str,
+        start: int = 0,
+        count: int = 20,
+        queue: Optional[int] = None,
+        type: Optional[str] = None,
+        start_time: Optional[int] = None
+    ) -> List[str]:
+        """
+        Get a list of match IDs by PUUID, newest first. `start_time` (epoch
+        seconds) keeps only matches played since then.
+        Endpoint: /lol/match/v5/matches/by-puuid/{puuid}/ids
+        """
+        url, method, params = self._match_ids_request(puuid, start, count, queue, type, start_time)
+        return await self._get(url, method, params=params)
+
+    async def get_match(self, match_id: str) -> Dict[str, Any]:
+        """
+        Get match details by match ID.
+        Endpoint: /lol/match/v5/matches/{matchId}
+        """
+        url, method, _ = self._match_request(match_id)
+        return await self._get(url, method, match_id=match_id)
+
+    async def get_match_timeline(self, match_id: str) -> Dict[str, Any]:
+        """
+        Get match timeline by match ID.
+        Endpoint: /lol/match/v5/matches/{matchId}/timeline
+        """
+        url, method, _ = self._timeline_request(match_id)
+        return await self._get(url, method, match_id=match_id)
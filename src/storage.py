@@ -1,10 +1,66 @@
+import glob
+import gzip
+import io
 import json
 import os
-from typing import Any, Dict
+from typing import Any, BinaryIO, Dict, Iterator, NamedTuple, Optional, Tuple
+from src.archive import RawArchive
 from src.schemas import MatchDto, MatchTimelineDto
 
 DATA_DIR = os.path.join(os.getcwd(), "data")
 
+# Raw payload formats, newest first. "json" is the legacy pretty-printed format,
+# which is still read but no longer written by default.
+EXTENSIONS = {
+    "gzip": ".json.gz",
+    "zstd": ".json.zst",
+    "json": ".json",
+}
+RAW_FORMAT = os.getenv("LOLAI_RAW_FORMAT", "gzip")
+
+# Where raw payloads live: "files" (one file per payload in DATA_DIR) or
+# "archive" (a single SQLite blob archive, see src/archive.py).
+RAW_BACKEND = os.getenv("LOLAI_RAW_BACKEND", "files")
+ARCHIVE_PATH = os.getenv("LOLAI_RAW_ARCHIVE")
+
+_archive: Optional[RawArchive] = None
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd raw format requires the 'zstandard' package")
+    return zstandard
+
+def format_for_path(path: str) -> str:
+    for fmt, ext in EXTENSIONS.items():
+        if path.endswith(ext):
+            return fmt
+    raise ValueError(f"Unknown raw file format: {path}")
+
+def encode_json(data: Any, fmt: str) -> bytes:
+    """
+    Serializes with compact separators, then compresses according to `fmt`.
+    """
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    if fmt == "gzip":
+        return gzip.compress(raw, compresslevel=GZIP_LEVEL)
+    if fmt == "zstd":
+        return _zstandard().ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    if fmt == "json":
+        return raw
+    raise ValueError(f"Unknown raw format: {fmt}")
+
+def decode_json(raw: bytes, fmt: str) -> Any:
+    if fmt == "gzip":
+        raw = gzip.decompress(raw)
+    elif fmt == "zstd":
+        raw = _zstandard().ZstdDecompressor().decompress(raw)
+    return json.loads(raw)
+
 def save_json(filename: str, data: Dict[str, Any]) -> str:
     """
     Save dictionary data to a JSON file in the data directory.
@@ -16,15 +72,172 @@ def save_json(filename: str, data: Dict[str, Any]) -> str:
         json.dump(data, f, indent=2)
     return filepath
 
+def load_json(filepath: str) -> Any:
+    """
+    Loads a raw payload in any supported format (detected from the extension).
+    """
+    with open(filepath, "rb") as f:
+        return decode_json(f.read(), format_for_path(filepath))
+
+def get_archive(path: Optional[str] = None) -> RawArchive:
+    """
+    Returns the shared archive (default DATA_DIR/raw_archive.db), opening it on first use.
+    """
+    global _archive
+    path = path or ARCHIVE_PATH or os.path.join(DATA_DIR, "raw_archive.db")
+    if _archive is None or _archive.path != path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _archive = RawArchive(path)
+    return _archive
+
+def raw_path(kind: str, match_id: str, fmt: Optional[str] = None) -> str:
+    return os.path.join(DATA_DIR, f"{kind}_{match_id}{EXTENSIONS[fmt or RAW_FORMAT]}")
+
+def find_raw_file(kind: str, match_id: str) -> Optional[str]:
+    """
+    Returns the path of the stored `kind` ("match"/"timeline") payload for
+    `match_id` in whichever format it was written, or None.
+    """
+    for fmt in EXTENSIONS:
+        path = raw_path(kind, match_id, fmt)
+        if os.path.exists(path):
+            return path
+    return None
+
+def raw_exists(kind: str, match_id: str) -> bool:
+    if RAW_BACKEND == "archive":
+        return get_archive().exists(kind, match_id)
+    return find_raw_file(kind, match_id) is not None
+
+def save_raw(kind: str, match_id: str, data: Dict[str, Any], fmt: Optional[str] = None) -> str:
+    """
+    Writes a raw payload in `fmt` (default RAW_FORMAT) to the configured backend.
+    Returns where it was written.
+    """
+    fmt = fmt or RAW_FORMAT
+    if RAW_BACKEND == "archive":
+        archive = get_archive()
+        archive.put(kind, match_id, encode_json(data, fmt), fmt)
+        return f"{archive.path}#{kind}/{match_id}"
+    return _save_raw_file(kind, match_id, data, fmt)
+
+def _save_raw_file(kind: str, match_id: str, data: Dict[str, Any], fmt: str) -> str:
+    """
+    Writes one payload file, replacing any copy of it stored in another format.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    filepath = raw_path(kind, match_id, fmt)
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encode_json(data, fmt))
+    os.replace(tmp_path, filepath)
+
+    for other in EXTENSIONS:
+        if other != fmt and os.path.exists(raw_path(kind, match_id, other)):
+            os.remove(raw_path(kind, match_id, other))
+    return filepath
+
+def iter_raw_files(kind: str) -> Iterator[str]:
+    """
+    Yields every stored `kind` payload path, in any format.
+    """
+    for ext in EXTENSIONS.values():
+        yield from glob.iglob(os.path.join(DATA_DIR, f"{kind}_*{ext}"))
+
+def match_id_from_path(kind: str, path: str) -> str:
+    name = os.path.basename(path)
+    return name[len(kind) + 1:-len(EXTENSIONS[format_for_path(path)])]
+
+def load_raw(kind: str, match_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Random access to one stored payload, from whichever backend is configured.
+    """
+    if RAW_BACKEND == "archive":
+        stored = get_archive().get(kind, match_id)
+        return decode_json(*stored) if stored else None
+    path = find_raw_file(kind, match_id)
+    return load_json(path) if path else None
+
+def iter_raw(kind: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streams every stored `kind` payload as (match_id, data).
+    """
+    if RAW_BACKEND == "archive":
+        for match_id, payload, fmt in get_archive().scan(kind):
+            yield match_id, decode_json(payload, fmt)
+        return
+    for path in iter_raw_files(kind):
+        yield match_id_from_path(kind, path), load_json(path)
+
+class RawEntry(NamedTuple):
+    """
+    A stored payload that has not been decoded yet.
+    `fingerprint` changes whenever the payload is rewritten (file mtime/size,
+    or archive rowid/length), so callers can skip unchanged inputs cheaply.
+    """
+    kind: str
+    match_id: str
+    fingerprint: str
+    location: str  # File path, or the archive path
+
+def iter_raw_entries(kind: str) -> Iterator[RawEntry]:
+    """
+    Streams every stored `kind` payload as a `RawEntry`, without decoding it.
+    """
+    if RAW_BACKEND == "archive":
+        archive = get_archive()
+        for match_id, rowid, length in archive.index(kind):
+            yield RawEntry(kind, match_id, f"{rowid}:{length}", archive.path)
+        return
+    for path in iter_raw_files(kind):
+        stat = os.stat(path)
+        yield RawEntry(kind, match_id_from_path(kind, path), f"{stat.st_mtime_ns}:{stat.st_size}", path)
+
+def load_raw_entry(entry: RawEntry) -> Optional[Dict[str, Any]]:
+    """
+    Decodes the payload behind a `RawEntry`.
+    """
+    if entry.location.endswith(tuple(EXTENSIONS.values())):
+        return load_json(entry.location)
+    stored = get_archive(entry.location).get(entry.kind, entry.match_id)
+    return decode_json(*stored) if stored else None
+
+def open_raw_entry(entry: RawEntry) -> BinaryIO:
+    """
+    Opens the payload behind a `RawEntry` as a binary stream of JSON that is
+    decompressed as it is read, for incremental decoding.
+    """
+    if entry.location.endswith(tuple(EXTENSIONS.values())):
+        fmt = format_for_path(entry.location)
+        if fmt == "gzip":
+            return gzip.open(entry.location, "rb")
+        raw = open(entry.location, "rb")
+    else:
+        stored = get_archive(entry.location).get(entry.kind, entry.match_id)
+        if stored is None:
+            raise FileNotFoundError(f"{entry.kind} {entry.match_id} is not in {entry.location}")
+        payload, fmt = stored
+        raw = io.BytesIO(payload)
+        if fmt == "gzip":
+            return gzip.GzipFile(fileobj=raw, mode="rb")
+
+    if fmt == "zstd":
+        return _zstandard().ZstdDecompressor().stream_reader(raw, closefd=True)
+    return raw
+
+def count_raw(kind: str) -> int:
+    if RAW_BACKEND == "archive":
+        return get_archive().count(kind)
+    return sum(1 for _ in iter_raw_files(kind))
+
 def save_match_data(match_id: str, match_data: Dict[str, Any]) -> str:
     """
     Validates and saves match data.
     """
     # Validation
     MatchDto.model_validate(match_data)
-    
-    filename = f"match_{match_id}.json"
-    return save_json(filename, match_data)
+
+    return save_raw("match", match_id, match_data)
 
 def save_timeline_data(match_id: str, timeline_data: Dict[str, Any]) -> str:
     """
@@ -32,6 +245,52 @@ def save_timeline_data(match_id: str, timeline_data: Dict[str, Any]) -> str:
     """
     # Validation
     MatchTimelineDto.model_validate(timeline_data)
-    
-    filename = f"timeline_{match_id}.json"
-    return save_json(filename, timeline_data)
+
+    return save_raw("timeline", match_id, timeline_data)
+
+def load_match_data(match_id: str) -> Optional[Dict[str, Any]]:
+    return load_raw("match", match_id)
+
+def load_timeline_data(match_id: str) -> Optional[Dict[str, Any]]:
+    return load_raw("timeline", match_id)
+
+def migrate_raw_files(fmt: Optional[str] = None) -> Dict[str, int]:
+    """
+    Rewrites every raw payload file in DATA_DIR into `fmt` (default RAW_FORMAT).
+    Returns counts and total bytes before/after for the rewritten files.
+    """
+    fmt = fmt or RAW_FORMAT
+    summary = {"files": 0, "bytes_before": 0, "bytes_after": 0}
+    for kind in ("match", "timeline"):
+        # Materialize first, we are adding files to the directory as we go
+        for path in list(iter_raw_files(kind)):
+            if format_for_path(path) == fmt:
+                continue
+            match_id = match_id_from_path(kind, path)
+
+            before = os.path.getsize(path)
+            new_path = _save_raw_file(kind, match_id, load_json(path), fmt)
+
+            summary["files"] += 1
+            summary["bytes_before"] += before
+            summary["bytes_after"] += os.path.getsize(new_path)
+    return summary
+
+def archive_raw_files(fmt: Optional[str] = None) -> Dict[str, int]:
+    """
+    Moves every raw payload file in DATA_DIR into the archive (re-encoded as
+    `fmt`) and deletes the file. Returns counts and bytes before/after.
+    """
+    fmt = fmt or RAW_FORMAT
+    archive = get_archive()
+    summary = {"files": 0, "bytes_before": 0, "bytes_after": 0}
+    for kind in ("match", "timeline"):
+        for path in list(iter_raw_files(kind)):
+            payload = encode_json(load_json(path), fmt)
+            archive.put(kind, match_id_from_path(kind, path), payload, fmt)
+
+            summary["files"] += 1
+            summary["bytes_before"] += os.path.getsize(path)
+            summary["bytes_after"] += len(payload)
+            os.remove(path)
+    return summary
@@ -0,0 +1,61 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from src.database import get_unsummarized_games, save_match_summary
+from src.llm import LLMClient
+from src.models import GameStatsDto
+from src.pipeline import Pipeline, Stage
+from src.ratelimit import RateLimiter
+
+DEFAULT_WORKERS = 4
+# Gemini's free tier allows 15 requests per minute on flash models
+DEFAULT_REQUESTS_PER_MINUTE = 15
+
+def llm_rate_limiter(requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE) -> RateLimiter:
+    """
+    Client-side cap on model calls: a static window instead of Riot's
+    header-driven limits.
+    """
+    return RateLimiter(default_app_limits=f"{requests_per_minute}:60")
+
+def summarize_games(
+    client: LLMClient,
+    puuid: str,
+    limit: Optional[int] = None,
+    workers: int = DEFAULT_WORKERS,
+    use_cache: bool = True,
+    on_summary: Optional[Callable[[GameStatsDto, str], None]] = None,
+    report_interval: float = 5.0,
+) -> Dict[str, Any]:
+    """
+    Summarizes the player's `limit` most recent games that have no stored
+    summary yet (None = all), with `workers` concurrent model calls. Give
+    `client` a rate limiter (see `llm_rate_limiter`) to cap the request rate.
+    Each summary is committed to match_summaries as soon as it arrives, so an
+    interrupted run resumes with the games still missing; failed games are
+    left out and retried next run. A client that does not store summaries
+    (e.g. a fake backend) only generates them: "stored" stays 0.
+    """
+    games = get_unsummarized_games(puuid, limit)
+    if not games:
+        return {"pending": 0, "summarized": 0, "stored": 0, "failed": 0}
+
+    def summarize(game: GameStatsDto, emit):
+        # The client reads the match's cached timeline digest itself
+        emit((game, client.summarize_match(game, use_cache=use_cache)))
+
+    def write(item: Tuple[GameStatsDto, str], emit):
+        game, summary = item
+        if client.stores_summaries:
+            save_match_summary(game.match_id, game.puuid, client.model, summary)
+        if on_summary is not None:
+            on_summary(game, summary)
+
+    pipeline = Pipeline([
+        Stage("summarize", summarize, workers=workers, queue_size=workers),
+        Stage("db", write, queue_size=workers),
+    ], report_interval=report_interval)
+    stats = pipeline.run(games)
+
+    failed = sum(stage["errors"] for stage in stats)
+    summarized = len(games) - failed
+    stored = summarized if client.stores_summaries else 0
+    return {"pending": len(games), "summarized": summarized, "stored": stored, "failed": failed}
@@ -0,0 +1,12 @@
+import pytest
+from src import database
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """
+    A fresh, migrated database file per test.
+    """
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "test.db"))
+    database.init_db()
+    yield
+    database.close_connection()
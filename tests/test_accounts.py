@@ -0,0 +1,65 @@
+import pytest
+from src.accounts import DEFAULT_TTL, get_cached_accounts, parse_riot_id, resolve_puuid, resolve_puuids
+
+pytestmark = pytest.mark.usefixtures("db")
+
+class FakeRiotClient:
+    def __init__(self, accounts):
+        self.accounts = accounts # lowercase "name#tag" -> puuid
+        self.calls = []
+        self.online = True
+
+    def get_account_by_riot_id(self, game_name, tag_line):
+        self.calls.append((game_name, tag_line))
+        if not self.online:
+            raise ConnectionError("offline")
+        puuid = self.accounts[f"{game_name}#{tag_line}".lower()]
+        return {"puuid": puuid, "gameName": game_name.title(), "tagLine": tag_line.upper()}
+
+def test_parse_riot_id():
+    assert parse_riot_id("Faker#KR1") == ("Faker", "KR1")
+    for bad in ("Faker", "#KR1", "Faker#"):
+        with pytest.raises(ValueError):
+            parse_riot_id(bad)
+
+def test_resolved_ids_are_cached_case_insensitively():
+    client = FakeRiotClient({"faker#kr1": "p1"})
+
+    assert resolve_puuid("faker#kr1", client) == "p1"
+    assert resolve_puuid("FAKER#Kr1", client) == "p1"
+    assert client.calls == [("faker", "kr1")]
+
+    account = get_cached_accounts(["faker#KR1"])["faker#KR1"]
+    assert (account.game_name, account.tag_line) == ("Faker", "KR1")
+
+def test_bulk_lookup_only_fetches_missing_ids():
+    client = FakeRiotClient({"a#1": "pa", "b#1": "pb", "c#1": "pc"})
+    resolve_puuid("a#1", client)
+
+    assert resolve_puuids(["a#1", "b#1", "c#1", "b#1"], client) == {"a#1": "pa", "b#1": "pb", "c#1": "pc"}
+    assert client.calls == [("a", "1"), ("b", "1"), ("c", "1")]
+
+def test_expired_entries_are_refreshed_or_used_offline():
+    client = FakeRiotClient({"a#1": "pa"})
+    resolve_puuids(["a#1"], client, clock=lambda: 1000)
+
+    def later():
+        return 1000 + DEFAULT_TTL + 1
+
+    client.online = False
+    # Stale, and the lookup fails: the stored PUUID still answers
+    assert resolve_puuids(["a#1"], client, clock=later) == {"a#1": "pa"}
+    with pytest.raises(ConnectionError):
+        resolve_puuids(["b#1"], client, clock=later)
+
+    client.online = True
+    client.accounts["a#1"] = "pa2"
+    assert resolve_puuids(["a#1"], client, clock=later) == {"a#1": "pa2"}
+    assert get_cached_accounts(["a#1"])["a#1"].fetched_at == later()
+    assert len(client.calls) == 4
+
+def test_refresh_skips_the_cache():
+    client = FakeRiotClient({"a#1": "pa"})
+    resolve_puuid("a#1", client)
+    resolve_puuid("a#1", client, refresh=True)
+    assert len(client.calls) == 2
@@ -1,78 +1,113 @@
 import pytest
-from unittest.mock import patch, MagicMock
 from src.analysis import AnalysisEngine
+from src.database import save_all_game_stats
 from src.models import GameStatsDto
 
-@pytest.fixture
-def mock_games():
+def create_game(win, kda, cspm, vision, gold_pm, game_creation=1000, champion="Ahri", position="MIDDLE"):
     # Helper to create a dummy GSD
-    def create_game(win, kda, cspm, vision, gold_pm):
-        return GameStatsDto(
-            match_id="NA1_123", puuid="test_puuid", champion_name="Ahri",
-            win=win, game_creation=1000, game_duration=1800,
-            kills=5, deaths=5, assists=5, kda=kda,
-            total_minions_killed=200, neutral_minions_killed=0, cs_per_minute=cspm,
-            gold_earned=10000, gold_per_minute=gold_pm,
-            total_damage_dealt_to_champions=20000, damage_per_minute=600,
-            vision_score=vision, wards_placed=10, wards_killed=2,
-            team_position="MIDDLE"
-        )
-    
-    return [
-        create_game(True, 4.0, 7.0, 25, 400),
-        create_game(False, 2.0, 6.0, 15, 300)
-    ]
-
-@patch('src.analysis.get_recent_games')
-def test_get_user_stats(mock_get_games, mock_games):
-    mock_get_games.return_value = mock_games
-    
+    return GameStatsDto(
+        match_id=f"NA1_{game_creation}", puuid="test_puuid", champion_name=champion,
+        win=win, game_creation=game_creation, game_duration=1800,
+        kills=5, deaths=5, assists=5, kda=kda,
+        total_minions_killed=200, neutral_minions_killed=0, cs_per_minute=cspm,
+        gold_earned=10000, gold_per_minute=gold_pm,
+        total_damage_dealt_to_champions=20000, damage_per_minute=600,
+        vision_score=vision, wards_placed=10, wards_killed=2,
+        team_position=position
+    )
+
+@pytest.fixture
+def mock_games(db):
+    save_all_game_stats([
+        create_game(True, 4.0, 7.0, 25, 400, game_creation=1000),
+        create_game(False, 2.0, 6.0, 15, 300, game_creation=2000)
+    ])
+
+def test_get_user_stats(mock_games):
     engine = AnalysisEngine()
     report = engine.get_user_stats("test_puuid", 20)
-    
+
     assert report.games_analyzed == 2
     assert report.win_rate == 50.0
-    
+
     # Averages
     # KDA: (4.0 + 2.0) / 2 = 3.0
     assert report.avg_kda == 3.0
     assert report.kda_diff == "GOOD" # Baseline is 3.0
-    
+
     # CSPM: (7.0 + 6.0) / 2 = 6.5
     assert report.avg_cspm == 6.5
     assert report.cspm_diff == "GOOD" # Baseline is 6.5
-    
+
     # Vision: (25 + 15) / 2 = 20
     assert report.avg_vision_score == 20.0
     assert report.vision_diff == "GOOD" # Baseline is 20.0
 
-@patch('src.analysis.get_recent_games')
-def test_get_user_stats_needs_improvement(mock_get_games):
+def test_get_user_stats_needs_improvement(db):
     # Poor performance game
-    game = GameStatsDto(
-            match_id="NA1_123", puuid="test_puuid", champion_name="Ahri",
-            win=False, game_creation=1000, game_duration=1800,
-            kills=0, deaths=5, assists=0, kda=0.0,
-            total_minions_killed=100, neutral_minions_killed=0, cs_per_minute=3.0,
-            gold_earned=5000, gold_per_minute=200,
-            total_damage_dealt_to_champions=5000, damage_per_minute=100,
-            vision_score=5, wards_placed=0, wards_killed=0,
-            team_position="MIDDLE"
-    )
-    mock_get_games.return_value = [game]
-    
+    save_all_game_stats([create_game(False, 0.0, 3.0, 5, 200)])
+
     engine = AnalysisEngine()
     report = engine.get_user_stats("test_puuid")
-    
+
     assert report.avg_kda == 0.0
     assert report.kda_diff == "NEEDS_IMPROVEMENT"
-    
+
     assert report.avg_cspm == 3.0
     assert report.cspm_diff == "NEEDS_IMPROVEMENT"
 
-@patch('src.analysis.get_recent_games')
-def test_no_games(mock_get_games):
-    mock_get_games.return_value = []
+def test_no_games(db):
     engine = AnalysisEngine()
     report = engine.get_user_stats("test_puuid")
     assert report is None
+
+def test_window_uses_most_recent_games(mock_games):
+    engine = AnalysisEngine()
+
+    latest = engine.get_user_stats("test_puuid", 1)
+    assert latest.games_analyzed == 1
+    assert latest.avg_kda == 2.0  # game_creation=2000
+
+    assert engine.get_user_stats("test_puuid", None).games_analyzed == 2
+
+def test_grouped_stats(db):
+    save_all_game_stats([
+        create_game(True, 4.0, 7.0, 25, 400, game_creation=1, champion="Ahri"),
+        create_game(False, 2.0, 6.0, 15, 300, game_creation=2, champion="Ahri"),
+        create_game(True, 6.0, 8.0, 30, 450, game_creation=3, champion="Lux", position="UTILITY"),
+    ])
+    engine = AnalysisEngine()
+
+    overall, champions = engine.get_grouped_stats("test_puuid", None, group_by="champion")
+    assert overall.games_analyzed == 3
+    assert [(g.group, g.games_analyzed, g.win_rate) for g in champions] == [("Ahri", 2, 50.0), ("Lux", 1, 100.0)]
+    assert champions[0].avg_kda == 3.0
+
+    _, positions = engine.get_grouped_stats("test_puuid", 2, group_by="team_position")
+    assert [(g.group, g.games_analyzed) for g in positions] == [("MIDDLE", 1), ("UTILITY", 1)]
+
+    with pytest.raises(ValueError):
+        engine.get_grouped_stats("test_puuid", group_by="kills")
+
+def test_graded_against_position_cohort(db):
+    # Corpus: supports average ~60 vision, junglers ~20
+    save_all_game_stats(
+        [create_game(True, 3.0, 1.0, 50 + i, 300, game_creation=i, position="UTILITY") for i in range(20)] +
+        [create_game(True, 3.0, 6.0, 10 + i, 300, game_creation=100 + i, position="JUNGLE") for i in range(20)]
+    )
+    engine = AnalysisEngine()
+
+    # 1.0 CSPM would fail the hard-coded 6.5, but it is the support median
+    _, positions = engine.get_grouped_stats("test_puuid", None, group_by="team_position")
+    grades = {g.group: (g.vision_diff, g.cspm_diff) for g in positions}
+    assert grades["UTILITY"] == ("GOOD", "GOOD")
+
+    # 40 vision is well above the hard-coded 20 but below every support
+    save_all_game_stats([
+        GameStatsDto(**{**create_game(True, 3.0, 1.0, 40, 300, game_creation=500, position="UTILITY").model_dump(),
+                        "puuid": "support_puuid"})
+    ])
+    report = engine.get_user_stats("support_puuid")
+    assert report.vision_diff == "NEEDS_IMPROVEMENT"
+    # Low CS is expected of a support
+    assert report.cspm_diff == "GOOD"
@@ -0,0 +1,77 @@
+import math
+import random
+import numpy as np
+import pytest
+from src.analytics import AnalyticsEngine, ewma, load_games, rolling_mean, streaks, wilson_interval
+from src.database import save_all_game_stats
+from src.models import GameStatsDto
+
+def create_game(i, win, kda, champion="Ahri", position="MIDDLE"):
+    return GameStatsDto(
+        match_id=f"NA1_{i}", puuid="test_puuid", champion_name=champion,
+        win=win, game_creation=1000 + i, game_duration=1800,
+        kills=5, deaths=5, assists=5, kda=kda,
+        total_minions_killed=200, neutral_minions_killed=0, cs_per_minute=6.0 + i % 3,
+        gold_earned=10000, gold_per_minute=400,
+        total_damage_dealt_to_champions=20000, damage_per_minute=600,
+        vision_score=20, wards_placed=10, wards_killed=2,
+        team_position=position
+    )
+
+def test_rolling_mean():
+    values = [1.0, 2.0, 3.0, 4.0, 5.0]
+    result = rolling_mean(values, 3)
+    assert np.isnan(result[:2]).all()
+    assert result[2:].tolist() == [2.0, 3.0, 4.0]
+    assert np.isnan(rolling_mean(values, 6)).all()
+
+@pytest.mark.parametrize("alpha", [0.05, 0.5, 0.99])
+def test_ewma_matches_recursive_definition(alpha):
+    rng = random.Random(alpha)
+    values = [rng.uniform(0, 10) for _ in range(5000)]
+
+    expected = [values[0]]
+    for x in values[1:]:
+        expected.append((1 - alpha) * expected[-1] + alpha * x)
+
+    assert np.allclose(ewma(values, alpha), expected, rtol=1e-9, atol=1e-9)
+
+def test_wilson_interval():
+    low, high = wilson_interval(np.array([5, 0]), np.array([10, 0]))
+    # Known values for 5/10 at 95%
+    assert math.isclose(low[0], 0.2366, abs_tol=1e-4)
+    assert math.isclose(high[0], 0.7634, abs_tol=1e-4)
+    assert np.isnan(low[1])
+
+def test_streaks():
+    assert streaks(np.array([True, True, False, True, True, True, False, False])) == (-2, 3, 2)
+    assert streaks(np.array([True])) == (1, 1, 0)
+    assert streaks(np.array([], dtype=bool)) == (0, 0, 0)
+
+def test_build_report(db):
+    results = [True, True, False, True, False, False, False, True]
+    save_all_game_stats([
+        create_game(i, win, kda=float(i), champion="Lux" if i % 2 else "Ahri", position="" if i == 0 else "MIDDLE")
+        for i, win in enumerate(results)
+    ])
+
+    report = AnalyticsEngine().build_report("test_puuid", window=4)
+
+    assert report.games_analyzed == 8
+    assert report.win_rate == 50.0
+    assert report.win_rate_low < 50.0 < report.win_rate_high
+    assert report.averages["kda"] == 3.5
+    assert report.recent["kda"] == 5.5  # games 4..7
+    assert report.recent_win_rate == 25.0
+    assert (report.current_streak, report.longest_win_streak, report.longest_loss_streak) == (1, 2, 3)
+
+    assert [(g.name, g.games) for g in report.champions] == [("Ahri", 4), ("Lux", 4)]
+    assert report.champions[0].averages["kda"] == 3.0  # 0, 2, 4, 6
+    assert [(g.name, g.games) for g in report.positions] == [("MIDDLE", 7), ("UNKNOWN", 1)]
+
+def test_load_games_window_is_oldest_first(db):
+    save_all_game_stats([create_game(i, True, kda=float(i)) for i in range(5)])
+
+    games = load_games("test_puuid", limit=3)
+    assert games["kda"].tolist() == [2.0, 3.0, 4.0]
+    assert AnalyticsEngine().build_report("nobody") is None
@@ -0,0 +1,23 @@
+from src.archive import RawArchive
+
+def test_put_get_exists(tmp_path):
+    archive = RawArchive(str(tmp_path / "raw.db"))
+    archive.put("match", "NA1_1", b"payload", "json")
+
+    assert archive.exists("match", "NA1_1")
+    assert not archive.exists("timeline", "NA1_1")
+    assert archive.get("match", "NA1_1") == (b"payload", "json")
+    assert archive.get("match", "NA1_2") is None
+
+def test_scan_streams_in_insertion_order(tmp_path):
+    archive = RawArchive(str(tmp_path / "raw.db"))
+    for i in range(7):
+        archive.put("timeline", f"NA1_{i}", bytes([i]), "gzip")
+    archive.put("match", "NA1_0", b"m", "gzip")
+
+    scanned = list(archive.scan("timeline", batch_size=3))
+
+    assert [m for m, _, _ in scanned] == [f"NA1_{i}" for i in range(7)]
+    assert scanned[3] == ("NA1_3", bytes([3]), "gzip")
+    assert archive.count("timeline") == 7
+    assert archive.match_ids("match") == {"NA1_0"}
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from src import database
+from src.baselines import get_baselines, load_baselines, refresh_baselines
+from src.database import connection, save_all_game_stats
+from src.models import GameStatsDto
+
+def create_game(i, position, vision, champion="Ahri", puuid=None):
+    return GameStatsDto(
+        match_id=f"NA1_{i}", puuid=puuid or f"puuid-{i}", champion_name=champion,
+        win=True, game_creation=i, game_duration=1800,
+        kills=5, deaths=5, assists=5, kda=2.0,
+        total_minions_killed=200, neutral_minions_killed=0, cs_per_minute=6.0,
+        gold_earned=10000, gold_per_minute=400,
+        total_damage_dealt_to_champions=20000, damage_per_minute=600,
+        vision_score=vision, wards_placed=10, wards_killed=2,
+        team_position=position
+    )
+
+def dirty():
+    return set(map(tuple, connection().execute("SELECT cohort_kind, cohort FROM baseline_dirty").fetchall()))
+
+def test_percentiles_per_cohort(db):
+    support = list(range(40, 80, 2))
+    save_all_game_stats(
+        [create_game(i, "UTILITY", v) for i, v in enumerate(support)] +
+        [create_game(100 + i, "JUNGLE", 10 + i, champion="Lee Sin") for i in range(5)]
+    )
+
+    vision = get_baselines("team_position", "UTILITY")["vision"]
+    assert vision.games == len(support)
+    assert [vision.p25, vision.p50, vision.p75] == pytest.approx(np.percentile(support, [25, 50, 75]))
+
+    assert get_baselines("champion", "Lee Sin")["vision"].p50 == 12
+    assert get_baselines("all")["vision"].games == 25
+    assert get_baselines("team_position", "TOP") is None
+    with pytest.raises(ValueError):
+        get_baselines("kills")
+
+def test_refresh_is_incremental(db):
+    save_all_game_stats([create_game(i, "UTILITY", 40) for i in range(3)])
+    assert refresh_baselines() == 3  # all, UTILITY, Ahri
+    assert dirty() == set()
+    assert refresh_baselines() == 0
+
+    save_all_game_stats([create_game(10, "JUNGLE", 10, champion="Ahri")])
+    assert dirty() == {("all", ""), ("team_position", "JUNGLE"), ("champion", "Ahri")}
+    load_baselines()
+    assert dirty() == set()
+
+def test_replace_and_delete_update_old_cohort(db):
+    save_all_game_stats([create_game(1, "UTILITY", 40), create_game(2, "UTILITY", 50)])
+    refresh_baselines()
+
+    # Same (match_id, puuid) reprocessed with another position
+    save_all_game_stats([create_game(1, "JUNGLE", 10, puuid="puuid-1")])
+    assert ("team_position", "UTILITY") in dirty()
+    assert get_baselines("team_position", "UTILITY")["vision"].games == 1
+
+    with database.transaction() as conn:
+        conn.execute("DELETE FROM game_stats WHERE team_position = 'JUNGLE'")
+    assert get_baselines("team_position", "JUNGLE") is None
+    assert get_baselines("all")["vision"].games == 1
@@ -1,21 +1,14 @@
 import pytest
+import statistics
 import sqlite3
-import os
-from src.models import GameStatsDto
-from src.database import init_db, save_game_stats, get_db_connection, DB_NAME
-
-@pytest.fixture
-def clean_db():
-    if os.path.exists(DB_NAME):
-        os.remove(DB_NAME)
-    init_db()
-    yield
-    if os.path.exists(DB_NAME):
-        os.remove(DB_NAME)
+import threading
+from src import database
+from src.models import GameStatsDto, TimelineEventDto
+from src.database import init_db, save_game_stats, get_db_connection
 
-def test_save_and_retrieve_stats(clean_db):
-    stats = GameStatsDto(
-        match_id="NA1_123",
+def make_stats(match_id="NA1_123"):
+    return GameStatsDto(
+        match_id=match_id,
         puuid="user_123",
         champion_name="Ahri",
         win=True,
@@ -28,6 +21,12 @@ def test_save_and_retrieve_stats(clean_db):
         vision_score=15, wards_placed=5, wards_killed=1,
         team_position="MIDDLE"
     )
+
+def count_stats():
+    return database.connection().execute("SELECT COUNT(*) FROM game_stats").fetchone()[0]
+
+def test_save_and_retrieve_stats(db):
+    stats = make_stats()
     
     save_game_stats(stats)
     
@@ -40,3 +39,198 @@ def test_save_and_retrieve_stats(clean_db):
     assert row["match_id"] == "NA1_123"
     assert row["champion_name"] == "Ahri"
     assert row["kills"] == 5
+
+def test_connection_is_shared_per_thread_and_tuned(db):
+    conn = database.connection()
+    assert database.connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(database.connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+def test_transaction_groups_writes(db):
+    with database.transaction():
+        save_game_stats(make_stats("NA1_1"))
+        # Nested units of work join the outer transaction
+        with database.transaction():
+            save_game_stats(make_stats("NA1_2"))
+        assert database.connection().in_transaction
+
+    assert not database.connection().in_transaction
+    assert count_stats() == 2
+
+def test_transaction_rolls_back_on_error(db):
+    with pytest.raises(RuntimeError):
+        with database.transaction():
+            save_game_stats(make_stats("NA1_1"))
+            raise RuntimeError("boom")
+
+    assert count_stats() == 0
+
+def test_set_db_path(db, tmp_path):
+    save_game_stats(make_stats())
+
+    database.set_db_path(str(tmp_path / "other.db"))
+    init_db()
+    assert count_stats() == 0
+
+def test_migrations_are_versioned_and_idempotent(db):
+    assert database.schema_version() == len(database.MIGRATIONS)
+    init_db()
+    assert database.schema_version() == len(database.MIGRATIONS)
+
+def test_unversioned_database_is_migrated(tmp_path, monkeypatch):
+    # A database created before migrations existed: tables, no user_version
+    path = str(tmp_path / "legacy.db")
+    legacy = sqlite3.connect(path)
+    for statement in database.MIGRATIONS[0]:
+        legacy.execute(statement)
+    legacy.commit()
+    legacy.close()
+
+    monkeypatch.setattr(database, "DB_NAME", path)
+    init_db()
+    indexes = {row[0] for row in database.connection().execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_game_stats_puuid_creation" in indexes
+    database.close_connection()
+
+def test_newer_schema_is_rejected(db):
+    database.connection().execute(f"PRAGMA user_version = {len(database.MIGRATIONS) + 1}")
+    with pytest.raises(RuntimeError):
+        init_db()
+
+@pytest.mark.parametrize("read", [
+    lambda: list(database.iter_recent_games("user_123")),
+    lambda: list(database.iter_timeline_events("NA1_1", "user_123")),
+    lambda: database.get_processed_inputs("match", "user_123"),
+    lambda: database.get_player_summary("user_123", "champion"),
+], ids=["recent_games", "timeline_events", "processed_inputs", "player_summary"])
+def test_hot_queries_use_indexes(db, read):
+    # Plan the statements the read path actually runs, as SQLite saw them
+    conn = database.connection()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        read()
+    finally:
+        conn.set_trace_callback(None)
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert selects
+
+    for statement in selects:
+        plan = " | ".join(row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}"))
+        assert "SCAN" not in plan, statement
+        assert "TEMP B-TREE" not in plan, statement
+
+def test_trusted_reads_match_validated_reads(db):
+    save_game_stats(make_stats("NA1_1"))
+    database.save_timeline_events([
+        TimelineEventDto(match_id="NA1_1", puuid="user_123", timestamp=t, type="CHAMPION_KILL", killer_id=1, victim_id=2)
+        for t in (2000, 1000)
+    ])
+
+    games = database.get_recent_games("user_123")
+    assert database.get_recent_games("user_123", trusted=True) == games
+    assert games[0].win is True
+
+    events = database.get_timeline_events("NA1_1", "user_123")
+    assert [e.timestamp for e in events] == [1000, 2000]
+    assert database.get_timeline_events("NA1_1", "user_123", trusted=True) == events
+
+    stream = database.iter_timeline_events("NA1_1", "user_123", trusted=True)
+    assert next(stream) == events[0]
+
+def test_saving_timeline_events_replaces_the_given_keys(db):
+    event = TimelineEventDto(match_id="NA1_1", puuid="user_123", timestamp=1000, type="CHAMPION_KILL", killer_id=1, victim_id=2)
+    other = event.model_copy(update={"puuid": "user_456"})
+    database.save_timeline_events([event, other])
+
+    # A re-parse with no events for user_123 still clears their old rows
+    database.save_timeline_events([], keys=[("NA1_1", "user_123")])
+    assert database.get_timeline_events("NA1_1", "user_123") == []
+    assert database.get_timeline_events("NA1_1", "user_456") == [other]
+
+def test_trusted_models_behave_like_validated_ones():
+    fields = make_stats("NA1_1").model_dump()
+    validated = GameStatsDto(**fields)
+    trusted = database._construct_trusted(GameStatsDto, dict(fields))
+
+    assert trusted == validated and validated == trusted
+    assert trusted.model_dump() == validated.model_dump()
+    assert trusted.model_dump_json() == validated.model_dump_json()
+    assert trusted.model_fields_set == validated.model_fields_set
+
+    copy = trusted.model_copy(update={"kills": 9})
+    assert copy.kills == 9 and trusted.kills == validated.kills
+    copy.deaths = 0
+    assert copy.deaths == 0 and trusted.deaths == validated.deaths
+
+def summary_from_rows(puuid, group_by):
+    # Reference: aggregate game_stats directly (a finite limit takes the SQL path)
+    return database.get_stats_summary(puuid, 10**9, group_by)
+
+def assert_summary_matches(puuid, group_by):
+    expected = summary_from_rows(puuid, group_by)
+    actual = database.get_player_summary(puuid, group_by)
+    assert [(r["grp"], r["games"], r["wins"]) for r in actual] == [(r["grp"], r["games"], r["wins"]) for r in expected]
+    for a, e in zip(actual, expected):
+        # Same columns whatever the limit
+        assert a.keys() == e.keys()
+        for metric in database.PLAYER_SUMMARY_METRICS:
+            assert a[f"avg_{metric}"] == pytest.approx(e[f"avg_{metric}"])
+            assert a[f"std_{metric}"] == pytest.approx(e[f"std_{metric}"], abs=1e-6)
+
+def test_player_summaries_follow_writes(db):
+    games = [
+        make_stats(f"NA1_{i}").model_copy(update={
+            "kda": float(i), "win": i % 2 == 0, "champion_name": ["Ahri", "Lux"][i % 2],
+            "team_position": ["MIDDLE", "UTILITY", "TOP"][i % 3]
+        })
+        for i in range(9)
+    ]
+    database.save_all_game_stats(games)
+    for group_by in (None, "champion", "team_position"):
+        assert_summary_matches("user_123", group_by)
+
+    overall = database.get_player_summary("user_123")[0]
+    assert overall["std_kda"] == pytest.approx(statistics.pstdev(range(9)))
+
+    # INSERT OR REPLACE reverses the old row before adding the new one
+    database.save_game_stats(games[0].model_copy(update={"champion_name": "Zed", "kda": 20.0, "win": False}))
+    with database.transaction() as conn:
+        conn.execute("DELETE FROM game_stats WHERE match_id = 'NA1_1'")
+        conn.execute("UPDATE game_stats SET team_position = 'JUNGLE' WHERE match_id = 'NA1_2'")
+    for group_by in (None, "champion", "team_position"):
+        assert_summary_matches("user_123", group_by)
+    assert [r["grp"] for r in database.get_player_summary("user_123", "champion")] == [None, "Ahri", "Lux", "Zed"]
+
+    with database.transaction() as conn:
+        conn.execute("DELETE FROM game_stats")
+    assert database.connection().execute("SELECT COUNT(*) FROM player_summaries").fetchone()[0] == 0
+    assert database.get_player_summary("user_123")[0]["games"] == 0
+
+def test_player_summaries_backfilled_by_migration(tmp_path, monkeypatch):
+    path = str(tmp_path / "v3.db")
+    monkeypatch.setattr(database, "DB_NAME", path)
+    v3 = sqlite3.connect(path)
+    for statements in database.MIGRATIONS[:3]:
+        for statement in statements:
+            v3.execute(statement)
+    v3.executemany(
+        "INSERT INTO game_stats (match_id, puuid, champion_name, win, game_creation, kda, cs_per_minute, "
+        "gold_per_minute, vision_score, damage_per_minute, team_position) "
+        "VALUES (?, 'user_123', 'Ahri', 1, 1000, 7.0, 6.0, 500.0, 15, 1000.0, 'MIDDLE')",
+        [("NA1_1",), ("NA1_2",)]
+    )
+    v3.execute("PRAGMA user_version = 3")
+    v3.commit()
+    v3.close()
+
+    init_db()
+    assert database.get_player_summary("user_123")[0]["games"] == 2
+    assert_summary_matches("user_123", "champion")
+    database.close_connection()
@@ -0,0 +1,103 @@
+from unittest.mock import patch
+from src.database import save_all_game_stats, save_timeline_events
+from src.digest import Roster, build_digest, estimate_tokens, get_match_digest, load_roster
+from src.frames import FrameCollector
+from src.models import GameStatsDto, TimelineEventDto
+
+MATCH_ID = "NA1_1"
+
+def create_stats(pid, champion, position, puuid=None):
+    return GameStatsDto(
+        match_id=MATCH_ID, puuid=puuid or f"puuid-{pid}", champion_name=champion,
+        win=True, game_creation=1000, game_duration=1800,
+        kills=5, deaths=5, assists=5, kda=2.0,
+        total_minions_killed=200, neutral_minions_killed=0, cs_per_minute=6.0,
+        gold_earned=10000, gold_per_minute=400,
+        total_damage_dealt_to_champions=20000, damage_per_minute=600,
+        vision_score=20, wards_placed=10, wards_killed=2,
+        team_position=position, participant_id=pid
+    )
+
+def event(timestamp, type, puuid="puuid-3", **fields):
+    return TimelineEventDto(match_id=MATCH_ID, puuid=puuid, timestamp=timestamp, type=type, **fields)
+
+EVENTS = [
+    event(60_000, "TURRET_PLATE_DESTROYED"),
+    event(300_000, "CHAMPION_KILL", killer_id=3, victim_id=8),
+    event(400_000, "CHAMPION_KILL", killer_id=8, victim_id=3),
+    event(500_000, "ELITE_MONSTER_KILL", killer_id=7, monster_type="DRAGON"),
+    event(1_500_000, "ELITE_MONSTER_KILL", killer_id=2, monster_type="BARON_NASHOR"),
+]
+
+ROSTER = Roster(3, {3: ("Ahri", "MIDDLE"), 8: ("Zed", "MIDDLE")})
+
+def test_digest_resolves_roster_in_time_order():
+    digest = build_digest(create_stats(3, "Ahri", "MIDDLE"), EVENTS, ROSTER)
+
+    assert digest.text.splitlines() == [
+        "You: Ahri (MIDDLE, blue side)",
+        "- 01:00 You took a turret plate",
+        "- 05:00 You killed Zed (enemy MIDDLE)",
+        "- 06:40 You were killed by Zed (enemy MIDDLE)",
+        "- 08:20 Enemy team took Dragon",
+        "- 25:00 Your team took Baron Nashor",
+    ]
+    assert (digest.moments, digest.kept) == (5, 5)
+
+def test_budget_keeps_most_important_moments():
+    stats = create_stats(3, "Ahri", "MIDDLE")
+    digest = build_digest(stats, EVENTS, ROSTER, token_budget=35)
+
+    assert digest.tokens <= 35
+    assert digest.kept < digest.moments
+    assert "You were killed by Zed" in digest.text
+    assert "turret plate" not in digest.text
+    assert build_digest(stats, EVENTS, ROSTER, token_budget=0).kept == 0
+
+def test_gold_swings_from_frames():
+    collector = FrameCollector()
+    collector.start(MATCH_ID, [f"puuid-{pid}" for pid in range(1, 11)])
+    for minute, blue_gold in enumerate([500, 1000, 4000, 4100]):
+        collector.add({str(pid): {"totalGold": blue_gold if pid <= 5 else 1000 * minute} for pid in range(1, 11)})
+    frames = collector.build()
+
+    # Blue leads by 2.5k, 0, 10k, 5.5k; seen from the red side
+    digest = build_digest(create_stats(8, "Zed", "MIDDLE", "puuid-8"), [], Roster(8, {}), frames)
+    assert "- 02:00 Gold swing -10.0k for your team (lead now -10.0k)" in digest.text
+    assert "- 01:00 Gold swing +2.5k for your team (lead now +0.0k)" in digest.text
+
+def test_roster_from_stored_rows(db):
+    save_all_game_stats([create_stats(3, "Ahri", "MIDDLE"), create_stats(8, "Zed", "MIDDLE")])
+    roster = load_roster(create_stats(3, "Ahri", "MIDDLE"))
+    assert roster.player_id == 3
+    assert roster.name(8) == "Zed (enemy MIDDLE)"
+    assert roster.name(2) == "ally #2"
+
+    # Rows stored before participant IDs existed: found in the frames instead
+    collector = FrameCollector()
+    collector.start(MATCH_ID, [f"puuid-{pid}" for pid in range(1, 11)])
+    collector.add({})
+    frames = collector.build()
+    legacy = create_stats(None, "Ahri", "MIDDLE", puuid="puuid-3")
+    assert load_roster(legacy, frames).player_id == 3
+
+def test_match_digest_is_cached_until_events_change(db):
+    stats = create_stats(3, "Ahri", "MIDDLE")
+    save_all_game_stats([stats])
+    save_timeline_events(EVENTS[:2])
+    assert "You killed" in get_match_digest(stats).text
+
+    with patch("src.digest.build_digest") as build:
+        cached = get_match_digest(stats)
+    build.assert_not_called()
+    assert "You killed" in cached.text and cached.kept == 2
+
+    save_timeline_events(EVENTS)  # Reprocessed: rows rewritten
+    assert "Baron" in get_match_digest(stats).text
+    # Another budget is another entry
+    assert get_match_digest(stats, token_budget=10).kept == 0
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
@@ -0,0 +1,186 @@
+import asyncio
+import pytest
+from contextlib import contextmanager
+import fetch_history
+from src.database import get_sync_state, save_all_game_stats, update_sync_state
+from src.models import GameStatsDto
+
+class FakeAsyncClient:
+    def __init__(self, match_ids, fail_timeline=()):
+        self.match_ids = match_ids
+        self.fail_timeline = set(fail_timeline)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_match_ids_by_puuid(self, puuid, start=0, count=20, start_time=None):
+        return self.match_ids[start:start + count]
+
+    async def _download(self, payload):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return payload
+
+    async def get_match(self, match_id):
+        return await self._download({"metadata": {"matchId": match_id}})
+
+    async def get_match_timeline(self, match_id):
+        if match_id in self.fail_timeline:
+            raise RuntimeError("timeline unavailable")
+        return await self._download({"metadata": {"matchId": match_id}})
+
+    def pool_stats(self):
+        return {"requests": 0, "connections_opened": 0, "connections_reused": 0}
+
+@pytest.fixture
+def recorded(monkeypatch):
+    saved = {"match": [], "timeline": []}
+    monkeypatch.setattr(fetch_history, "init_db", lambda: None)
+    monkeypatch.setattr(fetch_history, "get_sync_state", lambda puuid: None)
+    monkeypatch.setattr(fetch_history, "update_sync_state", lambda puuid: None)
+    monkeypatch.setattr(fetch_history, "already_downloaded", lambda match_id: match_id == "NA1_SKIP")
+    monkeypatch.setattr(fetch_history, "ingest_match", lambda match_id, data, puuid: saved["match"].append(match_id))
+    monkeypatch.setattr(fetch_history, "ingest_timeline", lambda match_id, data, puuid: saved["timeline"].append(match_id))
+    return saved
+
+def test_fetch_history_concurrent(recorded):
+    ids = [f"NA1_{i}" for i in range(10)] + ["NA1_SKIP"]
+    client = FakeAsyncClient(ids, fail_timeline={"NA1_3"})
+
+    asyncio.run(fetch_history.fetch_history_concurrent("p1", count=20, concurrency=3, client=client))
+
+    # Existing match skipped, match saved even when its timeline failed
+    assert sorted(recorded["match"]) == sorted(ids[:10])
+    assert sorted(recorded["timeline"]) == sorted(i for i in ids[:10] if i != "NA1_3")
+    # Two requests (match + timeline) per match slot
+    assert 2 < client.max_in_flight <= 6
+
+def test_fetch_history_concurrent_respects_count(recorded):
+    client = FakeAsyncClient([f"NA1_{i}" for i in range(10)])
+    asyncio.run(fetch_history.fetch_history_concurrent("p1", count=4, concurrency=2, client=client))
+    assert sorted(recorded["match"]) == ["NA1_0", "NA1_1", "NA1_2", "NA1_3"]
+
+class FakeClient:
+    def __init__(self, match_ids):
+        self.match_ids = match_ids
+        self.list_calls = []
+
+    def get_match_ids_by_puuid(self, puuid, start=0, count=20, start_time=None):
+        self.list_calls.append(start_time)
+        return self.match_ids[start:start + count]
+
+    def get_match(self, match_id):
+        return {"metadata": {"matchId": match_id}}
+
+    def get_match_timeline(self, match_id):
+        return {"metadata": {"matchId": match_id}}
+
+    def pool_stats(self):
+        return {"requests": 0, "connections_opened": 0, "connections_reused": 0}
+
+def test_fetch_history_pipeline(monkeypatch):
+    written = []
+    commits = []
+
+    @contextmanager
+    def transaction():
+        yield
+        commits.append(len(written))
+
+    monkeypatch.setattr(fetch_history, "init_db", lambda: None)
+    monkeypatch.setattr(fetch_history, "get_sync_state", lambda puuid: None)
+    monkeypatch.setattr(fetch_history, "update_sync_state", lambda puuid: None)
+    monkeypatch.setattr(fetch_history, "already_downloaded", lambda match_id: match_id == "NA1_SKIP")
+    monkeypatch.setattr(fetch_history, "save_match_data", lambda match_id, data: None)
+    monkeypatch.setattr(fetch_history, "save_timeline_data", lambda match_id, data: None)
+    monkeypatch.setattr(fetch_history, "parse_match_stats", lambda data, puuid: [data["metadata"]["matchId"]])
+    monkeypatch.setattr(fetch_history, "parse_timeline_events", lambda data: [])
+    monkeypatch.setattr(fetch_history, "timeline_event_keys", lambda data: [])
+    monkeypatch.setattr(fetch_history, "parse_timeline_frames", lambda data: None)
+    monkeypatch.setattr(fetch_history, "transaction", transaction)
+    monkeypatch.setattr(fetch_history, "save_all_game_stats", lambda stats, conn=None: written.extend(stats))
+    monkeypatch.setattr(fetch_history, "save_timeline_events", lambda events, conn=None, keys=None: None)
+
+    ids = [f"NA1_{i}" for i in range(12)] + ["NA1_SKIP"]
+    fetch_history.fetch_history_pipeline("p1", count=20, client=FakeClient(ids), download_workers=3, db_batch_size=5)
+
+    assert sorted(written) == sorted(ids[:12])
+    # Several matches per commit, never more than the batch size
+    assert commits[-1] == 12
+    assert all(b - a <= 5 for a, b in zip([0] + commits, commits))
+
+def create_game(match_id, game_creation):
+    return GameStatsDto(
+        match_id=match_id, puuid="p1", champion_name="Ahri", win=True,
+        game_creation=game_creation, game_duration=1800, kills=5, deaths=5, assists=5, kda=2.0,
+        total_minions_killed=200, neutral_minions_killed=0, cs_per_minute=6.6,
+        gold_earned=10000, gold_per_minute=400, total_damage_dealt_to_champions=20000, damage_per_minute=600,
+        vision_score=20, wards_placed=10, wards_killed=2, team_position="MIDDLE"
+    )
+
+def test_incremental_sync_stops_at_watermark(db, monkeypatch):
+    fetched = []
+
+    def ingest_match(match_id, data, puuid):
+        fetched.append(match_id)
+        save_all_game_stats([create_game(match_id, int(match_id.split("_")[1]) * 1_000_000)])
+
+    monkeypatch.setattr(fetch_history, "already_downloaded", lambda match_id: False)
+    monkeypatch.setattr(fetch_history, "ingest_match", ingest_match)
+    monkeypatch.setattr(fetch_history, "ingest_timeline", lambda match_id, data, puuid: None)
+
+    save_all_game_stats([create_game("NA1_5", 5_000_000)])
+    update_sync_state("p1", synced_at=123)
+    assert get_sync_state("p1") == {"newest_match_id": "NA1_5", "newest_game_creation": 5_000_000, "last_sync_at": 123}
+
+    # Newest first; the watermark game is listed again by startTime
+    client = FakeClient([f"NA1_{i}" for i in range(9, -1, -1)])
+    fetch_history.fetch_history("p1", count=250, client=client)
+
+    assert fetched == ["NA1_9", "NA1_8", "NA1_7", "NA1_6"]
+    assert client.list_calls == [5000]
+    assert get_sync_state("p1")["newest_match_id"] == "NA1_9"
+
+    # --full ignores the watermark
+    fetched.clear()
+    fetch_history.fetch_history("p1", count=3, client=client, full=True)
+    assert fetched == ["NA1_9", "NA1_8", "NA1_7"]
+    assert client.list_calls[-1] is None
+
+def test_watermark_waits_until_paging_reaches_it(db, monkeypatch):
+    downloaded = set()
+
+    def ingest_match(match_id, data, puuid):
+        downloaded.add(match_id)
+        save_all_game_stats([create_game(match_id, int(match_id.split("_")[1]) * 1_000_000)])
+
+    monkeypatch.setattr(fetch_history, "already_downloaded", lambda match_id: match_id in downloaded)
+    monkeypatch.setattr(fetch_history, "ingest_match", ingest_match)
+    monkeypatch.setattr(fetch_history, "ingest_timeline", lambda match_id, data, puuid: None)
+
+    ingest_match("NA1_1", None, "p1")
+    update_sync_state("p1")
+
+    # Eight new games, but only room for three
+    client = FakeClient([f"NA1_{i}" for i in range(9, 0, -1)])
+    fetch_history.fetch_history("p1", count=3, client=client)
+    assert downloaded == {"NA1_1", "NA1_9", "NA1_8", "NA1_7"}
+    assert get_sync_state("p1")["newest_match_id"] == "NA1_1"
+
+    # A larger window still reaches the games in between
+    fetch_history.fetch_history("p1", count=20, client=client)
+    assert downloaded == {f"NA1_{i}" for i in range(1, 10)}
+    assert get_sync_state("p1")["newest_match_id"] == "NA1_9"
+
+def test_failed_matches_keep_the_watermark(db, monkeypatch):
+    monkeypatch.setattr(fetch_history, "already_downloaded", lambda match_id: False)
+    monkeypatch.setattr(fetch_history, "ingest_match", lambda match_id, data, puuid: None)
+
+    def ingest_timeline(match_id, data, puuid):
+        raise RuntimeError("bad timeline")
+
+    monkeypatch.setattr(fetch_history, "ingest_timeline", ingest_timeline)
+    fetch_history.fetch_history("p1", count=2, client=FakeClient(["NA1_2", "NA1_1"]))
+
+    assert get_sync_state("p1") is None
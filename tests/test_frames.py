@@ -0,0 +1,75 @@
+import io
+import json
+import pytest
+from src.frames import (
+    FrameCollector, get_participant_frames, get_participant_frames_batch, parse_participant_frames,
+    save_participant_frames
+)
+from src.parsing import parse_timeline_stream
+
+def make_timeline(match_id, minutes=3):
+    puuids = ["a", "b"]
+    frames = []
+    for minute in range(minutes):
+        frames.append({
+            "timestamp": minute * 60000,
+            "events": [],
+            "participantFrames": {
+                str(pid): {
+                    "participantId": pid,
+                    "totalGold": 500 + minute * 400 * pid,
+                    "currentGold": 100,
+                    "xp": minute * 300,
+                    "level": 1 + minute,
+                    "minionsKilled": minute * 7,
+                    "jungleMinionsKilled": 0,
+                    "position": {"x": 1000 * pid, "y": 2000 + minute},
+                }
+                for pid in (1, 2)
+            }
+        })
+    return {
+        "metadata": {"matchId": match_id, "participants": puuids},
+        "info": {
+            "frames": frames,
+            "participants": [{"participantId": 1, "puuid": "a"}, {"participantId": 2, "puuid": "b"}]
+        }
+    }
+
+def test_parse_participant_frames():
+    frames = parse_participant_frames(make_timeline("NA1_1"))
+
+    assert frames.puuids == ["a", "b"]
+    assert frames.minutes == 3
+    assert frames["gold"].shape == (2, 3)
+    assert frames["gold"][1, 2] == 500 + 2 * 400 * 2
+    assert frames["position_x"].row(frames.participant_index("b")).tolist() == [2000, 2000, 2000]
+    with pytest.raises(IndexError):
+        frames["gold"][0, 3]
+
+def test_frames_round_trip(db):
+    for match_id in ("NA1_1", "NA1_2"):
+        save_participant_frames(parse_participant_frames(make_timeline(match_id)))
+
+    stored = get_participant_frames("NA1_1")
+    assert stored.puuids == ["a", "b"]
+    assert stored["gold"].tolist() == parse_participant_frames(make_timeline("NA1_1"))["gold"].tolist()
+
+    batch = get_participant_frames_batch(["NA1_1", "NA1_2", "NA1_MISSING"], fields=["gold", "xp"])
+    assert set(batch) == {"NA1_1", "NA1_2"}
+    assert set(batch["NA1_2"].fields) == {"gold", "xp"}
+    assert get_participant_frames("NA1_MISSING") is None
+
+    with pytest.raises(ValueError):
+        get_participant_frames("NA1_1", fields=["gold; DROP TABLE participant_frames"])
+
+def test_streamed_frames_match_decoded():
+    timeline = make_timeline("NA1_1")
+    collector = FrameCollector()
+    parse_timeline_stream(io.BytesIO(json.dumps(timeline).encode("utf-8")), "a", frames=collector)
+
+    streamed = collector.build()
+    decoded = parse_participant_frames(timeline)
+    assert streamed.puuids == decoded.puuids
+    assert {name: m.tolist() for name, m in streamed.fields.items()} == \
+        {name: m.tolist() for name, m in decoded.fields.items()}
@@ -1,9 +1,13 @@
 import os
 from unittest.mock import MagicMock, patch
 import pytest
-from src.llm import LLMClient
+from src import database
+from src.llm import FakeBackend, LLMClient
 from src.models import GameStatsDto, TimelineEventDto
 
+# Summaries are cached in the database
+pytestmark = pytest.mark.usefixtures("db")
+
 @pytest.fixture
 def mock_stats():
     return GameStatsDto(
@@ -55,3 +59,132 @@ def test_generate_match_summary(mock_genai, mock_stats):
     assert "Champion: Ahri" in prompt
     assert "Result: Loss" in prompt
     assert "KDA: 5/10/2" in prompt
+
+@patch("src.llm.genai")
+@patch.dict(os.environ, {"GEMINI_API_KEY": "fake_key"})
+def test_summary_is_cached(mock_genai, mock_stats):
+    generate = mock_genai.Client.return_value.models.generate_content
+    generate.return_value.text = "Nice game."
+
+    client = LLMClient()
+    assert client.generate_match_summary(mock_stats, []) == "Nice game."
+    assert client.generate_match_summary(mock_stats, []) == "Nice game."
+    assert generate.call_count == 1
+    assert client.cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+    # Bypass calls the model again and refreshes the entry
+    generate.return_value.text = "Better game."
+    assert client.generate_match_summary(mock_stats, [], use_cache=False) == "Better game."
+    assert generate.call_count == 2
+    assert client.generate_match_summary(mock_stats, []) == "Better game."
+
+@patch("src.llm.genai")
+@patch.dict(os.environ, {"GEMINI_API_KEY": "fake_key"})
+def test_errors_are_not_cached(mock_genai, mock_stats):
+    generate = mock_genai.Client.return_value.models.generate_content
+    generate.side_effect = RuntimeError("quota exceeded")
+
+    client = LLMClient()
+    assert client.generate_match_summary(mock_stats, []).startswith("Error generating summary")
+    assert client.cache.stats()["entries"] == 0
+
+    generate.side_effect = None
+    generate.return_value.text = "Recovered."
+    assert client.generate_match_summary(mock_stats, []) == "Recovered."
+    assert generate.call_count == 2
+
+@patch("src.llm.genai")
+@patch.dict(os.environ, {"GEMINI_API_KEY": "fake_key"})
+def test_rate_limiter_only_gates_model_calls(mock_genai, mock_stats):
+    mock_genai.Client.return_value.models.generate_content.return_value.text = "Nice game."
+    limiter = MagicMock()
+
+    client = LLMClient(rate_limiter=limiter)
+    client.generate_match_summary(mock_stats, [])
+    client.generate_match_summary(mock_stats, [])
+    assert limiter.acquire.call_count == 1
+
+@patch("src.llm.genai")
+@patch.dict(os.environ, {"GEMINI_API_KEY": "fake_key"})
+def test_prompt_has_timeline_digest_and_calls_are_logged(mock_genai, mock_stats):
+    generate = mock_genai.Client.return_value.models.generate_content
+    generate.return_value.text = "Stop dying to Zed."
+    generate.return_value.usage_metadata.prompt_token_count = 321
+    events = [
+        TimelineEventDto(match_id="NA1_123456", puuid="p1", timestamp=61_000, type="CHAMPION_KILL", killer_id=8, victim_id=3)
+    ]
+
+    client = LLMClient(token_budget=50)
+    client.summarize_match(mock_stats.model_copy(update={"participant_id": 3}), events)
+    client.summarize_match(mock_stats.model_copy(update={"participant_id": 3}), events)
+
+    prompt = generate.call_args.kwargs["contents"]
+    assert "KEY MOMENTS:" in prompt
+    assert "- 01:01 You were killed by enemy #8" in prompt
+
+    stats = database.get_llm_call_stats()
+    assert [(row["token_budget"], row["calls"], row["avg_prompt_tokens"]) for row in stats] == [(50, 1, 321)]
+    logged = database.connection().execute("SELECT COUNT(*), SUM(cached) FROM llm_calls").fetchone()
+    assert tuple(logged) == (2, 1)
+
+class FakeClock:
+    """
+    perf_counter stand-in advanced by the fake backend's sleeps.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def test_stream_yields_chunks_and_measures_first_token(mock_stats):
+    clock = FakeClock()
+    backend = FakeBackend(text="Ward the river before pushing.", chunk_size=10, delay=0.1, sleep=clock.sleep)
+    client = LLMClient(backend=backend)
+
+    with patch("src.llm.time.perf_counter", clock):
+        chunks = list(client.summarize_match_stream(mock_stats, []))
+
+    assert chunks == ["Ward the r", "iver befor", "e pushing."]
+    assert client.last_call.ttft_ms == pytest.approx(100)
+    assert client.last_call.latency_ms == pytest.approx(300)
+    row = database.get_llm_call_stats()[0]
+    assert row["avg_ttft_ms"] == pytest.approx(100)
+
+    # Completed streams are cached and replayed as one chunk
+    assert list(client.summarize_match_stream(mock_stats, [])) == ["Ward the river before pushing."]
+    assert client.last_call.cached
+    assert client.summarize_match(mock_stats, []) == "Ward the river before pushing."
+    assert len(backend.prompts) == 1
+
+def test_stream_errors_are_not_cached(mock_stats):
+    backend = FakeBackend(text="", sleep=lambda seconds: None)
+    client = LLMClient(backend=backend)
+
+    assert list(client.generate_match_summary_stream(mock_stats, [])) == [
+        "Error generating summary: Empty response from the model"
+    ]
+    assert not client.last_call.ok
+
+    backend.text = "Back online."
+    assert list(client.generate_match_summary_stream(mock_stats, [])) == ["Back online."]
+    assert len(backend.prompts) == 2
+
+@patch("src.llm.genai")
+@patch.dict(os.environ, {"GEMINI_API_KEY": "fake_key"})
+def test_fake_backend_never_answers_for_the_real_model(mock_genai, mock_stats):
+    generate = mock_genai.Client.return_value.models.generate_content
+    generate.return_value.text = "Real advice."
+
+    fake = LLMClient(backend=FakeBackend(sleep=lambda seconds: None))
+    fake.summarize_match(mock_stats, [])
+    assert not fake.stores_summaries
+
+    real = LLMClient()
+    assert real.summarize_match(mock_stats, []) == "Real advice."
+    assert generate.call_count == 1
+    models = database.connection().execute("SELECT DISTINCT model FROM llm_calls ORDER BY model").fetchall()
+    assert [row[0] for row in models] == ["fake-llm", "gemini-2.0-flash"]
@@ -0,0 +1,50 @@
+from src.llm_cache import SummaryCache, cache_key
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def test_get_put_and_stats(db):
+    cache = SummaryCache()
+    assert cache.get("model-a", "prompt") is None
+    cache.put("model-a", "prompt", "summary")
+
+    assert cache.get("model-a", "prompt") == "summary"
+    # Keyed by model too
+    assert cache.get("model-b", "prompt") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "entries": 1}
+
+    # Persistent: a new instance (e.g. the next analyze.py run) hits
+    assert SummaryCache().get("model-a", "prompt") == "summary"
+    assert cache_key("model-a", "prompt") != cache_key("model-b", "prompt")
+
+def test_evicts_least_recently_used(db):
+    clock = FakeClock()
+    cache = SummaryCache(max_entries=2, clock=clock)
+    for prompt in ("a", "b"):
+        cache.put("m", prompt, prompt.upper())
+        clock.now += 1
+
+    cache.get("m", "a")  # "b" is now least recently used
+    clock.now += 1
+    cache.put("m", "c", "C")
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") == "A"
+    assert cache.stats()["entries"] == 2
+
+def test_expires_old_entries(db):
+    clock = FakeClock()
+    cache = SummaryCache(max_age=60, clock=clock)
+    cache.put("m", "old", "OLD")
+
+    clock.now += 61
+    assert cache.get("m", "old") is None
+    cache.put("m", "new", "NEW")
+    assert cache.stats()["entries"] == 1
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0
@@ -1,5 +1,11 @@
+import io
+import json
 import pytest
-from src.parsing import parse_match_to_stats, parse_timeline_to_events
+from src import parsing
+from src.parsing import (
+    parse_match_to_all_stats, parse_match_to_stats, parse_timeline_stream, parse_timeline_to_all_events,
+    parse_timeline_to_events
+)
 
 def test_parse_match_to_stats():
     puuid = "user_123"
@@ -22,6 +28,7 @@ def test_parse_match_to_stats():
                 },
                 {
                     "puuid": "user_123",
+                    "participantId": 2,
                     "championName": "Ahri",
                     "win": True,
                     "kills": 5, "deaths": 1, "assists": 2,
@@ -57,6 +64,7 @@ def test_parse_match_to_stats():
     
     assert stats.total_damage_dealt_to_champions == 10000
     assert stats.damage_per_minute == 1000.0
+    assert stats.participant_id == 2
 
 
 def test_parse_timeline_events():
@@ -113,3 +121,73 @@ def test_parse_timeline_events():
     assert e2.type == "ELITE_MONSTER_KILL"
     assert e2.killer_id == 1
     assert e2.monster_type == "DRAGON"
+
+def test_all_participants_match_per_player_parsing():
+    participants = [
+        {"puuid": puuid, "championName": champion, "win": win,
+         "kills": 3, "deaths": 2, "assists": 4,
+         "totalMinionsKilled": 100, "neutralMinionsKilled": 5,
+         "totalDamageDealtToChampions": 9000, "goldEarned": 6000,
+         "visionScore": 10, "wardsPlaced": 4, "wardsKilled": 1,
+         "teamPosition": "TOP"}
+        for puuid, champion, win in (("a", "Garen", True), ("b", "Darius", False))
+    ]
+    match_data = {
+        "metadata": {"matchId": "NA1_1"},
+        "info": {"gameCreation": 1, "gameDuration": 1200, "participants": participants}
+    }
+    timeline_data = {
+        "metadata": {"matchId": "NA1_1"},
+        "info": {
+            "participants": [{"participantId": 1, "puuid": "a"}, {"participantId": 2, "puuid": "b"}],
+            "frames": [{"events": [
+                {"type": "CHAMPION_KILL", "timestamp": 1000, "killerId": 1, "victimId": 2, "position": {"x": 1, "y": 2}},
+                {"type": "CHAMPION_KILL", "timestamp": 1500, "killerId": 0, "victimId": 1},
+                {"type": "ELITE_MONSTER_KILL", "timestamp": 2000, "killerId": 2, "monsterType": "BARON_NASHOR"},
+                {"type": "BUILDING_KILL", "timestamp": 3000, "killerId": 2},
+                {"type": "WARD_PLACED", "timestamp": 4000, "creatorId": 1},
+            ]}]
+        }
+    }
+
+    assert parse_match_to_all_stats(match_data) == [parse_match_to_stats(match_data, p) for p in ("a", "b")]
+
+    def key(e):
+        return (e.timestamp, e.puuid, e.type)
+    expected = parse_timeline_to_events(timeline_data, "a") + parse_timeline_to_events(timeline_data, "b")
+    assert sorted(parse_timeline_to_all_events(timeline_data), key=key) == sorted(expected, key=key)
+
+STREAM_TIMELINE = {
+    "metadata": {"matchId": "NA1_1", "participants": ["a", "b"]},
+    "info": {
+        "frameInterval": 60000,
+        "frames": [
+            {"events": [
+                {"type": "LEVEL_UP", "timestamp": 10, "participantId": 1},
+                {"type": "CHAMPION_KILL", "timestamp": 1000, "killerId": 1, "victimId": 2, "position": {"x": 1, "y": 2}},
+            ], "participantFrames": {"1": {"totalGold": 500}}},
+            {"events": [
+                {"type": "ELITE_MONSTER_KILL", "timestamp": 2000, "killerId": 2, "monsterType": "DRAGON",
+                 "position": {"x": 9866, "y": 4414}},
+                {"type": "BUILDING_KILL", "timestamp": 3000, "killerId": 2},
+            ]},
+        ],
+        "participants": [{"participantId": 1, "puuid": "a"}, {"participantId": 2, "puuid": "b"}]
+    }
+}
+
+@pytest.mark.parametrize("streaming", [True, False])
+@pytest.mark.parametrize("puuid", ["a", "b", None])
+def test_parse_timeline_stream_matches_dict_parsing(monkeypatch, streaming, puuid):
+    if streaming:
+        pytest.importorskip("ijson")
+    else:
+        monkeypatch.setattr(parsing, "ijson_available", lambda: False)
+
+    stream = io.BytesIO(json.dumps(STREAM_TIMELINE).encode("utf-8"))
+    if puuid is None:
+        expected = parse_timeline_to_all_events(STREAM_TIMELINE)
+    else:
+        expected = parse_timeline_to_events(STREAM_TIMELINE, puuid)
+
+    assert parse_timeline_stream(stream, puuid) == expected
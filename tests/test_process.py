@@ -0,0 +1,169 @@
+import sqlite3
+import pytest
+import process
+from src import database, storage
+from src.frames import get_participant_frames
+
+PUUID = "user_123"
+
+def make_match(match_id):
+    return {
+        "metadata": {"dataVersion": "2", "matchId": match_id, "participants": [PUUID]},
+        "info": {
+            "gameCreation": 1000, "gameDuration": 600, "gameId": 1, "gameMode": "CLASSIC",
+            "participants": [{
+                "puuid": PUUID, "championName": "Ahri", "win": True,
+                "kills": 5, "deaths": 1, "assists": 2,
+                "totalMinionsKilled": 50, "neutralMinionsKilled": 10,
+                "totalDamageDealtToChampions": 10000, "goldEarned": 5000,
+                "visionScore": 15, "wardsPlaced": 5, "wardsKilled": 1,
+                "teamPosition": "MIDDLE"
+            }]
+        }
+    }
+
+def make_timeline(match_id):
+    return {
+        "metadata": {"dataVersion": "2", "matchId": match_id, "participants": [PUUID]},
+        "info": {
+            "participants": [{"participantId": 1, "puuid": PUUID}],
+            "frames": [{"events": [
+                {"type": "CHAMPION_KILL", "timestamp": 1000, "killerId": 1, "victimId": 2},
+                {"type": "ELITE_MONSTER_KILL", "timestamp": 2000, "killerId": 1, "monsterType": "DRAGON"},
+            ]}]
+        }
+    }
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch, db):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path / "data"))
+    for match_id in ("NA1_1", "NA1_2"):
+        storage.save_match_data(match_id, make_match(match_id))
+        storage.save_timeline_data(match_id, make_timeline(match_id))
+    return tmp_path
+
+def count_rows(table):
+    conn = database.get_db_connection()
+    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.close()
+    return count
+
+def test_reprocessing_is_incremental_and_idempotent(workspace, capsys):
+    process.process_data(PUUID)
+    assert count_rows("game_stats") == 2
+    assert count_rows("timeline_events") == 4
+    assert count_rows("processed_inputs") == 4
+
+    capsys.readouterr()
+    process.process_data(PUUID)
+    out = capsys.readouterr().out
+    assert "Match files: 0 processed, 2 unchanged." in out
+    assert "Timeline files: 0 processed, 2 unchanged." in out
+    assert count_rows("timeline_events") == 4
+
+def test_changed_input_is_reprocessed(workspace, capsys):
+    process.process_data(PUUID)
+
+    storage.save_raw("timeline", "NA1_1", make_timeline("NA1_1"), fmt="json")
+    capsys.readouterr()
+    process.process_data(PUUID)
+    out = capsys.readouterr().out
+
+    assert "Timeline files: 1 processed, 1 unchanged." in out
+    # Replaced, not duplicated
+    assert count_rows("timeline_events") == 4
+
+def test_rebuild_reprocesses_everything(workspace, capsys):
+    process.process_data(PUUID)
+    capsys.readouterr()
+
+    process.process_data(PUUID, rebuild=True)
+    out = capsys.readouterr().out
+
+    assert "Timeline files: 2 processed, 0 unchanged." in out
+    assert count_rows("timeline_events") == 4
+
+def test_parser_version_bump_reprocesses(workspace, capsys, monkeypatch):
+    process.process_data(PUUID)
+    monkeypatch.setattr(process, "PARSER_VERSION", 999)
+    capsys.readouterr()
+
+    process.process_data(PUUID)
+    assert "Match files: 2 processed, 0 unchanged." in capsys.readouterr().out
+
+def test_parallel_workers_match_serial(workspace, capsys):
+    for i in range(3, 8):
+        storage.save_match_data(f"NA1_{i}", make_match(f"NA1_{i}"))
+        storage.save_timeline_data(f"NA1_{i}", make_timeline(f"NA1_{i}"))
+
+    process.process_data(PUUID, workers=2)
+    out = capsys.readouterr().out
+
+    assert "Match files: 7 processed, 0 unchanged." in out
+    assert "Timeline files: 7 processed, 0 unchanged." in out
+    assert count_rows("game_stats") == 7
+    assert count_rows("timeline_events") == 14
+
+def test_chunks_are_committed_together(workspace, monkeypatch):
+    monkeypatch.setattr(process, "CHUNK_SIZE", 10)
+    commits = []
+    real_write = process.write_results
+
+    def spy(results, puuid):
+        commits.append(len(results))
+        return real_write(results, puuid)
+
+    monkeypatch.setattr(process, "write_results", spy)
+    process.process_data(PUUID)
+
+    # Both matches in one transaction, then both timelines in another
+    assert commits == [2, 2]
+
+def test_failed_chunk_write_is_skipped_and_retried(workspace, monkeypatch, capsys):
+    monkeypatch.setattr(process, "CHUNK_SIZE", 1)
+    real_save = process.save_all_game_stats
+    calls = []
+
+    def locked_once(rows):
+        calls.append(rows)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        real_save(rows)
+
+    monkeypatch.setattr(process, "save_all_game_stats", locked_once)
+    process.process_data(PUUID)
+    out = capsys.readouterr().out
+    assert "Failed: database is locked" in out
+    assert "Match files: 1 processed, 0 unchanged." in out
+    assert "Timeline files: 2 processed, 0 unchanged." in out
+    assert count_rows("game_stats") == 1
+
+    # The failed match was not marked processed, so the next run picks it up
+    process.process_data(PUUID)
+    assert "Match files: 1 processed, 1 unchanged." in capsys.readouterr().out
+    assert count_rows("game_stats") == 2
+
+def test_all_participants_mode(workspace, capsys):
+    process.process_data(all_participants=True)
+    out = capsys.readouterr().out
+    assert "Processing data for all participants" in out
+    assert "Match files: 2 processed, 0 unchanged." in out
+    assert count_rows("game_stats") == 2
+    assert count_rows("timeline_events") == 4
+
+    process.process_data(all_participants=True)
+    assert "Match files: 0 processed, 2 unchanged." in capsys.readouterr().out
+
+def test_streamed_timelines_match_decoded(workspace):
+    process.process_data(PUUID, stream=True)
+    streamed = database.get_timeline_events("NA1_1", PUUID)
+
+    process.process_data(PUUID, rebuild=True)
+    assert database.get_timeline_events("NA1_1", PUUID) == streamed
+    assert len(streamed) == 2
+
+def test_timeline_frames_are_stored(workspace):
+    process.process_data(PUUID)
+    frames = get_participant_frames("NA1_1")
+    assert frames.puuids == [PUUID]
+    assert frames.minutes == 1
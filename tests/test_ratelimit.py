@@ -0,0 +1,103 @@
+import httpx
+import pytest
+from src.ratelimit import RateLimiter, MemoryBucketStore, SQLiteBucketStore, parse_rate_limit_header
+from src.riot import RiotClient
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def make_limiter(store=None, app_limits="2:1"):
+    clock = FakeClock()
+    limiter = RateLimiter(store=store, default_app_limits=app_limits, safety_margin=0, clock=clock, sleep=clock.sleep)
+    return limiter, clock
+
+def test_parse_rate_limit_header():
+    assert parse_rate_limit_header("20:1,100:120") == {1: 20, 120: 100}
+    assert parse_rate_limit_header("1:1, 3:120") == {1: 1, 120: 3}
+    assert parse_rate_limit_header(None) == {}
+
+def test_acquire_waits_for_window():
+    limiter, clock = make_limiter()
+    host = "americas.api.riotgames.com"
+
+    assert limiter.acquire(host, "match") == 0
+    assert limiter.acquire(host, "match") == 0
+    # Third request in the same second must wait for the window to reset
+    assert limiter.acquire(host, "match") == pytest.approx(1.0)
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+def test_method_limits_from_headers():
+    limiter, clock = make_limiter(app_limits="100:1")
+    host = "americas.api.riotgames.com"
+
+    limiter.acquire(host, "timeline")
+    limiter.update(host, "timeline", {
+        "X-App-Rate-Limit": "100:1",
+        "X-App-Rate-Limit-Count": "1:1",
+        "X-Method-Rate-Limit": "1:10",
+        "X-Method-Rate-Limit-Count": "1:10",
+    })
+
+    # Method bucket is exhausted for 10s, but other methods are unaffected
+    assert limiter.reserve(host, "match") == 0
+    assert limiter.reserve(host, "timeline") == pytest.approx(10.0)
+
+def test_server_count_is_respected():
+    limiter, clock = make_limiter(app_limits="5:1")
+    host = "americas.api.riotgames.com"
+
+    limiter.acquire(host, "match")
+    # Another process already used most of the budget
+    limiter.update(host, "match", {"X-App-Rate-Limit": "5:1", "X-App-Rate-Limit-Count": "5:1"})
+    assert limiter.reserve(host, "match") > 0
+
+def test_backoff_blocks_unknown_bucket():
+    limiter, clock = make_limiter(app_limits="100:1")
+    host = "americas.api.riotgames.com"
+    limiter.backoff(host, "match", 3, "method")
+    assert limiter.reserve(host, "match") == pytest.approx(3.0)
+    assert limiter.reserve(host, "timeline") == 0
+
+def test_sqlite_store_is_shared(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    first, clock = make_limiter(store=SQLiteBucketStore(path))
+    second = RateLimiter(store=SQLiteBucketStore(path), default_app_limits="2:1", safety_margin=0, clock=clock)
+    host = "americas.api.riotgames.com"
+
+    assert first.reserve(host, "match") == 0
+    assert second.reserve(host, "match") == 0
+    # Budget of 2/s is spent across both limiters
+    assert first.reserve(host, "match") > 0
+    assert second.reserve(host, "match") > 0
+
+def test_memory_store_default():
+    limiter = RateLimiter()
+    assert isinstance(limiter.store, MemoryBucketStore)
+
+def test_client_feeds_headers_to_limiter(monkeypatch):
+    monkeypatch.setenv("RIOT_API_KEY", "test-key")
+    limiter, clock = make_limiter(app_limits="100:1")
+
+    def handler(request):
+        return httpx.Response(200, json={}, headers={
+            "X-App-Rate-Limit": "100:1",
+            "X-App-Rate-Limit-Count": "1:1",
+            "X-Method-Rate-Limit": "1:5",
+            "X-Method-Rate-Limit-Count": "1:5",
+        })
+
+    with RiotClient(transport=httpx.MockTransport(handler), rate_limiter=limiter) as client:
+        client.get_match("NA1_1")
+        client.get_match("NA1_2")
+
+    # Second call had to wait out the 1 request / 5s method window
+    assert clock.sleeps == [pytest.approx(5.0)]
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from src import storage
+from src.response_cache import ResponseCache, request_key
+from src.riot import AsyncRiotClient, RiotClient
+
+@pytest.fixture
+def mock_env_key(monkeypatch):
+    monkeypatch.setenv("RIOT_API_KEY", "test-key")
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_request_key_orders_params():
+    assert request_key("u", {"count": 20, "start": 0}) == request_key("u", {"start": 0, "count": 20})
+    assert request_key("u", {"start": 0}) != request_key("u", {"start": 100})
+    assert request_key("u") == "u"
+
+def test_memory_tier_is_lru_and_honours_ttl():
+    clock = FakeClock()
+    cache = ResponseCache(max_memory_entries=2, clock=clock)
+    cache.put("match-ids", "a", ["NA1_1"])
+    cache.put("match-ids", "b", ["NA1_2"])
+    cache.get("match-ids", "a")
+    cache.put("match-ids", "c", ["NA1_3"])
+
+    # "b" was least recently used
+    assert cache.get("match-ids", "b") is None
+    assert cache.get("match-ids", "a") == ["NA1_1"]
+
+    clock.now += 5 * 60 - 1
+    assert cache.get("match-ids", "c") == ["NA1_3"]
+    clock.now += 1
+    assert cache.get("match-ids", "c") is None
+
+    # Matches and timelines never go to memory
+    cache.put("timeline", "t", {"frames": []})
+    assert cache.stats()["memory_entries"] == 1
+
+def test_matches_are_read_back_from_the_raw_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    storage.save_raw("timeline", "NA1_1", {"frames": [1, 2, 3]})
+
+    cache = ResponseCache(raw_store=True)
+    assert cache.get("timeline", "url", "NA1_1") == {"frames": [1, 2, 3]}
+    assert cache.get("match", "url", "NA1_1") is None
+    assert ResponseCache().get("timeline", "url", "NA1_1") is None
+    assert (cache.stats()["raw_hits"], cache.stats()["misses"]) == (1, 1)
+
+def test_concurrent_identical_requests_share_one_fetch():
+    cache = ResponseCache()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"id": "a"}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_fetch("match", "a", fetch))) for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["deduplicated"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"id": "a"}] * 3
+
+def test_failed_fetch_is_not_cached():
+    cache = ResponseCache()
+
+    def fail():
+        raise httpx.HTTPError("boom")
+
+    with pytest.raises(httpx.HTTPError):
+        cache.get_or_fetch("match", "a", fail)
+    assert cache.get_or_fetch("match", "a", lambda: {"id": "a"}) == {"id": "a"}
+
+def test_riot_client_reads_through_cache(mock_env_key, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    requests = []
+
+    def handler(request):
+        requests.append(str(request.url))
+        if "/ids" in request.url.path:
+            return httpx.Response(200, json=["NA1_1"])
+        return httpx.Response(200, json={"metadata": {"matchId": "NA1_1"}})
+
+    with RiotClient(transport=httpx.MockTransport(handler), cache=ResponseCache(raw_store=True)) as client:
+        storage.save_raw("match", "NA1_1", client.get_match("NA1_1"))
+        client.get_match("NA1_1")
+        client.get_match_ids_by_puuid("p1", start=0)
+        client.get_match_ids_by_puuid("p1", start=100)
+        client.get_match_ids_by_puuid("p1", start=0)
+        stats = client.cache.stats()
+
+    assert len(requests) == 3
+    assert (stats["raw_hits"], stats["memory_hits"]) == (1, 1)
+
+def test_async_client_deduplicates_in_flight_requests(mock_env_key):
+    requests = []
+
+    async def handler(request):
+        requests.append(str(request.url))
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"metadata": {"matchId": "NA1_1"}})
+
+    async def run():
+        async with AsyncRiotClient(transport=httpx.MockTransport(handler)) as client:
+            results = await asyncio.gather(*(client.get_match_timeline("NA1_1") for _ in range(4)))
+            return results, client.cache.stats()
+
+    results, stats = asyncio.run(run())
+    assert len(requests) == 1
+    assert all(result == results[0] for result in results)
+    assert stats["deduplicated"] == 3
+
+def test_account_lookups_always_reach_the_api(mock_env_key):
+    requests = []
+
+    def handler(request):
+        requests.append(str(request.url))
+        return httpx.Response(200, json={"puuid": "p1", "gameName": "A", "tagLine": "1"})
+
+    with RiotClient(transport=httpx.MockTransport(handler)) as client:
+        client.get_account_by_riot_id("A", "1")
+        client.get_account_by_riot_id("A", "1")
+
+    assert len(requests) == 2
@@ -1,4 +1,5 @@
 import pytest
+import httpx
 from unittest.mock import patch, MagicMock
 from src.riot import RiotClient
 
@@ -15,7 +16,6 @@ def test_get_match(mock_client_cls, mock_env_key):
     
     mock_client_instance = MagicMock()
     mock_client_instance.get.return_value = mock_response
-    mock_client_instance.__enter__.return_value = mock_client_instance
     mock_client_cls.return_value = mock_client_instance
 
     # Run
@@ -24,4 +24,85 @@ def test_get_match(mock_client_cls, mock_env_key):
 
     # Verify
     assert result["metadata"]["matchId"] == "NA1_123"
-    mock_client_instance.get.assert_called_with("https://americas.api.riotgames.com/lol/match/v5/matches/NA1_123")
+    mock_client_instance.get.assert_called_with("https://americas.api.riotgames.com/lol/match/v5/matches/NA1_123", params=None)
+
+@patch("src.riot.httpx.Client")
+def test_client_is_reused_across_requests(mock_client_cls, mock_env_key):
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {}
+    mock_client_cls.return_value.get.return_value = mock_response
+
+    with RiotClient() as client:
+        client.get_match("NA1_1")
+        client.get_match_timeline("NA1_1")
+        client.get_match("NA1_2")
+
+    # One pool for the lifetime of the client, closed on exit
+    assert mock_client_cls.call_count == 1
+    assert mock_client_cls.return_value.get.call_count == 3
+    mock_client_cls.return_value.close.assert_called_once()
+
+def test_pool_stats(mock_env_key):
+    def handler(request):
+        return httpx.Response(200, json={"metadata": {"matchId": "NA1_1"}})
+
+    with RiotClient(transport=httpx.MockTransport(handler)) as client:
+        client.get_match("NA1_1")
+        # Simulate the trace events httpcore emits when it opens a socket
+        client._trace("connection.connect_tcp.complete", {})
+        client.get_match("NA1_2")
+        stats = client.pool_stats()
+
+    assert stats == {"requests": 2, "connections_opened": 1, "connections_reused": 1}
+
+def test_http2_falls_back_without_h2(mock_env_key):
+    with patch("src.riot.http2_available", return_value=False):
+        client = RiotClient(http2=True, transport=httpx.MockTransport(lambda r: httpx.Response(200)))
+    assert client.http2 is False
+    client.close()
+
+def test_async_client_mirrors_methods(mock_env_key):
+    import asyncio
+    from src.riot import AsyncRiotClient
+
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.path, dict(request.url.params)))
+        if request.url.path.endswith("/ids"):
+            return httpx.Response(200, json=["NA1_1"])
+        return httpx.Response(200, json={"metadata": {"matchId": "NA1_1"}})
+
+    async def run():
+        async with AsyncRiotClient(transport=httpx.MockTransport(handler)) as client:
+            ids = await client.get_match_ids_by_puuid("p1", start=0, count=5)
+            match = await client.get_match("NA1_1")
+            timeline = await client.get_match_timeline("NA1_1")
+            return ids, match, timeline, client.pool_stats()
+
+    ids, match, timeline, stats = asyncio.run(run())
+
+    assert ids == ["NA1_1"]
+    assert match["metadata"]["matchId"] == "NA1_1"
+    assert timeline["metadata"]["matchId"] == "NA1_1"
+    assert seen == [
+        ("/lol/match/v5/matches/by-puuid/p1/ids", {"start": "0", "count": "5"}),
+        ("/lol/match/v5/matches/NA1_1", {}),
+        ("/lol/match/v5/matches/NA1_1/timeline", {}),
+    ]
+    assert stats["requests"] == 3
+
+def test_match_ids_start_time(mock_env_key):
+    seen = []
+
+    def handler(request):
+        seen.append(dict(request.url.params))
+        return httpx.Response(200, json=[])
+
+    with RiotClient(transport=httpx.MockTransport(handler)) as client:
+        client.get_match_ids_by_puuid("p1", start=0, count=100, start_time=1700000000)
+        client.get_match_ids_by_puuid("p1", start=0, count=100)
+
+    assert seen[0] == {"start": "0", "count": "100", "startTime": "1700000000"}
+    assert "startTime" not in seen[1]
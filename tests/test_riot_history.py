@@ -3,7 +3,8 @@ import pytest
 from src.riot import RiotClient
 
 @pytest.fixture
-def mock_httpx_client():
+def mock_httpx_client(monkeypatch):
+    monkeypatch.setenv("RIOT_API_KEY", "test-key")
     with patch("src.riot.httpx.Client") as mock_client:
         yield mock_client
 
@@ -13,7 +14,7 @@ def test_get_match_ids_by_puuid(mock_httpx_client):
     mock_response.status_code = 200
     mock_response.json.return_value = ["NA1_12345", "NA1_67890"]
     
-    mock_instance = mock_httpx_client.return_value.__enter__.return_value
+    mock_instance = mock_httpx_client.return_value
     mock_instance.get.return_value = mock_response
     
     # Execute
@@ -37,7 +38,7 @@ def test_get_match_ids_by_puuid_with_filters(mock_httpx_client):
     mock_response.status_code = 200
     mock_response.json.return_value = []
     
-    mock_instance = mock_httpx_client.return_value.__enter__.return_value
+    mock_instance = mock_httpx_client.return_value
     mock_instance.get.return_value = mock_response
     
     # Execute
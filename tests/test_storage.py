@@ -0,0 +1,89 @@
+import json
+import os
+import pytest
+from src import storage
+
+MATCH = {
+    "metadata": {"dataVersion": "2", "matchId": "NA1_1", "participants": ["p1"]},
+    "info": {"gameCreation": 1, "gameDuration": 600, "gameId": 1, "gameMode": "CLASSIC", "participants": []}
+}
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+def test_save_match_data_is_compressed(data_dir):
+    path = storage.save_match_data("NA1_1", MATCH)
+
+    assert path.endswith(".json.gz")
+    assert storage.raw_exists("match", "NA1_1")
+    assert storage.load_match_data("NA1_1") == MATCH
+
+def test_legacy_json_is_still_read(data_dir):
+    with open(os.path.join(data_dir, "match_NA1_1.json"), "w") as f:
+        json.dump(MATCH, f, indent=2)
+
+    assert storage.raw_exists("match", "NA1_1")
+    assert storage.load_match_data("NA1_1") == MATCH
+    assert list(storage.iter_raw_files("match")) == [os.path.join(data_dir, "match_NA1_1.json")]
+
+def test_resave_replaces_other_formats(data_dir):
+    storage.save_raw("match", "NA1_1", MATCH, fmt="json")
+    storage.save_raw("match", "NA1_1", MATCH, fmt="gzip")
+    assert os.listdir(data_dir) == ["match_NA1_1.json.gz"]
+
+def test_migrate_raw_files(data_dir):
+    for i in range(3):
+        with open(os.path.join(data_dir, f"timeline_NA1_{i}.json"), "w") as f:
+            json.dump({"metadata": {"matchId": f"NA1_{i}"}, "info": {"frames": [{"events": []}] * 50}}, f, indent=2)
+
+    summary = storage.migrate_raw_files("gzip")
+
+    assert summary["files"] == 3
+    assert summary["bytes_after"] < summary["bytes_before"]
+    assert sorted(os.listdir(data_dir)) == [f"timeline_NA1_{i}.json.gz" for i in range(3)]
+    assert storage.load_timeline_data("NA1_2")["metadata"]["matchId"] == "NA1_2"
+    # Running again is a no-op
+    assert storage.migrate_raw_files("gzip")["files"] == 0
+
+@pytest.fixture
+def archive_backend(data_dir, monkeypatch):
+    monkeypatch.setattr(storage, "RAW_BACKEND", "archive")
+    monkeypatch.setattr(storage, "_archive", None)
+    return data_dir
+
+def test_archive_backend_round_trip(archive_backend):
+    storage.save_match_data("NA1_1", MATCH)
+
+    assert "raw_archive.db" in os.listdir(archive_backend)
+    assert not list(storage.iter_raw_files("match"))
+    assert storage.raw_exists("match", "NA1_1")
+    assert not storage.raw_exists("timeline", "NA1_1")
+    assert storage.load_match_data("NA1_1") == MATCH
+    assert list(storage.iter_raw("match")) == [("NA1_1", MATCH)]
+    assert storage.count_raw("match") == 1
+
+def test_archive_raw_files(archive_backend):
+    storage._save_raw_file("match", "NA1_1", MATCH, "json")
+
+    summary = storage.archive_raw_files("gzip")
+
+    assert summary["files"] == 1
+    assert not list(storage.iter_raw_files("match"))
+    assert storage.load_match_data("NA1_1") == MATCH
+
+@pytest.mark.parametrize("fmt", ["gzip", "json"])
+def test_open_raw_entry_streams_files(data_dir, fmt):
+    storage.save_raw("match", "NA1_1", MATCH, fmt=fmt)
+    entry = next(storage.iter_raw_entries("match"))
+
+    with storage.open_raw_entry(entry) as stream:
+        assert json.load(stream) == MATCH
+
+def test_open_raw_entry_streams_archive(archive_backend):
+    storage.save_match_data("NA1_1", MATCH)
+    entry = next(storage.iter_raw_entries("match"))
+
+    with storage.open_raw_entry(entry) as stream:
+        assert json.load(stream) == MATCH
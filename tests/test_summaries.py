@@ -0,0 +1,90 @@
+import threading
+import time
+import pytest
+from src.database import get_match_summary, get_unsummarized_games, save_all_game_stats
+from src.models import GameStatsDto
+from src.summaries import llm_rate_limiter, summarize_games
+
+PUUID = "test_puuid"
+
+@pytest.fixture
+def db(db):
+    save_all_game_stats([create_game(i) for i in range(6)])
+
+def create_game(i):
+    return GameStatsDto(
+        match_id=f"NA1_{i}", puuid=PUUID, champion_name="Ahri",
+        win=True, game_creation=1000 + i, game_duration=1800,
+        kills=5, deaths=5, assists=5, kda=2.0,
+        total_minions_killed=200, neutral_minions_killed=0, cs_per_minute=6.0,
+        gold_earned=10000, gold_per_minute=400,
+        total_damage_dealt_to_champions=20000, damage_per_minute=600,
+        vision_score=20, wards_placed=10, wards_killed=2,
+        team_position="MIDDLE"
+    )
+
+class FakeClient:
+    model = "fake-model"
+    stores_summaries = True
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def summarize_match(self, stats, events=None, use_cache=True):
+        with self._lock:
+            self.calls.append(stats.match_id)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.01)
+        with self._lock:
+            self.active -= 1
+        if stats.match_id in self.fail:
+            raise RuntimeError("quota exceeded")
+        return f"Summary of {stats.match_id}"
+
+def test_batch_stores_summaries_and_resumes(db):
+    client = FakeClient(fail={"NA1_3"})
+    result = summarize_games(client, PUUID, workers=2)
+
+    assert result == {"pending": 6, "summarized": 5, "stored": 5, "failed": 1}
+    assert client.max_active <= 2
+    assert get_match_summary("NA1_5", PUUID) == "Summary of NA1_5"
+    assert get_match_summary("NA1_3", PUUID) is None
+
+    # The rerun only retries what is missing
+    retry = FakeClient()
+    assert summarize_games(retry, PUUID)["summarized"] == 1
+    assert retry.calls == ["NA1_3"]
+    assert get_unsummarized_games(PUUID) == []
+
+def test_batch_limit_takes_most_recent_unsummarized_games(db):
+    client = FakeClient()
+    summarize_games(client, PUUID, limit=2, workers=1)
+    assert client.calls == ["NA1_5", "NA1_4"]
+    assert [g.match_id for g in get_unsummarized_games(PUUID, 2)] == ["NA1_3", "NA1_2"]
+
+    # The next batch of the same size moves on to older games
+    summarize_games(client, PUUID, limit=2, workers=1)
+    assert client.calls[2:] == ["NA1_3", "NA1_2"]
+
+def test_rate_limiter_caps_requests_per_minute():
+    now = [0.0]
+    limiter = llm_rate_limiter(2)
+    limiter.clock = lambda: now[0]
+    limiter.sleep = lambda seconds: now.__setitem__(0, now[0] + seconds)
+
+    for _ in range(3):
+        limiter.acquire("llm", "model")
+    assert now[0] >= 60
+
+def test_batch_without_storage_reports_nothing_stored(db):
+    client = FakeClient()
+    client.stores_summaries = False
+    result = summarize_games(client, PUUID, limit=2, workers=1)
+
+    assert result == {"pending": 2, "summarized": 2, "stored": 0, "failed": 0}
+    assert get_match_summary("NA1_5", PUUID) is None